@@ -0,0 +1,29 @@
+"""add_order_sequences
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_sequences",
+        sa.Column("prefix", sa.String(), nullable=False),
+        sa.Column("last_value", sa.Integer(), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("prefix"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("order_sequences")
@@ -0,0 +1,116 @@
+"""customer_name_key
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00.000000
+
+Adds normalized matching keys to customers, merges existing spelling-variant
+duplicates (relinking their orders) and then enforces uniqueness on name_key.
+"""
+
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+# The key functions and the merge are frozen copies of app.core.customers as
+# of this revision, so later app changes cannot alter this migration.
+_SARA_AM_RE = re.compile("ํ([่-๋]?)า")
+_FILL_FIELDS = ("customer_code", "phone", "channel", "address")
+
+
+def _name_key(name):
+    if not name:
+        return None
+    s = unicodedata.normalize("NFKC", str(name))
+    s = _SARA_AM_RE.sub(lambda m: m.group(1) + "ำ", s)
+    s = s.casefold()
+    s = "".join(ch for ch in s if unicodedata.category(ch)[0] not in ("P", "Z", "C"))
+    return s or None
+
+
+def _phone_key(phone):
+    if not phone:
+        return None
+    digits = "".join(ch for ch in str(phone) if ch.isdigit())
+    if digits.startswith("66") and len(digits) == 11:
+        digits = "0" + digits[2:]
+    return digits or None
+
+
+def _merge_duplicates(conn) -> None:
+    """Backfill the keys; collapse rows sharing a name key into the lowest id."""
+    customers = sa.table(
+        "customers",
+        sa.column("id"),
+        sa.column("name"),
+        sa.column("name_key"),
+        sa.column("phone_key"),
+        *(sa.column(f) for f in _FILL_FIELDS),
+    )
+    orders = sa.table("orders", sa.column("customer_id"))
+    rows = conn.execute(
+        sa.select(customers.c.id, customers.c.name, *(customers.c[f] for f in _FILL_FIELDS))
+        .order_by(customers.c.id)
+    ).all()
+
+    groups = {}
+    for row in rows:
+        groups.setdefault(_name_key(row.name) or f"__id_{row.id}", []).append(row)
+
+    for key, members in groups.items():
+        survivor, dupes = members[0], members[1:]
+        fill = {}
+        for f in _FILL_FIELDS:
+            if getattr(survivor, f):
+                continue
+            for d in reversed(dupes):
+                if getattr(d, f):
+                    fill[f] = getattr(d, f)
+                    break
+        dupe_ids = [d.id for d in dupes]
+        if dupe_ids:
+            conn.execute(
+                orders.update()
+                .where(orders.c.customer_id.in_(dupe_ids))
+                .values(customer_id=survivor.id)
+            )
+            conn.execute(customers.delete().where(customers.c.id.in_(dupe_ids)))
+        conn.execute(
+            customers.update()
+            .where(customers.c.id == survivor.id)
+            .values(
+                name_key=None if key.startswith("__id_") else key,
+                phone_key=_phone_key(fill.get("phone", survivor.phone)),
+                **fill,
+            )
+        )
+
+
+def upgrade() -> None:
+    op.add_column("customers", sa.Column("name_key", sa.String(), nullable=True))
+    op.add_column("customers", sa.Column("phone_key", sa.String(), nullable=True))
+
+    # Backfill keys and merge duplicates before the unique index goes on.
+    _merge_duplicates(op.get_bind())
+
+    op.create_index(
+        op.f("ix_customers_name_key"), "customers", ["name_key"], unique=True
+    )
+    op.create_index(
+        op.f("ix_customers_phone_key"), "customers", ["phone_key"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_customers_phone_key"), table_name="customers")
+    op.drop_index(op.f("ix_customers_name_key"), table_name="customers")
+    op.drop_column("customers", "phone_key")
+    op.drop_column("customers", "name_key")
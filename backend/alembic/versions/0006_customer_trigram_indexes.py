@@ -0,0 +1,57 @@
+"""customer_trigram_indexes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00.000000
+
+PostgreSQL only: trigram GIN indexes backing GET /customers/search when the
+pg_trgm extension is available. SQLite (and Postgres without pg_trgm) use the
+in-process index in app/core/customer_search.py instead, so this is a no-op
+there.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def _pg_trgm_installable(bind) -> bool:
+    return bool(
+        bind.execute(
+            sa.text(
+                "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+            )
+        ).first()
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not _pg_trgm_installable(bind):
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_customers_name_trgm "
+        "ON customers USING gin (name gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_customers_code_trgm "
+        "ON customers USING gin (customer_code gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_customers_phone_key_prefix "
+        "ON customers (phone_key text_pattern_ops)"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_customers_phone_key_prefix")
+    op.execute("DROP INDEX IF EXISTS ix_customers_code_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_customers_name_trgm")
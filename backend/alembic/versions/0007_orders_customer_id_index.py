@@ -0,0 +1,27 @@
+"""orders_customer_id_index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00.000000
+
+Index orders.customer_id for the per-customer summary aggregate and the
+customer/order joins.
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        op.f("ix_orders_customer_id"), "orders", ["customer_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_orders_customer_id"), table_name="orders")
@@ -0,0 +1,50 @@
+"""order_search_index
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00.000000
+
+Full-text index behind GET /orders/search.
+
+- SQLite: FTS5 external-content table ``orders_fts`` plus the sync triggers,
+  backfilled from the existing orders.
+- PostgreSQL: GIN expression index over the ``to_tsvector('simple', ...)``
+  document used by app/core/order_search.py.
+"""
+
+from alembic import op
+
+from app.core.order_search import (
+    PG_INDEX_NAME,
+    PG_TSVECTOR,
+    SQLITE_DROP_DDL,
+    install_search_index,
+    rebuild_search_index,
+)
+
+# revision identifiers, used by Alembic.
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        if install_search_index(bind):
+            rebuild_search_index(bind)
+    elif bind.dialect.name == "postgresql":
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS {PG_INDEX_NAME} "
+            f"ON orders USING gin (({PG_TSVECTOR}))"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "sqlite":
+        for stmt in SQLITE_DROP_DDL:
+            op.execute(stmt)
+    elif bind.dialect.name == "postgresql":
+        op.execute(f"DROP INDEX IF EXISTS {PG_INDEX_NAME}")
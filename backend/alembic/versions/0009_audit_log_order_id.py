@@ -0,0 +1,81 @@
+"""audit_log_order_id
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 00:00:00.000000
+
+Integer audit_logs.order_id for the order timeline (GET /orders/{id}/logs)
+plus the composite (target_type, target_id, created_at) and
+(order_id, created_at) indexes.
+
+Backfill: order events take their numeric target_id; album events carry the
+order id in their JSON details.
+"""
+
+import json
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+_ALBUM_TARGETS = ("order_album", "album_image")
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("audit_logs") as batch_op:
+        batch_op.add_column(sa.Column("order_id", sa.Integer(), nullable=True))
+
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        numeric = "target_id ~ '^[0-9]+$'"
+    else:
+        numeric = "target_id <> '' AND target_id NOT GLOB '*[^0-9]*'"
+    op.execute(
+        "UPDATE audit_logs SET order_id = CAST(target_id AS INTEGER) "
+        f"WHERE target_type = 'order' AND {numeric}"
+    )
+
+    rows = bind.execute(
+        sa.text(
+            "SELECT id, details FROM audit_logs "
+            "WHERE order_id IS NULL AND target_type IN :types"
+        ).bindparams(sa.bindparam("types", expanding=True)),
+        {"types": list(_ALBUM_TARGETS)},
+    ).all()
+    updates = []
+    for log_id, details in rows:
+        try:
+            order_id = int(json.loads(details or "")["order_id"])
+        except (ValueError, TypeError, KeyError):
+            continue
+        updates.append({"id": log_id, "order_id": order_id})
+    if updates:
+        bind.execute(
+            sa.text("UPDATE audit_logs SET order_id = :order_id WHERE id = :id"),
+            updates,
+        )
+
+    op.create_index(
+        "ix_audit_logs_target_created",
+        "audit_logs",
+        ["target_type", "target_id", "created_at"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_audit_logs_order_created",
+        "audit_logs",
+        ["order_id", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_logs_order_created", table_name="audit_logs")
+    op.drop_index("ix_audit_logs_target_created", table_name="audit_logs")
+    with op.batch_alter_table("audit_logs") as batch_op:
+        batch_op.drop_column("order_id")
@@ -0,0 +1,104 @@
+"""structured_audit_fields
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 00:00:00.000000
+
+Structured audit events: from_status, to_status, amount and actor_role
+columns plus a JSON payload, and an (action, created_at) index for reports
+such as slips approved per admin per day.
+
+Existing rows are parsed with the same rules new events use
+(app.models.audit_log.structure_details): JSON details, ``key=value`` text
+written by the public slip upload, or free text kept as {"text": ...}.
+actor_role is backfilled from the user's current role.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.models.audit_log import structure_details
+
+# revision identifiers, used by Alembic.
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+_BATCH = 5000
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("audit_logs") as batch_op:
+        batch_op.add_column(sa.Column("from_status", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("to_status", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("amount", sa.Numeric(12, 2), nullable=True))
+        batch_op.add_column(sa.Column("actor_role", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("payload", sa.JSON(), nullable=True))
+
+    bind = op.get_bind()
+    audit_logs = sa.table(
+        "audit_logs",
+        sa.column("id", sa.Integer),
+        sa.column("details", sa.Text),
+        sa.column("from_status", sa.String),
+        sa.column("to_status", sa.String),
+        sa.column("amount", sa.Numeric(12, 2)),
+        sa.column("payload", sa.JSON),
+    )
+    update = (
+        audit_logs.update()
+        .where(audit_logs.c.id == sa.bindparam("row_id"))
+        .values(
+            from_status=sa.bindparam("from_status"),
+            to_status=sa.bindparam("to_status"),
+            amount=sa.bindparam("amount"),
+            payload=sa.bindparam("payload", type_=sa.JSON),
+        )
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(audit_logs.c.id, audit_logs.c.details)
+            .where(audit_logs.c.id > last_id, audit_logs.c.details.isnot(None))
+            .order_by(audit_logs.c.id)
+            .limit(_BATCH)
+        ).all()
+        if not rows:
+            break
+        params = []
+        for row_id, details in rows:
+            columns, payload = structure_details(details)
+            params.append(
+                {
+                    "row_id": row_id,
+                    "from_status": columns.get("from_status"),
+                    "to_status": columns.get("to_status"),
+                    "amount": columns.get("amount"),
+                    "payload": payload,
+                }
+            )
+        bind.execute(update, params)
+        last_id = rows[-1][0]
+
+    op.execute(
+        "UPDATE audit_logs SET actor_role = "
+        "(SELECT role FROM users WHERE users.id = audit_logs.user_id) "
+        "WHERE user_id IS NOT NULL"
+    )
+    op.create_index(
+        "ix_audit_logs_action_created",
+        "audit_logs",
+        ["action", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_logs_action_created", table_name="audit_logs")
+    with op.batch_alter_table("audit_logs") as batch_op:
+        batch_op.drop_column("payload")
+        batch_op.drop_column("actor_role")
+        batch_op.drop_column("amount")
+        batch_op.drop_column("to_status")
+        batch_op.drop_column("from_status")
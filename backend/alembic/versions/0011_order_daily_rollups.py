@@ -0,0 +1,43 @@
+"""order_daily_rollups
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 00:00:00.000000
+
+Daily order rollups (creation day x status x product type x sales user)
+backing GET /reports/summary. The table is filled from the existing orders
+with the same GROUP BY the nightly reconcile uses; afterwards it is kept
+current by the before_flush listener in app.core.order_rollups.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+from app.core.order_rollups import reconcile_rollups
+
+# revision identifiers, used by Alembic.
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "order_daily_rollups",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("product_type", sa.String(), nullable=False),
+        sa.Column("sales_user_id", sa.Integer(), nullable=False),
+        sa.Column("order_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("grand_total", sa.Numeric(14, 2), nullable=False, server_default="0"),
+        sa.Column("total_cost", sa.Numeric(14, 2), nullable=False, server_default="0"),
+        sa.Column("estimated_profit", sa.Numeric(14, 2), nullable=False, server_default="0"),
+        sa.Column("balance_amount", sa.Numeric(14, 2), nullable=False, server_default="0"),
+        sa.PrimaryKeyConstraint("day", "status", "product_type", "sales_user_id"),
+    )
+    reconcile_rollups(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_table("order_daily_rollups")
@@ -0,0 +1,28 @@
+"""order_items_neck_type_index
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 00:00:00.000000
+
+Index order_items.neck_type so the re-pricing job run after a neck edit
+(app/core/reprice_jobs.py) can list the distinct neck names in use and find
+the orders carrying them without scanning every item.
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        op.f("ix_order_items_neck_type"), "order_items", ["neck_type"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_order_items_neck_type"), table_name="order_items")
@@ -0,0 +1,81 @@
+"""order_items_auto_add_ons
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 00:00:00.000000
+
+Record which of an item's selected_add_ons were added by the neck / oversize
+rules rather than chosen by the client, so re-pricing can drop a forced
+slope charge once a neck's force_slope is turned off.
+
+Existing items are backfilled from the current necks: the order form never
+sends an add-on its neck forces, so a forced add-on found on a stored item
+was added by the pricing rules. The matching is inlined (not imported from
+app code) so later app changes cannot alter this migration.
+"""
+
+import json
+import re
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+_FORCED_MARK = "(บังคับไหล่สโลป"
+_SPECIAL_SLOPE_NECKS = ("คอปกคางหมู", "คอหยดน้ำ", "คอห้าเหลี่ยมคางหมู")
+
+
+def _neck_key(name):
+    key = str(name or "").replace("นํ้า", "น้ำ")
+    key = re.sub(r"\(.*?\)", "", key)
+    return re.sub(r"\s+", " ", key).strip()
+
+
+def _forced(neck, is_oversize, force_slope_necks):
+    neck = (neck or "").strip()
+    forced = set()
+    if _FORCED_MARK in neck or _neck_key(neck) in force_slope_necks:
+        forced.add("slopeShoulder")
+    if "มีลิ้น" in neck and not any(k in neck for k in _SPECIAL_SLOPE_NECKS):
+        forced.add("collarTongue")
+    if is_oversize:
+        forced.add("oversizeSlopeShoulder")
+    return forced
+
+
+def upgrade() -> None:
+    op.add_column("order_items", sa.Column("auto_add_ons", sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    force_slope_necks = {
+        _neck_key(name)
+        for name, in conn.execute(
+            sa.text("SELECT name FROM neck_types WHERE force_slope = :t"), {"t": True}
+        )
+    }
+    rows = conn.execute(
+        sa.text("SELECT id, neck_type, selected_add_ons, is_oversize FROM order_items")
+    ).fetchall()
+    updates = []
+    for item_id, neck, selected, is_oversize in rows:
+        try:
+            chosen = json.loads(selected) if selected else []
+        except ValueError:
+            chosen = []
+        if not isinstance(chosen, list):
+            chosen = []
+        forced = _forced(neck, bool(is_oversize), force_slope_necks)
+        updates.append({"id": item_id, "auto": json.dumps([a for a in chosen if a in forced])})
+    if updates:
+        conn.execute(
+            sa.text("UPDATE order_items SET auto_add_ons = :auto WHERE id = :id"), updates
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("order_items", "auto_add_ons")
@@ -15,13 +15,13 @@ from pydantic import BaseModel, ConfigDict
 from typing import Optional, List
 from datetime import datetime
 import uuid
-import json
 import logging
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.core.query_budget import query_budget
 from app.models.order import Order as OrderModel
 from app.models.album import OrderAlbum, AlbumImage
-from app.models.audit_log import AuditLog
+from app.core.audit import ASYNC, record_audit
 from app.models.user import User
 from app.api.rbac import require_roles
 from app.core.storage import save_upload
@@ -113,16 +113,18 @@ def create_album(
         created_by_id=getattr(current_user, "id", None),
     )
     db.add(album)
-    db.flush()  # get album.id before audit
-
-    db.add(
-        AuditLog(
-            action="CREATE_ALBUM",
-            target_type="order_album",
-            target_id=str(album.id),
-            details=json.dumps({"order_id": order_id, "name": payload.name}),
-            user_id=getattr(current_user, "id", None),
-        )
+    db.flush()
+
+    record_audit(
+        db,
+        "CREATE_ALBUM",
+        "order_album",
+        album.id,
+        details={"order_id": order_id, "name": payload.name},
+        user_id=getattr(current_user, "id", None),
+        actor_role=getattr(current_user, "role", None),
+        order_id=order_id,
+        mode=ASYNC,
     )
     db.commit()
     db.refresh(album)
@@ -130,9 +132,10 @@ def create_album(
 
 
 @router.get("/{order_id}/albums", response_model=List[AlbumOut])
+@query_budget(6)
 def list_albums(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: User = Depends(
         require_roles(
             "ADMIN_OPS",
@@ -162,10 +165,11 @@ def list_albums(
 
 
 @router.get("/{order_id}/albums/{album_id}", response_model=AlbumOut)
+@query_budget(6)
 def get_album(
     order_id: int,
     album_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _: User = Depends(
         require_roles(
             "ADMIN_OPS",
@@ -232,20 +236,16 @@ async def upload_album_image(
     db.add(image)
     db.flush()
 
-    db.add(
-        AuditLog(
-            action="UPLOAD_ALBUM_IMAGE",
-            target_type="album_image",
-            target_id=str(image.id),
-            details=json.dumps(
-                {
-                    "order_id": order_id,
-                    "album_id": album_id,
-                    "filename": fname,
-                }
-            ),
-            user_id=getattr(current_user, "id", None),
-        )
+    record_audit(
+        db,
+        "UPLOAD_ALBUM_IMAGE",
+        "album_image",
+        image.id,
+        details={"order_id": order_id, "album_id": album_id, "filename": fname},
+        user_id=getattr(current_user, "id", None),
+        actor_role=getattr(current_user, "role", None),
+        order_id=order_id,
+        mode=ASYNC,
     )
     db.commit()
     db.refresh(image)
@@ -271,16 +271,19 @@ def delete_album_image(
     if not image:
         raise HTTPException(status_code=404, detail="ไม่พบรูปภาพที่ระบุ")
 
-    db.add(
-        AuditLog(
-            action="DELETE_ALBUM_IMAGE",
-            target_type="album_image",
-            target_id=str(image_id),
-            details=json.dumps({"order_id": order_id, "album_id": album_id}),
-            user_id=getattr(current_user, "id", None),
-        )
-    )
     db.delete(image)
+
+    record_audit(
+        db,
+        "DELETE_ALBUM_IMAGE",
+        "album_image",
+        image_id,
+        details={"order_id": order_id, "album_id": album_id},
+        user_id=getattr(current_user, "id", None),
+        actor_role=getattr(current_user, "role", None),
+        order_id=order_id,
+        mode=ASYNC,
+    )
     db.commit()
 
 
@@ -294,14 +297,18 @@ def delete_album(
     """Admin_B ลบอัลบั้ม (และรูปภาพทั้งหมดในอัลบั้มนั้น)."""
     album = _get_album_or_404(album_id, order_id, db)
 
-    db.add(
-        AuditLog(
-            action="DELETE_ALBUM",
-            target_type="order_album",
-            target_id=str(album_id),
-            details=json.dumps({"order_id": order_id, "name": album.name}),
-            user_id=getattr(current_user, "id", None),
-        )
-    )
+    album_name = album.name
     db.delete(album)
+
+    record_audit(
+        db,
+        "DELETE_ALBUM",
+        "order_album",
+        album_id,
+        details={"order_id": order_id, "name": album_name},
+        user_id=getattr(current_user, "id", None),
+        actor_role=getattr(current_user, "role", None),
+        order_id=order_id,
+        mode=ASYNC,
+    )
     db.commit()
@@ -1,9 +1,16 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.core.query_budget import query_budget
 from app.models.customer import Customer
-from app.api.rbac import require_roles
+from app.models.order import Order
+from app.api.rbac import CLOSED_STATUSES, SETTLED_STATUSES, require_roles
+from app.core.customer_search import search_customer_ids
 from app.models.user import User
 from pydantic import BaseModel, ConfigDict, Field
 
@@ -30,11 +37,104 @@ class CustomerCreate(BaseModel):
 
 
 @router.get("/", response_model=List[CustomerSchema])
-def read_customers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@query_budget(3)
+def read_customers(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db)):
     # When the query is returned, Pydantic will use `validation_alias` to retrieve the `channel` value and pass it to `contact_channel`.
     return db.query(Customer).offset(skip).limit(limit).all()
 
 
+class ProductTypeCount(BaseModel):
+    product_type: str
+    order_count: int
+
+
+class CustomerSummary(BaseModel):
+    customer_id: int
+    name: str
+    order_count: int
+    cancelled_count: int
+    lifetime_value: Decimal
+    outstanding_balance: Decimal
+    last_order_at: Optional[datetime] = None
+    top_product_types: List[ProductTypeCount] = []
+
+
+@router.get("/search", response_model=List[CustomerSchema])
+@query_budget(5)
+def search_customers(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+):
+    """Autocomplete: top *limit* customers matching name, phone or customer_code."""
+    ids = search_customer_ids(db, q, limit)
+    if not ids:
+        return []
+    rows = {c.id: c for c in db.query(Customer).filter(Customer.id.in_(ids)).all()}
+    return [rows[i] for i in ids if i in rows]
+
+
+@router.get("/{customer_id}/summary", response_model=CustomerSummary)
+@query_budget(5)
+def customer_summary(
+    customer_id: int,
+    top: int = Query(3, ge=1, le=20),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_roles("SALES_ADMIN", "ADMIN_D", "ADMIN_OPS")),
+):
+    """Lifetime stats for one customer from a single grouped aggregate over orders.
+
+    The query groups by product type; the per-customer totals are the sums of
+    those groups, so counts, value, outstanding balance, last order date and
+    the top product types all come back in one round trip.
+    """
+    cust = db.query(Customer.id, Customer.name).filter(Customer.id == customer_id).first()
+    if not cust:
+        raise HTTPException(status_code=404, detail="Customer not found")
+
+    product_type = func.coalesce(Order.product_type, "shirt")
+    is_cancelled = Order.status.in_(CLOSED_STATUSES)
+    rows = (
+        db.query(
+            product_type.label("product_type"),
+            func.count(Order.id).label("orders"),
+            func.sum(case((is_cancelled, 1), else_=0)).label("cancelled"),
+            func.sum(
+                case((is_cancelled, 0), else_=func.coalesce(Order.grand_total, 0))
+            ).label("value"),
+            func.sum(
+                case(
+                    (Order.status.in_(SETTLED_STATUSES), 0),
+                    else_=func.coalesce(Order.balance_amount, 0),
+                )
+            ).label("outstanding"),
+            func.max(Order.created_at).label("last_order_at"),
+        )
+        .filter(Order.customer_id == customer_id)
+        .group_by(product_type)
+        .all()
+    )
+
+    def _dec(v) -> Decimal:
+        return Decimal(str(v or 0)).quantize(Decimal("0.01"))
+
+    ranked = sorted(rows, key=lambda r: (-r.orders, r.product_type))
+    last_dates = [r.last_order_at for r in rows if r.last_order_at]
+    return CustomerSummary(
+        customer_id=cust.id,
+        name=cust.name,
+        order_count=sum(r.orders for r in rows),
+        cancelled_count=sum(int(r.cancelled or 0) for r in rows),
+        lifetime_value=_dec(sum(_dec(r.value) for r in rows)),
+        outstanding_balance=_dec(sum(_dec(r.outstanding) for r in rows)),
+        last_order_at=max(last_dates) if last_dates else None,
+        top_product_types=[
+            ProductTypeCount(product_type=r.product_type, order_count=r.orders)
+            for r in ranked[:top]
+        ],
+    )
+
+
 @router.post("/", response_model=CustomerSchema)
 def create_customer(
     customer: CustomerCreate,
@@ -49,7 +149,12 @@ def create_customer(
         address=customer.address,
     )
     db.add(db_cust)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # name_key is unique: spelling variants of an existing name collide
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Customer already exists")
     db.refresh(db_cust)
     return db_cust
 
@@ -71,7 +176,13 @@ def update_customer(
     db_cust.channel = customer.contact_channel
     db_cust.address = customer.address
 
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=409, detail="Another customer already uses this name"
+        )
     db.refresh(db_cust)
     return db_cust
 
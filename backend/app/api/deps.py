@@ -8,6 +8,7 @@ from sqlalchemy.orm import Session
 
 from app.core import security
 from app.core.config import settings
+from app.core.request_metrics import timed_phase
 from app.db.session import get_db
 from app.models.user import User
 
@@ -22,7 +23,11 @@ logger = logging.getLogger(__name__)
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
 ) -> User:
+    with timed_phase("auth"):
+        return _authenticate(db, token)
 
+
+def _authenticate(db: Session, token: str) -> User:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -8,12 +8,14 @@ from fastapi import (
 )
 from fastapi import status
 from typing import Optional, Dict, Any
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 import asyncio
 import json
 from jose import jwt
 
-from app.db.session import SessionLocal, get_db
+from app.db.session import SessionLocal, get_db, get_read_db
+from app.core.query_budget import query_budget
 from app.models.notification import Notification
 from app.models.user import User
 from app.core.config import settings
@@ -89,15 +91,20 @@ def create_notification(
         db.rollback()
         raise
 
+    _push(user_id, n.id, ntype, message, payload, n.created_at)
+    return n
+
+
+def _push(user_id, nid, ntype, message, payload, created_at):
     # push via websocket if connected — safe from sync thread context
     try:
         loop = asyncio.get_event_loop()
         push_payload = {
-            "id": n.id,
-            "type": n.type,
-            "message": n.message,
+            "id": nid,
+            "type": ntype,
+            "message": message,
             "payload": payload,
-            "created_at": n.created_at.isoformat(),
+            "created_at": created_at.isoformat(),
         }
         if user_id:
             asyncio.run_coroutine_threadsafe(
@@ -109,28 +116,45 @@ def create_notification(
         # WebSocket push is best-effort; DB record already saved
         pass
 
-    return n
-
 
 def notify_roles(
     db: Session, roles: list, ntype: str, message: str, payload: Optional[Dict] = None
 ):
     # Normalize requested role names to canonical values so callers can pass
     # legacy aliases (e.g. 'SALES_ADMIN') or canonical names and both will work.
+    # One INSERT (executemany) and one commit for all recipients, not one
+    # commit per user.
     roles_norm = [rbac._normalize_role(r) for r in (roles or [])]
-    users = db.query(User).filter(User.role.in_(roles_norm)).all()
-    created = []
-    for u in users:
-        try:
-            created.append(create_notification(db, u.id, ntype, message, payload))
-        except Exception:
-            pass
-    return created
+    user_ids = [
+        uid for (uid,) in db.query(User.id).filter(User.role.in_(roles_norm)).order_by(User.id)
+    ]
+    if not user_ids:
+        return []
+    table = Notification.__table__
+    encoded = json.dumps(payload) if payload else None
+    try:
+        # user_id is returned so rows need not come back in parameter order
+        # (asking for that order makes SQLite insert row by row)
+        rows = db.execute(
+            insert(table).returning(table.c.id, table.c.user_id, table.c.created_at),
+            [
+                {"user_id": uid, "type": ntype, "message": message, "payload": encoded}
+                for uid in user_ids
+            ],
+        ).all()
+        db.commit()
+    except Exception:
+        db.rollback()
+        return []
+    for row in rows:
+        _push(row.user_id, row.id, ntype, message, payload, row.created_at)
+    return [row.id for row in rows]
 
 
 @router.get("", response_model=list)
+@query_budget(4)
 def list_notifications(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     unread_only: bool = Query(False),
 ):
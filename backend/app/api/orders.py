@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, tuple_
 from sqlalchemy.orm import Session, selectinload
-from typing import List, Optional, Literal
+from typing import Any, List, Optional, Literal
 from pydantic import BaseModel
 from decimal import Decimal
 import uuid
@@ -8,29 +10,37 @@ import json
 import logging
 import os
 from uuid import uuid4
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.core.query_budget import query_budget
 from app.models.order import Order as OrderModel, OrderItem as OrderItemModel
-from app.models.customer import Customer
 from app.models.user import User
-from app.models.product import NeckType
 from app.models.audit_log import AuditLog
 from app.api import deps
 from app.api.rbac import (
     require_roles,
     can_transition,
+    mask_log_details,
     mask_order_for_role,
     normalize_status,
+    is_masked_role,
+    MASKED_ORDER_FIELDS,
 )
 from app.schemas.order import OrderCreate, Order as OrderSchema
 from app.core.config import settings
 from app.core.storage import save_upload
-from app.core.pricing_constants import (
-    STEP_PRICING,
-    ADDON_PRICES,
-    DEFAULT_SLOPE_COST,
-    SPECIAL_SLOPE_NECKS,
-)
-from datetime import datetime, timedelta
+from app.core.order_numbers import insert_order
+from app.core.audit import ASYNC, record_audit
+from app.core.customers import upsert_customer
+from app.core.order_search import SEARCH_COLUMNS, search_order_ids
+from app.core.neck_resolver import resolve_neck
+from app.core.financials import order_financials
+from app.core.order_pricing import price_item
+from app.core.pricing_rules import rule_table
+from app.core.order_export import csv_chunks, export_rows, xlsx_chunks
+from app.core.order_import import ImportFormatError, import_orders, iter_rows
+from app.core.request_metrics import timed_phase
+from app.core.shipping import shipping_cost
+from datetime import date, datetime, timedelta
 from jose import jwt
 
 router = APIRouter()
@@ -39,11 +49,12 @@ logger = logging.getLogger(__name__)
 
 @router.get("", response_model=List[OrderSchema])
 @router.get("/", response_model=List[OrderSchema])
+@query_budget(6)
 def read_orders(
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(deps.get_current_user),
 ):
     query = (
@@ -56,209 +67,243 @@ def read_orders(
     orders = query.offset(skip).limit(limit).all()
 
     results = []
-    for o in orders:
-        o_dict = o.__dict__.copy()
-        # Normalize decimal-like fields to Decimal to satisfy Pydantic serializers
-        DECIMAL_FIELDS = [
-            "advance_hold",
-            "shipping_cost",
-            "add_on_cost",
-            "sizing_surcharge",
-            "add_on_options_total",
-            "design_fee",
-            "discount_value",
-            "discount_amount",
-            "deposit_amount",
-            "deposit_1",
-            "deposit_2",
-            "vat_amount",
-            "grand_total",
-            "balance_amount",
-            "total_cost",
-            "estimated_profit",
-        ]
-        for k in DECIMAL_FIELDS:
-            if k in o_dict:
-                v = o_dict.get(k)
-                if v is None:
-                    continue
-                if not isinstance(v, Decimal):
-                    try:
-                        o_dict[k] = Decimal(str(v))
-                    except Exception:
-                        # leave as-is on failure
-                        pass
-        if o.customer:
-            o_dict.update(
-                {
-                    "customer_name": o.customer.name,
-                    "phone": o.customer.phone,
-                    "contact_channel": o.customer.channel,
-                    "address": o.customer.address,
-                }
-            )
-        if o.items:
-            items_list = []
-            for i in o.items:
-                i_dict = i.__dict__.copy()
-                for k in ["quantity_matrix", "selected_add_ons"]:
-                    val = i_dict.get(k)
-                    if isinstance(val, str):
-                        try:
-                            i_dict[k] = json.loads(val)
-                        except:
-                            i_dict[k] = {} if k == "quantity_matrix" else []
-                    elif val is None:
-                        i_dict[k] = {} if k == "quantity_matrix" else []
-                i_dict["is_oversize"] = bool(i_dict.get("is_oversize", False))
-                # Normalize numeric fields in item to Decimal where appropriate
-                ITEM_DECIMAL_FIELDS = [
-                    "base_price",
-                    "price_per_unit",
-                    "cost_per_unit",
-                    "total_price",
-                    "total_cost",
-                    "total_qty",
-                    "item_addon_total",
-                ]
-                for fk in ITEM_DECIMAL_FIELDS:
-                    if fk in i_dict:
-                        vv = i_dict.get(fk)
-                        if vv is None:
-                            continue
-                        if not isinstance(vv, Decimal):
-                            try:
-                                i_dict[fk] = Decimal(str(vv))
-                            except Exception:
-                                pass
-                items_list.append(i_dict)
-            o_dict["items"] = items_list
-        # Apply per-role masking when a current_user is present
-        try:
-            masked = mask_order_for_role(o_dict, getattr(current_user, "role", None))
-        except Exception:
-            masked = o_dict
-        results.append(masked)
+    with timed_phase("serialize"):
+        for o in orders:
+            o_dict = _serialize_order(o)
+            # Apply per-role masking when a current_user is present
+            try:
+                masked = mask_order_for_role(
+                    o_dict, getattr(current_user, "role", None)
+                )
+            except Exception:
+                masked = o_dict
+            results.append(masked)
     return results
 
 
-def calculate_item_price(item, order_prod_type, db: Session):
-    qty = sum(item.quantity_matrix.values()) if item.quantity_matrix else 0
-    p_type = getattr(item, "product_type", None) or order_prod_type or "shirt"
-
-    # 1. Base Price
-    if p_type == "sportsPants":
-        unit_price = STEP_PRICING["sportsPants"]
-    elif p_type == "fashionPants":
-        unit_price = STEP_PRICING["fashionPants"]
-    else:
-        neck_str = (item.neck_type or "").strip()
-        is_round_v = "ปก" not in neck_str and any(
-            k in neck_str for k in ["คอกลม", "คอวี"]
-        )
-        table = (
-            STEP_PRICING["roundVNeck"] if is_round_v else STEP_PRICING["collarOthers"]
-        )
-        if qty >= 10:
-            found = next(
-                (t for t in table if qty >= t["min_qty"] and qty <= t["max_qty"]), None
+@router.get("/search", response_model=List[OrderSchema])
+@query_budget(8)
+def search_orders(
+    q: str,
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """Full-text search over order_no, customer, brand, codes, tracking and note.
+
+    Results are ranked best match first. Roles that cannot see masked fields
+    only match on the columns visible to them.
+    """
+    role = getattr(current_user, "role", None)
+    columns = SEARCH_COLUMNS
+    if is_masked_role(role):
+        columns = tuple(c for c in SEARCH_COLUMNS if c not in MASKED_ORDER_FIELDS)
+    ids = search_order_ids(db, q, skip=skip, limit=min(limit, 100), columns=columns)
+    if not ids:
+        return []
+    orders = (
+        db.query(OrderModel)
+        .options(selectinload(OrderModel.customer), selectinload(OrderModel.items))
+        .filter(OrderModel.id.in_(ids))
+        .all()
+    )
+    rank = {oid: pos for pos, oid in enumerate(ids)}
+    orders.sort(key=lambda o: rank[o.id])
+    with timed_phase("serialize"):
+        return [mask_order_for_role(_serialize_order(o), role) for o in orders]
+
+
+@router.get("/export")
+def export_orders(
+    format: Literal["csv", "xlsx"] = "csv",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """Stream orders created in [from, to] as CSV or XLSX, one row per item.
+
+    Rows are read with yield_per on a session of their own (the request's
+    session is closed before the body is streamed) and masked for the
+    caller's role like the order API. See app.core.order_export.
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    role = getattr(current_user, "role", None)
+    bind = db.get_bind()
+
+    def rows():
+        export_db = Session(bind=bind)
+        try:
+            yield from export_rows(
+                export_db, lambda o: mask_order_for_role(o, role), date_from, date_to
             )
-            unit_price = found["price"] if found else table[0]["price"]
-        else:
-            unit_price = Decimal(240) if is_round_v else Decimal(300)
-
-    # 2. Addon Price (DB Sync)
-    neck_str = (item.neck_type or "").strip()
-    selected = getattr(item, "selected_add_ons", []) or []
-
-    # Retrieving prices from the database.
-    db_neck = db.query(NeckType).filter(NeckType.name == neck_str).first()
-    # Use truthy check: Decimal("0") is the SQLAlchemy column default and means
-    # "not configured" — fall back to DEFAULT_SLOPE_COST in that case.
-    _ac = db_neck.additional_cost if db_neck else None
-    try:
-        slope_price_db = Decimal(_ac) if _ac else DEFAULT_SLOPE_COST
-    except Exception:
-        slope_price_db = DEFAULT_SLOPE_COST
+        finally:
+            export_db.close()
 
-    is_special_340 = any(k in neck_str for k in SPECIAL_SLOPE_NECKS)
+    if format == "xlsx":
+        chunks = xlsx_chunks(rows())
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        chunks = csv_chunks(rows())
+        media_type = "text/csv; charset=utf-8"
+    span = "_".join(d.isoformat() for d in (date_from, date_to) if d) or "all"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders_{span}.{format}"'},
+    )
 
-    # Treat slope as an add-on: add slopeShoulder when neck requires it (by name or DB flag)
-    if "(บังคับไหล่สโลป" in neck_str or (
-        db_neck and getattr(db_neck, "force_slope", False)
-    ):
-        if "slopeShoulder" not in selected:
-            selected = list(selected) + ["slopeShoulder"]
 
-    # Do not auto-add collarTongue for the special forced-slope necks (tongue is shown but not charged)
-    if "มีลิ้น" in neck_str and not is_special_340 and "collarTongue" not in selected:
-        selected = list(selected) + ["collarTongue"]
+@router.post("/import")
+def import_orders_file(
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles("SALES_ADMIN", "ADMIN_D", "ADMIN_OPS")),
+):
+    """Create orders from a CSV / XLSX file (one row per item).
 
-    if getattr(item, "is_oversize", False) and "oversizeSlopeShoulder" not in selected:
-        selected = list(selected) + ["oversizeSlopeShoulder"]
+    Invalid orders are rejected individually with row-level errors; with
+    ``dry_run`` nothing is written. See app.core.order_import.
+    """
+    try:
+        report = import_orders(
+            db,
+            iter_rows(file.file, file.filename),
+            user_id=current_user.id,
+            actor_role=getattr(current_user, "role", None),
+            dry_run=dry_run,
+            source=file.filename,
+        )
+    except ImportFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return report.as_dict()
+
+
+_ORDER_DECIMAL_FIELDS = [
+    "advance_hold",
+    "shipping_cost",
+    "add_on_cost",
+    "sizing_surcharge",
+    "add_on_options_total",
+    "design_fee",
+    "discount_value",
+    "discount_amount",
+    "deposit_amount",
+    "deposit_1",
+    "deposit_2",
+    "vat_amount",
+    "grand_total",
+    "balance_amount",
+    "total_cost",
+    "estimated_profit",
+]
+
+_ITEM_DECIMAL_FIELDS = [
+    "base_price",
+    "price_per_unit",
+    "cost_per_unit",
+    "total_price",
+    "total_cost",
+    "total_qty",
+    "item_addon_total",
+]
+
+
+def _to_decimals(d: dict, fields: List[str]) -> None:
+    # Normalize decimal-like fields to Decimal to satisfy Pydantic serializers
+    for k in fields:
+        if k in d:
+            v = d.get(k)
+            if v is None:
+                continue
+            if not isinstance(v, Decimal):
+                try:
+                    d[k] = Decimal(str(v))
+                except Exception:
+                    # leave as-is on failure
+                    pass
 
-    # Calculate Addon Total
-    addon_sum = Decimal(0)
-    for code in selected:
-        cost = ADDON_PRICES.get(code, Decimal(0))
-        if code == "slopeShoulder":
-            cost = slope_price_db
-        addon_sum += cost
 
-    total_addon_line = addon_sum * qty
-    line_total = (unit_price * qty) + total_addon_line
-    line_cost = Decimal(str(item.cost_per_unit or 0)) * qty
+def _serialize_order(o: OrderModel) -> dict:
+    """Flatten an Order (customer + items preloaded) into the API dict shape."""
+    o_dict = o.__dict__.copy()
+    _to_decimals(o_dict, _ORDER_DECIMAL_FIELDS)
+    if o.customer:
+        o_dict.update(
+            {
+                "customer_name": o.customer.name,
+                "phone": o.customer.phone,
+                "contact_channel": o.customer.channel,
+                "address": o.customer.address,
+            }
+        )
+    if o.items:
+        items_list = []
+        for i in o.items:
+            i_dict = i.__dict__.copy()
+            for k in ["quantity_matrix", "selected_add_ons"]:
+                val = i_dict.get(k)
+                if isinstance(val, str):
+                    try:
+                        i_dict[k] = json.loads(val)
+                    except:
+                        i_dict[k] = {} if k == "quantity_matrix" else []
+                elif val is None:
+                    i_dict[k] = {} if k == "quantity_matrix" else []
+            i_dict["is_oversize"] = bool(i_dict.get("is_oversize", False))
+            _to_decimals(i_dict, _ITEM_DECIMAL_FIELDS)
+            items_list.append(i_dict)
+        o_dict["items"] = items_list
+    return o_dict
 
-    return {
-        "unit_price": unit_price,
-        "line_total": line_total,
-        "line_cost": line_cost,
-        "selected": selected,
-        "addon_total": total_addon_line,
-    }
+
+def calculate_item_price(item, order_prod_type, db: Session):
+    # same tolerant neck matching as POST /pricing/calc
+    return price_item(
+        item, order_prod_type, resolve_neck(db, item.neck_type), rule_table(db)
+    )
+
+
+def _order_shipping(db: Session, order_in, total_qty: int):
+    # the client's shipping_cost; when omitted, priced the way POST /pricing/calc does
+    if "shipping_cost" in order_in.model_fields_set:
+        return order_in.shipping_cost
+    return shipping_cost(db, total_qty)
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
 @router.post("/", status_code=status.HTTP_201_CREATED)
+@query_budget(18)
 def create_order(
     order_in: OrderCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_roles("SALES_ADMIN", "ADMIN_D", "ADMIN_OPS")),
 ):
     clean_name = order_in.customer_name.strip() if order_in.customer_name else "Unknown"
-    customer = db.query(Customer).filter(Customer.name == clean_name).first()
-    if not customer:
-        customer = Customer(
-            name=clean_name,
-            phone=order_in.phone,
-            channel=order_in.contact_channel,
-            address=order_in.address,
-            customer_code=order_in.customer_code,
-        )
-        db.add(customer)
-        db.flush()
-    else:
-        customer.phone = order_in.phone
-        customer.address = order_in.address
-        db.add(customer)
-        db.flush()
+    customer = upsert_customer(
+        db,
+        clean_name,
+        phone=order_in.phone,
+        channel=order_in.contact_channel,
+        address=order_in.address,
+        customer_code=order_in.customer_code,
+        update_fields=("phone", "address"),
+    )
 
-    items_total_price = Decimal(0)
-    items_total_cost = Decimal(0)
     order_items_data = []
 
     for item in order_in.items:
         qty = sum(item.quantity_matrix.values()) if item.quantity_matrix else 0
         calc = calculate_item_price(item, order_in.product_type, db)
-
-        items_total_price += calc["line_total"]
-        items_total_cost += calc["line_cost"]
         item.selected_add_ons = calc["selected"]
-
         order_items_data.append(
             {
                 "data": item,
                 "qty": qty,
+                "calc": calc,
                 "base": calc["unit_price"],
                 "total": calc["line_total"],
                 "cost": calc["line_cost"],
@@ -266,101 +311,69 @@ def create_order(
             }
         )
 
-    shipping = Decimal(str(order_in.shipping_cost or 0))
-    manual_addon = Decimal(str(order_in.add_on_cost or 0))
-    discount = Decimal(str(order_in.discount_amount or 0))
+    money = order_financials(
+        [d["calc"] for d in order_items_data],
+        shipping_cost=_order_shipping(db, order_in, sum(d["qty"] for d in order_items_data)),
+        add_on_cost=order_in.add_on_cost,
+        discount_amount=order_in.discount_amount,
+        is_vat_included=order_in.is_vat_included,
+        deposit_1=order_in.deposit_1,
+        deposit_2=order_in.deposit_2,
+    )
     design_fee = Decimal(str(order_in.design_fee or 0))
-    item_addons_grand = sum(x["addon_total"] for x in order_items_data)
-
-    # Guard: if manual addon equals computed addons, treat manual as 0 to avoid double-charging
-    try:
-        if manual_addon == Decimal(item_addons_grand):
-            manual_addon = Decimal(0)
-    except Exception:
-        pass
-
-    final_pre_vat = items_total_price + manual_addon + shipping - discount
-    # VAT handling: support both VAT-included and VAT-excluded consistently
-    if order_in.is_vat_included:
-        # final_pre_vat already includes VAT. Extract the VAT portion.
-        vat = (final_pre_vat * Decimal("7")) / Decimal("107")
-        vat = vat.quantize(Decimal("0.01"))
-        grand_total = final_pre_vat.quantize(Decimal("0.01"))
-    else:
-        vat = (final_pre_vat * Decimal("0.07")).quantize(Decimal("0.01"))
-        grand_total = (final_pre_vat + vat).quantize(Decimal("0.01"))
-
-    # Determine a unique order_no. If client supplied one and it's taken,
-    # auto-suffix with -1, -2, ... instead of returning a 500/400.
-    final_order_no = None
-    if order_in.order_no:
-        base_no = order_in.order_no.strip()
-        if not base_no:
-            base_no = f"PO-{uuid.uuid4().hex[:6].upper()}"
-        candidate = base_no
-        suffix = 1
-        # Try simple suffixing up to a reasonable limit to avoid infinite loops.
-        while db.query(OrderModel).filter(OrderModel.order_no == candidate).first():
-            candidate = f"{base_no}-{suffix}"
-            suffix += 1
-            if suffix > 1000:
-                # Fallback to generated PO id if something strange happens
-                candidate = f"PO-{uuid.uuid4().hex[:8].upper()}"
-                break
-        final_order_no = candidate
-    else:
-        final_order_no = f"PO-{uuid.uuid4().hex[:6].upper()}"
 
     new_order = OrderModel(
-        order_no=final_order_no,
         # Public UUID used for customer payment link
         order_uuid=uuid.uuid4().hex,
         customer_id=customer.id,
         customer_name=clean_name,
+        # the schema defaults brand to "BG"; store only a brand the client sent
+        brand=order_in.brand if "brand" in order_in.model_fields_set else None,
+        customer_code=order_in.customer_code,
+        graphic_code=order_in.graphic_code,
+        product_type=order_in.product_type,
         contact_channel=customer.channel,
         address=order_in.address,
         phone=order_in.phone,
         status=normalize_status(order_in.status) or "WAITING_BOOKING",
-        grand_total=grand_total,
-        total_cost=items_total_cost,
-        vat_amount=vat,
-        shipping_cost=shipping,
-        add_on_cost=manual_addon,
-        add_on_options_total=item_addons_grand,
+        **money.columns(),
         design_fee=design_fee,
-        discount_amount=discount,
         is_vat_included=order_in.is_vat_included,
         deadline=order_in.deadline,
         usage_date=order_in.usage_date,
         deposit_amount=order_in.deposit_amount,
         deposit_1=order_in.deposit_1,
         deposit_2=order_in.deposit_2,
-        balance_amount=grand_total
-        - (order_in.deposit_1 or 0)
-        - (order_in.deposit_2 or 0),
         note=order_in.note,
         created_by_id=current_user.id if current_user else None,
     )
-    db.add(new_order)
-    db.flush()
-
-    for d in order_items_data:
-        src = d["data"]
-        ni = OrderItemModel(
-            order_id=new_order.id,
-            product_name=src.product_name,
-            fabric_type=src.fabric_type,
-            neck_type=src.neck_type,
-            sleeve_type=src.sleeve_type,
-            quantity_matrix=json.dumps(src.quantity_matrix),
-            total_qty=d["qty"],
-            price_per_unit=d["base"],
-            total_price=d["total"],
-            total_cost=d["cost"],
-            selected_add_ons=json.dumps(src.selected_add_ons),
-            item_addon_total=d["addon_total"],
+    # Determine a unique order_no from the sequence table. A client-supplied
+    # number is kept when free, otherwise it is auto-suffixed (-1, -2, ...).
+    insert_order(db, new_order, order_in.order_no)
+
+    # one executemany INSERT whatever the number of items
+    if order_items_data:
+        db.execute(
+            insert(OrderItemModel),
+            [
+                {
+                    "order_id": new_order.id,
+                    "product_name": d["data"].product_name,
+                    "fabric_type": d["data"].fabric_type,
+                    "neck_type": d["data"].neck_type,
+                    "sleeve_type": d["data"].sleeve_type,
+                    "quantity_matrix": json.dumps(d["data"].quantity_matrix),
+                    "total_qty": d["qty"],
+                    "price_per_unit": d["base"],
+                    "total_price": d["total"],
+                    "total_cost": d["cost"],
+                    "selected_add_ons": json.dumps(d["data"].selected_add_ons),
+                    "auto_add_ons": json.dumps(d["calc"]["auto"]),
+                    "item_addon_total": d["addon_total"],
+                }
+                for d in order_items_data
+            ],
         )
-        db.add(ni)
 
     db.commit()
     db.refresh(new_order)
@@ -386,10 +399,8 @@ def update_order(
         db.commit()
         db.refresh(existing)
 
-    # Sync / find customer (same logic as create_order)
     clean_name = order_in.customer_name.strip() if order_in.customer_name else "Unknown"
-    customer = db.query(Customer).filter(Customer.name == clean_name).first()
-    
+
     # ── Audit Log: Snapshot BEFORE changes ──────────────────────────────────
     def _snapshot(o, cust=None):
         return {
@@ -406,22 +417,16 @@ def update_order(
         }
     old_snapshot = _snapshot(existing)
 
-    if not customer:
-        customer = Customer(
-            name=clean_name,
-            phone=order_in.phone,
-            channel=order_in.contact_channel,
-            address=order_in.address,
-            customer_code=order_in.customer_code,
-        )
-        db.add(customer)
-        db.flush()
-    else:
-        # update contact fields from payload
-        customer.phone = order_in.phone
-        customer.channel = order_in.contact_channel
-        customer.address = order_in.address
-        db.add(customer)
+    # Sync / find customer (same upsert as create_order, also refreshing channel)
+    customer = upsert_customer(
+        db,
+        clean_name,
+        phone=order_in.phone,
+        channel=order_in.contact_channel,
+        address=order_in.address,
+        customer_code=order_in.customer_code,
+        update_fields=("phone", "channel", "address"),
+    )
 
     # Decide whether items actually changed. If incoming items are identical to
     # existing saved items (by product attributes + quantities + add-ons),
@@ -478,8 +483,6 @@ def update_order(
     incoming_keys = [_normalize_item_for_compare(it) for it in order_in.items]
     existing_keys = [ei["key"] for ei in existing_items]
 
-    items_total_price = Decimal(0)
-    items_total_cost = Decimal(0)
     order_items_data = []
 
     # If lengths match and all incoming keys match existing keys in order, preserve pricing
@@ -506,8 +509,6 @@ def update_order(
                     "addon_total": ei["item_addon_total"],
                 }
             )
-            items_total_price += ei["total_price"]
-            items_total_cost += ei["total_cost"]
     else:
         # In-place update strategy:
         # - Match incoming items to existing OrderItem rows by identity (product attrs + qty matrix + add-ons + oversize)
@@ -567,9 +568,6 @@ def update_order(
                 total_cost = Decimal(str(ei.total_cost or 0))
                 addon_total = Decimal(str(ei.item_addon_total or 0))
 
-                items_total_price += total_price
-                items_total_cost += total_cost
-
                 # ensure selected_add_ons on payload matches stored selection
                 try:
                     item.selected_add_ons = (
@@ -611,6 +609,7 @@ def update_order(
                     line_total = provided_total
                     line_cost = Decimal(str(getattr(item, "total_cost", 0) or 0))
                     selected = getattr(item, "selected_add_ons", []) or []
+                    auto = None
                     addon_total = Decimal(
                         str(getattr(item, "item_addon_total", 0) or 0)
                     )
@@ -620,10 +619,9 @@ def update_order(
                     line_total = calc["line_total"]
                     line_cost = calc["line_cost"]
                     selected = calc["selected"]
+                    auto = json.dumps(calc["auto"])
                     addon_total = calc["addon_total"]
 
-                items_total_price += line_total
-                items_total_cost += line_cost
                 # synchronize selected_add_ons back to payload object
                 item.selected_add_ons = selected
 
@@ -639,6 +637,7 @@ def update_order(
                     total_price=line_total,
                     total_cost=line_cost,
                     selected_add_ons=json.dumps(item.selected_add_ons or []),
+                    auto_add_ons=auto,
                     item_addon_total=addon_total,
                 )
                 db.add(ni)
@@ -676,53 +675,40 @@ def update_order(
         except Exception:
             pass
 
-    shipping = Decimal(str(order_in.shipping_cost or 0))
-    manual_addon = Decimal(str(order_in.add_on_cost or 0))
-    discount = Decimal(str(order_in.discount_amount or 0))
-    design_fee = Decimal(str(order_in.design_fee or 0))
-    item_addons_grand = sum(x["addon_total"] for x in order_items_data)
-
-    # Guard: if manual addon equals computed addons, treat manual as 0 to avoid double-charging
-    try:
-        if manual_addon == Decimal(item_addons_grand):
-            manual_addon = Decimal(0)
-    except Exception:
-        pass
-
-    final_pre_vat = items_total_price + manual_addon + shipping - discount
-    # VAT handling must match create_order logic
-    if order_in.is_vat_included:
-        vat = (final_pre_vat * Decimal("7")) / Decimal("107")
-        vat = vat.quantize(Decimal("0.01"))
-        grand_total = final_pre_vat.quantize(Decimal("0.01"))
-    else:
-        vat = (final_pre_vat * Decimal("0.07")).quantize(Decimal("0.01"))
-        grand_total = (final_pre_vat + vat).quantize(Decimal("0.01"))
+    money = order_financials(
+        [
+            {"line_total": x["total"], "line_cost": x["cost"], "addon_total": x["addon_total"]}
+            for x in order_items_data
+        ],
+        shipping_cost=_order_shipping(db, order_in, sum(x["qty"] for x in order_items_data)),
+        add_on_cost=order_in.add_on_cost,
+        discount_amount=order_in.discount_amount,
+        is_vat_included=order_in.is_vat_included,
+        deposit_1=order_in.deposit_1,
+        deposit_2=order_in.deposit_2,
+    )
 
     # Update existing order fields (preserve order_no)
     existing.customer_id = customer.id
     existing.customer_name = clean_name
+    if "brand" in order_in.model_fields_set:
+        existing.brand = order_in.brand
+    existing.customer_code = order_in.customer_code
+    existing.graphic_code = order_in.graphic_code
+    existing.product_type = order_in.product_type or existing.product_type
     existing.contact_channel = customer.channel
     existing.address = order_in.address
     existing.phone = order_in.phone
     existing.status = normalize_status(order_in.status) or existing.status
-    existing.grand_total = grand_total
-    existing.total_cost = items_total_cost
-    existing.vat_amount = vat
-    existing.shipping_cost = shipping
-    existing.add_on_cost = manual_addon
-    existing.add_on_options_total = Decimal(item_addons_grand)
-    existing.design_fee = design_fee
-    existing.discount_amount = discount
+    for name, value in money.columns().items():
+        setattr(existing, name, value)
+    existing.design_fee = Decimal(str(order_in.design_fee or 0))
     existing.is_vat_included = order_in.is_vat_included
     existing.deadline = order_in.deadline
     existing.usage_date = order_in.usage_date
     existing.deposit_amount = order_in.deposit_amount
     existing.deposit_1 = order_in.deposit_1
     existing.deposit_2 = order_in.deposit_2
-    existing.balance_amount = (
-        grand_total - (order_in.deposit_1 or 0) - (order_in.deposit_2 or 0)
-    )
     existing.note = order_in.note
     existing.created_by_id = current_user.id if current_user else existing.created_by_id
 
@@ -738,14 +724,15 @@ def update_order(
             changes[k] = {"from": old_val, "to": new_val}
     
     if changes:
-        audit = AuditLog(
-            action="UPDATE_ORDER",
-            target_type="order",
-            target_id=str(existing.id),
-            details=json.dumps({"changes": changes}),
+        record_audit(
+            db,
+            "UPDATE_ORDER",
+            "order",
+            existing.id,
+            details={"changes": changes},
             user_id=getattr(current_user, "id", None),
+            actor_role=getattr(current_user, "role", None),
         )
-        db.add(audit)
 
     # Items have been updated/created above in-place; order_items_data contains
     # the canonical per-item totals used to compute order-level totals.
@@ -769,15 +756,122 @@ def delete_order(
     return
 
 
-@router.get("/{order_id}/logs")
-def get_logs(order_id: int):
-    return []
+class OrderLogEntry(BaseModel):
+    id: int
+    action: str
+    target_type: Optional[str] = None
+    target_id: Optional[str] = None
+    details: Any = None
+    from_status: Optional[str] = None
+    to_status: Optional[str] = None
+    amount: Optional[Decimal] = None
+    actor_role: Optional[str] = None
+    user_id: Optional[int] = None
+    user_name: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class OrderLogPage(BaseModel):
+    items: List[OrderLogEntry]
+    next_before: Optional[int] = None
+
+
+def _decode_details(raw: Optional[str]) -> Any:
+    if not raw:
+        return raw
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def _log_details(row, masked: bool):
+    details = row.payload if row.payload is not None else _decode_details(row.details)
+    return mask_log_details(details) if masked else details
+
+
+@router.get("/{order_id}/logs", response_model=OrderLogPage)
+@query_budget(4)
+def get_logs(
+    order_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[int] = Query(None, description="log id cursor: older entries"),
+    since: Optional[int] = Query(None, description="log id cursor: newer entries"),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(deps.get_current_user),
+):
+    """Audit timeline of one order, newest first.
+
+    Served from the (order_id, created_at) index with the user names joined
+    in the same query. Page back with ``before=<next_before>``; poll for new
+    entries with ``since=<id of the newest entry seen>``. Roles that see
+    masked orders get the entries without the masked fields and amounts.
+    """
+    query = (
+        db.query(
+            AuditLog.id,
+            AuditLog.action,
+            AuditLog.target_type,
+            AuditLog.target_id,
+            AuditLog.details,
+            AuditLog.payload,
+            AuditLog.from_status,
+            AuditLog.to_status,
+            AuditLog.amount,
+            AuditLog.actor_role,
+            AuditLog.user_id,
+            AuditLog.created_at,
+            User.full_name,
+            User.username,
+        )
+        .outerjoin(User, User.id == AuditLog.user_id)
+        .filter(AuditLog.order_id == order_id)
+    )
+    if since is not None:
+        query = query.filter(AuditLog.id > since)
+    if before is not None:
+        cursor = db.query(AuditLog.created_at, AuditLog.id).filter(AuditLog.id == before).first()
+        if cursor is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(
+            tuple_(AuditLog.created_at, AuditLog.id) < tuple_(cursor.created_at, cursor.id)
+        )
+    rows = (
+        query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    if not rows and not db.query(OrderModel.id).filter(OrderModel.id == order_id).first():
+        raise HTTPException(status_code=404, detail="Order not found")
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    masked = is_masked_role(getattr(current_user, "role", None))
+    with timed_phase("serialize"):
+        items = [
+            OrderLogEntry(
+                id=r.id,
+                action=r.action,
+                target_type=r.target_type,
+                target_id=r.target_id,
+                details=_log_details(r, masked),
+                from_status=r.from_status,
+                to_status=r.to_status,
+                amount=None if masked else r.amount,
+                actor_role=r.actor_role,
+                user_id=r.user_id,
+                user_name=r.full_name or r.username,
+                created_at=r.created_at,
+            )
+            for r in rows
+        ]
+    return OrderLogPage(items=items, next_before=rows[-1].id if has_more else None)
 
 
 @router.get("/{order_id}")
+@query_budget(6)
 def read_order(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(deps.get_current_user),
 ):
     o = (
@@ -789,85 +883,12 @@ def read_order(
     if not o:
         raise HTTPException(status_code=404, detail="Order not found")
 
-    o_dict = o.__dict__.copy()
-    if o.customer:
-        o_dict.update(
-            {
-                "customer_name": o.customer.name,
-                "phone": o.customer.phone,
-                "contact_channel": o.customer.channel,
-                "address": o.customer.address,
-            }
-        )
-    if o.items:
-        items_list = []
-        for i in o.items:
-            i_dict = i.__dict__.copy()
-            for k in ["quantity_matrix", "selected_add_ons"]:
-                val = i_dict.get(k)
-                if isinstance(val, str):
-                    try:
-                        i_dict[k] = json.loads(val)
-                    except:
-                        i_dict[k] = {} if k == "quantity_matrix" else []
-                elif val is None:
-                    i_dict[k] = {} if k == "quantity_matrix" else []
-            i_dict["is_oversize"] = bool(i_dict.get("is_oversize", False))
-            # Normalize numeric fields in item to Decimal where appropriate
-            ITEM_DECIMAL_FIELDS = [
-                "base_price",
-                "price_per_unit",
-                "cost_per_unit",
-                "total_price",
-                "total_cost",
-                "total_qty",
-                "item_addon_total",
-            ]
-            for fk in ITEM_DECIMAL_FIELDS:
-                if fk in i_dict:
-                    vv = i_dict.get(fk)
-                    if vv is None:
-                        continue
-                    if not isinstance(vv, Decimal):
-                        try:
-                            i_dict[fk] = Decimal(str(vv))
-                        except Exception:
-                            pass
-            items_list.append(i_dict)
-        o_dict["items"] = items_list
-    # Normalize decimal-like fields to Decimal to satisfy Pydantic serializers
-    DECIMAL_FIELDS = [
-        "advance_hold",
-        "shipping_cost",
-        "add_on_cost",
-        "sizing_surcharge",
-        "add_on_options_total",
-        "design_fee",
-        "discount_value",
-        "discount_amount",
-        "deposit_amount",
-        "deposit_1",
-        "deposit_2",
-        "vat_amount",
-        "grand_total",
-        "balance_amount",
-        "total_cost",
-        "estimated_profit",
-    ]
-    for k in DECIMAL_FIELDS:
-        if k in o_dict:
-            v = o_dict.get(k)
-            if v is None:
-                continue
-            if not isinstance(v, Decimal):
-                try:
-                    o_dict[k] = Decimal(str(v))
-                except Exception:
-                    pass
-    try:
-        return mask_order_for_role(o_dict, getattr(current_user, "role", None))
-    except Exception:
-        return o_dict
+    with timed_phase("serialize"):
+        o_dict = _serialize_order(o)
+        try:
+            return mask_order_for_role(o_dict, getattr(current_user, "role", None))
+        except Exception:
+            return o_dict
 
 
 @router.put("/{order_id}/mockups")
@@ -967,14 +988,15 @@ async def upload_artwork(
             order.status = "WAITING_CUSTOMER_APPROVAL"
 
         db.add(order)
-        audit = AuditLog(
-            action="UPLOAD_ARTWORK",
-            target_type="order",
-            target_id=str(order.id),
-            details=json.dumps({"url": url}),
+        record_audit(
+            db,
+            "UPLOAD_ARTWORK",
+            "order",
+            order.id,
+            details={"url": url},
             user_id=getattr(uploader, "id", None),
+            actor_role=getattr(uploader, "role", None),
         )
-        db.add(audit)
         db.commit()
         db.refresh(order)
         # Notify Sales/Admin Ops that artwork uploaded
@@ -1019,14 +1041,16 @@ def issue_production_ticket(
     order.production_ticket_issued = True
     order.status = "READY_FOR_PRODUCTION"
     db.add(order)
-    audit = AuditLog(
-        action="ISSUE_PRODUCTION_TICKET",
-        target_type="order",
-        target_id=str(order.id),
-        details=json.dumps(payload or {}),
+    record_audit(
+        db,
+        "ISSUE_PRODUCTION_TICKET",
+        "order",
+        order.id,
+        details=payload or {},
+        to_status=order.status,
         user_id=getattr(actor, "id", None),
+        actor_role=getattr(actor, "role", None),
     )
-    db.add(audit)
     db.commit()
     db.refresh(order)
     # Notify Production team that order is READY_FOR_PRODUCTION
@@ -1081,14 +1105,15 @@ async def upload_print_file(
             order.status = "IN_PRODUCTION"
 
         db.add(order)
-        audit = AuditLog(
-            action="UPLOAD_PRINT_FILE",
-            target_type="order",
-            target_id=str(order.id),
-            details=json.dumps({"url": url}),
+        record_audit(
+            db,
+            "UPLOAD_PRINT_FILE",
+            "order",
+            order.id,
+            details={"url": url},
             user_id=getattr(actor, "id", None),
+            actor_role=getattr(actor, "role", None),
         )
-        db.add(audit)
         db.commit()
         db.refresh(order)
         # Notify Production team that print file uploaded and IN_PRODUCTION
@@ -1129,16 +1154,15 @@ def production_step(
         raise HTTPException(status_code=404, detail="Order not found")
 
     # Record production step in audit log
-    audit = AuditLog(
-        action="PRODUCTION_STEP",
-        target_type="order",
-        target_id=str(order.id),
-        details=json.dumps(
-            {"step": payload.step, "done": payload.done, "note": payload.note}
-        ),
+    record_audit(
+        db,
+        "PRODUCTION_STEP",
+        "order",
+        order.id,
+        details={"step": payload.step, "done": payload.done, "note": payload.note},
         user_id=getattr(actor, "id", None),
+        actor_role=getattr(actor, "role", None),
     )
-    db.add(audit)
     # Ensure status at least IN_PRODUCTION
     if payload.done and can_transition(
         order.status, "IN_PRODUCTION", getattr(actor, "role", None)
@@ -1180,14 +1204,16 @@ def qc_result(
 
     order.status = target
     db.add(order)
-    audit = AuditLog(
-        action=("QC_PASS" if payload.passed else "QC_FAIL"),
-        target_type="order",
-        target_id=str(order.id),
-        details=json.dumps({"note": payload.note}),
+    record_audit(
+        db,
+        ("QC_PASS" if payload.passed else "QC_FAIL"),
+        "order",
+        order.id,
+        details={"note": payload.note},
+        to_status=order.status,
         user_id=getattr(actor, "id", None),
+        actor_role=getattr(actor, "role", None),
     )
-    db.add(audit)
     db.commit()
     db.refresh(order)
     # If QC passed -> notify Shipping Admin and Sales
@@ -1236,14 +1262,16 @@ def update_shipping(
     order.tracking_number = payload.tracking_number
     order.status = "SHIPPED"
     db.add(order)
-    audit = AuditLog(
-        action="SHIPPING_UPDATE",
-        target_type="order",
-        target_id=str(order.id),
-        details=json.dumps({"tracking_number": payload.tracking_number}),
+    record_audit(
+        db,
+        "SHIPPING_UPDATE",
+        "order",
+        order.id,
+        details={"tracking_number": payload.tracking_number},
+        to_status=order.status,
         user_id=getattr(actor, "id", None),
+        actor_role=getattr(actor, "role", None),
     )
-    db.add(audit)
     db.commit()
     db.refresh(order)
     # Notify Sales/Admin and order creator that order has shipped
@@ -1300,16 +1328,16 @@ def queue_receive(
     order.queue_status = "RECEIVED"
     order.status = "QUEUE_RECEIVED"
     db.add(order)
-    audit = AuditLog(
-        action="QUEUE_RECEIVE",
-        target_type="order",
-        target_id=str(order.id),
-        details=json.dumps(
-            {"queue_number": payload.queue_number, "note": payload.note}
-        ),
+    record_audit(
+        db,
+        "QUEUE_RECEIVE",
+        "order",
+        order.id,
+        details={"queue_number": payload.queue_number, "note": payload.note},
+        to_status=order.status,
         user_id=getattr(actor, "id", None),
+        actor_role=getattr(actor, "role", None),
     )
-    db.add(audit)
     db.commit()
     db.refresh(order)
     return {"ok": True, "status": order.status, "queue_number": order.queue_number}
@@ -1334,14 +1362,16 @@ def queue_notify(
     order.queue_status = "NOTIFIED"
     order.status = "QUEUE_NOTIFIED"
     db.add(order)
-    audit = AuditLog(
-        action="QUEUE_NOTIFY",
-        target_type="order",
-        target_id=str(order.id),
-        details=json.dumps({"note": payload.note}),
+    record_audit(
+        db,
+        "QUEUE_NOTIFY",
+        "order",
+        order.id,
+        details={"note": payload.note},
+        to_status=order.status,
         user_id=getattr(actor, "id", None),
+        actor_role=getattr(actor, "role", None),
     )
-    db.add(audit)
     db.commit()
     db.refresh(order)
     return {"ok": True, "status": order.status}
@@ -1365,14 +1395,16 @@ def image_received(
     order.image_received = True
     order.status = "IMAGE_RECEIVED"
     db.add(order)
-    audit = AuditLog(
-        action="IMAGE_RECEIVED",
-        target_type="order",
-        target_id=str(order.id),
-        details=json.dumps({}),
+    record_audit(
+        db,
+        "IMAGE_RECEIVED",
+        "order",
+        order.id,
+        details={},
+        to_status=order.status,
         user_id=getattr(actor, "id", None),
+        actor_role=getattr(actor, "role", None),
     )
-    db.add(audit)
     db.commit()
     db.refresh(order)
     return {"ok": True, "status": order.status}
@@ -1411,14 +1443,16 @@ def collect_cod(
     order.remaining_balance = max(Decimal(0), rb - amt)
     order.status = "COD_COLLECTED"
     db.add(order)
-    audit = AuditLog(
-        action="COD_COLLECTED",
-        target_type="order",
-        target_id=str(order.id),
-        details=json.dumps({"amount": str(amt)}),
+    record_audit(
+        db,
+        "COD_COLLECTED",
+        "order",
+        order.id,
+        details={"amount": str(amt)},
+        to_status=order.status,
         user_id=getattr(actor, "id", None),
+        actor_role=getattr(actor, "role", None),
     )
-    db.add(audit)
     db.commit()
     db.refresh(order)
     return {
@@ -1434,6 +1468,7 @@ class UpdateOrderStatus(BaseModel):
 
 
 @router.patch("/{order_id}/status", response_model=OrderSchema)
+@query_budget(12)
 def update_order_status(
     order_id: int,
     payload: UpdateOrderStatus,
@@ -1465,14 +1500,15 @@ def update_order_status(
         "note": "Quick status update via PATCH /status",
     }
     try:
-        audit = AuditLog(
-            action="UPDATE_STATUS",
-            target_type="order",
-            target_id=str(existing.id),
-            details=json.dumps(details),
+        record_audit(
+            db,
+            "UPDATE_STATUS",
+            "order",
+            existing.id,
+            details=details,
             user_id=getattr(current_user, "id", None),
+            actor_role=getattr(current_user, "role", None),
         )
-        db.add(audit)
     except Exception:
         # Non-fatal: don't block status change if audit log fails
         logger.exception("Failed to create audit log for status update")
@@ -1557,14 +1593,15 @@ def approve_slip(
         "changed_to": order.status,
         "admin": getattr(approver, "username", None),
     }
-    audit = AuditLog(
-        action=("APPROVE_SLIP" if payload.approved else "REJECT_SLIP"),
-        target_type="order",
-        target_id=str(order.id),
-        details=json.dumps(details),
+    record_audit(
+        db,
+        ("APPROVE_SLIP" if payload.approved else "REJECT_SLIP"),
+        "order",
+        order.id,
+        details=details,
         user_id=getattr(approver, "id", None),
+        actor_role=getattr(approver, "role", None),
     )
-    db.add(audit)
 
     db.commit()
 
@@ -1614,14 +1651,16 @@ def generate_payment_link(
             "expires_at": expires.isoformat(),
             "requested_by": getattr(current_user, "username", None),
         }
-        audit = AuditLog(
-            action="GENERATE_PAYMENT_LINK",
-            target_type="order",
-            target_id=str(order.id),
-            details=json.dumps(details),
+        record_audit(
+            db,
+            "GENERATE_PAYMENT_LINK",
+            "order",
+            order.id,
+            details=details,
             user_id=getattr(current_user, "id", None),
+            actor_role=getattr(current_user, "role", None),
+            mode=ASYNC,
         )
-        db.add(audit)
         db.commit()
     except Exception:
         logger.exception("Failed to record audit log for payment link generation")
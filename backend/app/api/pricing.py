@@ -1,12 +1,15 @@
-import re
-
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List, Dict, Union
+from typing import List, Dict, Optional, Union
 from decimal import Decimal
 from sqlalchemy.orm import Session
 from app.db.session import get_db
-from app.models.product import NeckType
+from app.core.neck_resolver import neck_index
+from app.core.price_matrix import price_matrix, unknown_addons
+from app.core.pricing_rules import rule_table
+from app.core.quote_cache import quote_cache, quote_key
+from app.core.shipping import qty_shipping_cost, shipping_cost
 from app.core.pricing_constants import (
     STEP_PRICING,
     ADDON_PRICES,
@@ -19,6 +22,7 @@ router = APIRouter()
 
 class PricingRequestItem(BaseModel):
     product_type: str = "shirt"
+    fabric_type: Optional[str] = None
     neck_type: str
     quantity_matrix: Union[Dict[str, int], str, None] = {}
     selected_add_ons: List[str] = []
@@ -29,36 +33,21 @@ class PricingRequest(BaseModel):
     items: List[PricingRequestItem]
 
 
+class PriceMatrixRequest(BaseModel):
+    fabric_type: Optional[str] = None
+    necks: List[str]
+    quantities: List[int]
+    add_on_combos: List[List[str]] = [[]]
+    is_oversize: bool = False
+
+
+# Upper bound on necks x quantities x combos for one /matrix request
+MAX_MATRIX_CELLS = 50000
+
+
 def calculate_shipping(total_qty: int) -> int:
-    if total_qty < 10:
-        return 0
-    if total_qty <= 15:
-        return 60
-    if total_qty <= 20:
-        return 80
-    if total_qty <= 30:
-        return 100
-    if total_qty <= 40:
-        return 120
-    if total_qty <= 50:
-        return 180
-    if total_qty <= 70:
-        return 200
-    if total_qty <= 100:
-        return 230
-    return 230 + ((total_qty - 100) * 50)
-
-
-def _normalize_name(s: str) -> str:
-    if not s:
-        return ""
-    ns = str(s)
-    ns = ns.replace("นํ้า", "น้ำ")
-    # remove parenthetical annotations
-
-    ns = re.sub(r"\(.*?\)", "", ns)
-    ns = re.sub(r"\s+", " ", ns).strip()
-    return ns
+    """Shipping from the built-in quantity tiers alone (no ShippingRate bands)."""
+    return qty_shipping_cost(total_qty)
 
 
 @router.post("/calc")
@@ -66,6 +55,47 @@ def calculate_price(payload: PricingRequest, db: Session = Depends(get_db)):
     if not payload or not payload.items:
         raise HTTPException(status_code=400, detail="No items provided")
 
+    # Identical payloads are frequent; serve them from the quote cache
+    key = quote_key(payload.items)
+    quote = quote_cache.get(key)
+    if quote is None:
+        quote = _calculate_quote(payload.items, db)
+        quote_cache.put(key, quote)
+    return quote
+
+
+@router.post("/matrix")
+def calculate_price_matrix(payload: PriceMatrixRequest, db: Session = Depends(get_db)):
+    """Full price grid for a price list: every neck x quantity x add-on combo.
+
+    Cells match what /calc returns for a single item; see app.core.price_matrix.
+    """
+    combos = payload.add_on_combos or [[]]
+    if not payload.necks or not payload.quantities:
+        raise HTTPException(status_code=400, detail="necks and quantities are required")
+    if any(q <= 0 for q in payload.quantities):
+        raise HTTPException(status_code=400, detail="quantities must be positive")
+    if len(payload.necks) * len(payload.quantities) * len(combos) > MAX_MATRIX_CELLS:
+        raise HTTPException(
+            status_code=400, detail=f"Grid larger than {MAX_MATRIX_CELLS} cells"
+        )
+    unknown = unknown_addons(combos)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown add-ons: {', '.join(unknown)}")
+    grid = price_matrix(
+        neck_index(db),
+        payload.necks,
+        payload.quantities,
+        combos,
+        payload.is_oversize,
+        rules=rule_table(db),
+        fabric_type=payload.fabric_type,
+    )
+    # plain JSON already; skip the per-value jsonable_encoder walk
+    return JSONResponse(grid)
+
+
+def _calculate_quote(items: List[PricingRequestItem], db: Session) -> dict:
     # Special necks that present as base(300) + slope-addon in the UI
     SPECIAL_NECKS_FORCE_340_UI = SPECIAL_SLOPE_NECKS
 
@@ -75,10 +105,12 @@ def calculate_price(payload: PricingRequest, db: Session = Depends(get_db)):
     details = []
     first_unit_price = Decimal(0)
 
-    # preload neck rows for tolerant matching
-    neck_rows = db.query(NeckType).all()
+    # neck names resolve through the shared index (exact, longest contained,
+    # longest containing), built once per master-data version
+    necks = neck_index(db)
+    rules = rule_table(db)
 
-    for idx, it in enumerate(payload.items):
+    for idx, it in enumerate(items):
         # quantity matrix handling
         qmat = {}
         if isinstance(it.quantity_matrix, dict):
@@ -91,48 +123,7 @@ def calculate_price(payload: PricingRequest, db: Session = Depends(get_db)):
         total_qty_all += qty
 
         neck_name_raw = (it.neck_type or "").strip()
-        norm_need = _normalize_name(neck_name_raw)
-
-        # find db neck with tolerant match
-        db_neck = None
-        # Build normalized candidates to allow smarter matching: prefer exact normalized match,
-        # otherwise prefer the most specific (longest) candidate that is a substring match.
-        norm_candidates = []
-        for cand in neck_rows:
-            if not cand or not cand.name:
-                continue
-            cand_norm = _normalize_name(cand.name)
-            if not cand_norm:
-                continue
-            norm_candidates.append((cand, cand_norm))
-
-        # exact normalized match
-        for cand, cand_norm in norm_candidates:
-            if cand_norm == norm_need:
-                db_neck = cand
-                break
-
-        # prefer longest candidate name that is contained in the requested name
-        if not db_neck:
-            # candidates whose normalized form is contained in norm_need
-            matches = [
-                (cand, cand_norm)
-                for cand, cand_norm in norm_candidates
-                if cand_norm in norm_need
-            ]
-            if matches:
-                # pick candidate with longest normalized string (most specific)
-                db_neck = max(matches, key=lambda x: len(x[1]))[0]
-
-        # fallback: candidates where norm_need is contained in candidate name
-        if not db_neck:
-            matches = [
-                (cand, cand_norm)
-                for cand, cand_norm in norm_candidates
-                if norm_need in cand_norm
-            ]
-            if matches:
-                db_neck = max(matches, key=lambda x: len(x[1]))[0]
+        db_neck = necks.resolve(neck_name_raw)
 
         # determine pricing table
         is_round_v = "ปก" not in neck_name_raw and any(
@@ -150,6 +141,10 @@ def calculate_price(payload: PricingRequest, db: Session = Depends(get_db)):
                 (t for t in table if qty >= t["min_qty"] and qty <= t["max_qty"]), None
             )
             unit = Decimal(matched["price"]) if matched else Decimal(table[-1]["price"])
+        # a PricingRule for the item's fabric overrides the neck tier table
+        rule_price = rules.unit_price(it.fabric_type, qty)
+        if rule_price is not None:
+            unit = rule_price
 
         if idx == 0:
             first_unit_price = unit
@@ -210,7 +205,8 @@ def calculate_price(payload: PricingRequest, db: Session = Depends(get_db)):
             }
         )
 
-    shipping = calculate_shipping(total_qty_all)
+    # ShippingRate weight bands when configured, else the quantity tiers
+    shipping = shipping_cost(db, total_qty_all)
 
     return {
         "price_per_unit": float(first_unit_price),
@@ -2,8 +2,10 @@ from typing import List, Any
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, ConfigDict
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.core.query_budget import query_budget
 from app.models.pricing_rule import PricingRule
+from app.core.pricing_rules import find_overlap
 from app.models.user import User
 from app.api.rbac import require_roles
 
@@ -29,8 +31,9 @@ class PricingRuleOut(PricingRuleBase):
 
 # GET: Public Access (No Login Required) ---
 @router.get("/", response_model=List[PricingRuleOut])
+@query_budget(3)
 def read_pricing_rules(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     rules = (
         db.query(PricingRule)
@@ -47,6 +50,15 @@ def create_pricing_rule(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_roles("ADMIN", "ADMIN_OPS")),
 ):
+    if rule_in.min_qty < 0 or rule_in.max_qty < rule_in.min_qty:
+        raise HTTPException(status_code=400, detail="Invalid quantity range")
+    clash = find_overlap(db, rule_in.fabric_type, rule_in.min_qty, rule_in.max_qty)
+    if clash:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Overlaps rule {clash.id} ({clash.fabric_type} "
+            f"{clash.min_qty}-{clash.max_qty})",
+        )
     rule = PricingRule(**rule_in.model_dump())
     db.add(rule)
     db.commit()
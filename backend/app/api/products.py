@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from typing import List
 from decimal import Decimal # 1. อิมพอร์ต Decimal เพิ่มตรงนี้
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.core.query_budget import query_budget
+from app.core import reprice_jobs
 from app.models.product import FabricType, NeckType, SleeveType
 from app.schemas.master import FabricTypeResponse, NeckTypeResponse, SleeveTypeResponse
 from app.models.user import User
@@ -22,7 +25,8 @@ class MasterCreate(BaseModel):
     force_slope: bool = False
     
 @router.get("/fabrics", response_model=List[FabricTypeResponse])
-def get_fabrics(skip: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
+@query_budget(3)
+def get_fabrics(skip: int = 0, limit: int = 1000, db: Session = Depends(get_read_db)):
     return (
         db.query(FabricType)
         .filter(FabricType.is_active == True)
@@ -33,7 +37,8 @@ def get_fabrics(skip: int = 0, limit: int = 1000, db: Session = Depends(get_db))
 
 
 @router.get("/necks", response_model=List[NeckTypeResponse])
-def get_necks(skip: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
+@query_budget(3)
+def get_necks(skip: int = 0, limit: int = 1000, db: Session = Depends(get_read_db)):
     return (
         db.query(NeckType)
         .filter(NeckType.is_active == True)
@@ -45,7 +50,8 @@ def get_necks(skip: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
 
 
 @router.get("/sleeves", response_model=List[SleeveTypeResponse])
-def get_sleeves(skip: int = 0, limit: int = 1000, db: Session = Depends(get_db)):
+@query_budget(3)
+def get_sleeves(skip: int = 0, limit: int = 1000, db: Session = Depends(get_read_db)):
     return (
         db.query(SleeveType)
         .filter(SleeveType.is_active == True)
@@ -84,12 +90,14 @@ def create_neck(
 def update_neck(
     item_id: int,
     item: MasterCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_roles("ADMIN", "ADMIN_OPS")),
 ):
     db_item = db.query(NeckType).filter(NeckType.id == item_id).first()
     if not db_item:
         raise HTTPException(status_code=404, detail="Not found")
+    before = (db_item.name, Decimal(str(db_item.additional_cost or 0)), bool(db_item.force_slope))
 
     # อัปเดตข้อมูลลง DB (เพื่อให้หน้า Order ดึงไปใช้)
     # sanitize name similar to create
@@ -104,4 +112,53 @@ def update_neck(
     db_item.force_slope = item.force_slope
     db.commit()
     db.refresh(db_item)
-    return db_item
+
+    result = jsonable_encoder(db_item)
+    after = (db_item.name, Decimal(str(db_item.additional_cost or 0)), bool(db_item.force_slope))
+    if after != before:
+        # open orders priced with this neck: report the impact in the background
+        job = reprice_jobs.impact_job(db_item.id, db_item.name, previous_name=before[0])
+        background_tasks.add_task(
+            reprice_jobs.run_job,
+            db.get_bind(),
+            job.id,
+            user_id=current_user.id,
+            actor_role=current_user.role,
+        )
+        result["reprice_job"] = job.as_dict()
+    return result
+
+
+@router.get("/reprice-jobs/{job_id}")
+def read_reprice_job(
+    job_id: str,
+    current_user: User = Depends(require_roles("ADMIN", "ADMIN_OPS")),
+):
+    job = reprice_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Re-pricing job not found")
+    return job.as_dict()
+
+
+@router.post("/reprice-jobs/{job_id}/apply", status_code=status.HTTP_202_ACCEPTED)
+def apply_reprice_job(
+    job_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles("ADMIN", "ADMIN_OPS")),
+):
+    source = reprice_jobs.get_job(job_id)
+    if not source:
+        raise HTTPException(status_code=404, detail="Re-pricing job not found")
+    try:
+        job = reprice_jobs.apply_job(source)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    background_tasks.add_task(
+        reprice_jobs.run_job,
+        db.get_bind(),
+        job.id,
+        user_id=current_user.id,
+        actor_role=current_user.role,
+    )
+    return job.as_dict()
@@ -5,7 +5,7 @@ import time
 import uuid
 from app.db.session import get_db
 from app.models.order import Order
-from app.models.audit_log import AuditLog
+from app.core.audit import record_audit
 from app.core.config import settings
 from app.core.storage import save_upload, detect_image_type
 
@@ -100,13 +100,14 @@ def public_upload_slip(
 
     # Record AuditLog for the upload
     try:
-        audit = AuditLog(
-            action="UPLOAD_SLIP",
-            target_type="order",
-            target_id=str(o.id),
-            details=f"installment={inst} filename={fn} size={size}",
+        record_audit(
+            db,
+            "UPLOAD_SLIP",
+            "order",
+            o.id,
+            details={"installment": inst, "filename": fn, "size": size},
+            actor_role="CUSTOMER",
         )
-        db.add(audit)
     except Exception:
         # don't fail the upload for audit logging issues
         pass
@@ -6,7 +6,7 @@ This file provides:
 - mask_order_for_role(order_dict, role): hide sensitive fields for some roles (e.g. PRODUCTION)
 """
 
-from typing import Optional
+from typing import Any, Optional
 from fastapi import Depends, HTTPException, status
 from app.api.deps import get_current_user
 
@@ -52,6 +52,12 @@ def _normalize_role(role: Optional[str]) -> str:
 CANONICAL_ROLES = ("ADMIN_A", "ADMIN_B", "GRAPHIC", "ADMIN_C", "ADMIN_D")
 
 
+# Orders in CLOSED_STATUSES carry no revenue; orders in SETTLED_STATUSES also
+# have no outstanding balance and keep the prices they were created with.
+CLOSED_STATUSES = ("CANCELLED",)
+SETTLED_STATUSES = ("CANCELLED", "COMPLETED")
+
+
 def normalize_status(s: Optional[str]) -> Optional[str]:
     """Normalize status values into canonical uppercase workflow states.
 
@@ -168,6 +174,52 @@ def can_transition(
 #
 
 
+# Production (ADMIN_C) and Graphic (GRAPHIC) roles must not see price/payment/PII
+_MASKED_ROLES = ("ADMIN_C", "GRAPHIC")
+MASKED_ORDER_FIELDS = (
+    "grand_total",
+    "total_cost",
+    "vat_amount",
+    "deposit_amount",
+    "deposit_1",
+    "deposit_2",
+    "balance_amount",
+    "phone",
+    "address",
+    "customer_name",
+    "contact_channel",
+    "order_no",
+    "slip_booking_url",
+    "slip_deposit_url",
+    "slip_balance_url",
+)
+
+
+def is_masked_role(role: Optional[str]) -> bool:
+    """True when mask_order_for_role hides MASKED_ORDER_FIELDS from *role*."""
+    return bool(role) and _normalize_role(role) in _MASKED_ROLES
+
+
+# Keys stripped from audit payloads shown to masked roles: the order fields
+# they cannot see, plus payment amounts recorded by status/payment events.
+_MASKED_LOG_KEYS = frozenset(MASKED_ORDER_FIELDS) | {"amount"}
+
+
+def mask_log_details(details: Any) -> Any:
+    """*details* of an audit entry without the keys masked roles may not see.
+
+    Applied at every depth, so UPDATE_ORDER ``{"changes": {"phone": ...}}``
+    loses the ``phone`` entry too.
+    """
+    if isinstance(details, dict):
+        return {
+            k: mask_log_details(v) for k, v in details.items() if k not in _MASKED_LOG_KEYS
+        }
+    if isinstance(details, list):
+        return [mask_log_details(v) for v in details]
+    return details
+
+
 def mask_order_for_role(order: dict, role: Optional[str]) -> dict:
     """Return a shallow-masked copy of order for roles that must not see PII/finance.
 
@@ -177,27 +229,9 @@ def mask_order_for_role(order: dict, role: Optional[str]) -> dict:
     if not role:
         return order
     # Normalize role and decide which roles must not see PII/finance
-    role_up = _normalize_role(role)
-    # Production (ADMIN_C) and Graphic (GRAPHIC) roles must not see price/payment/PII
-    if role_up in ("ADMIN_C", "GRAPHIC"):
+    if is_masked_role(role):
         masked = order.copy()
-        for k in [
-            "grand_total",
-            "total_cost",
-            "vat_amount",
-            "deposit_amount",
-            "deposit_1",
-            "deposit_2",
-            "balance_amount",
-            "phone",
-            "address",
-            "customer_name",
-            "contact_channel",
-            "order_no",
-            "slip_booking_url",
-            "slip_deposit_url",
-            "slip_balance_url",
-        ]:
+        for k in MASKED_ORDER_FIELDS:
             if k in masked:
                 masked.pop(k, None)
 
@@ -0,0 +1,168 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.api.rbac import CLOSED_STATUSES, SETTLED_STATUSES, require_roles
+from app.core.order_rollups import UNKNOWN_SALES_USER
+from app.core.query_budget import query_budget
+from app.db.session import get_read_db
+from app.models.order_rollup import OrderDailyRollup
+from app.models.user import User
+
+router = APIRouter()
+
+
+class SummaryTotals(BaseModel):
+    order_count: int = 0
+    cancelled_count: int = 0
+    revenue: Decimal = Decimal("0")
+    total_cost: Decimal = Decimal("0")
+    estimated_profit: Decimal = Decimal("0")
+    outstanding_balance: Decimal = Decimal("0")
+
+
+class StatusBreakdown(BaseModel):
+    status: str
+    order_count: int
+    grand_total: Decimal
+
+
+class ProductTypeBreakdown(SummaryTotals):
+    product_type: str
+
+
+class SalesUserBreakdown(SummaryTotals):
+    user_id: Optional[int] = None
+    user_name: Optional[str] = None
+
+
+class DailyPoint(BaseModel):
+    day: date
+    order_count: int
+    revenue: Decimal
+
+
+class ReportSummary(BaseModel):
+    date_from: date
+    date_to: date
+    totals: SummaryTotals
+    by_status: List[StatusBreakdown]
+    by_product_type: List[ProductTypeBreakdown]
+    by_sales_user: List[SalesUserBreakdown]
+    by_day: List[DailyPoint]
+
+
+def _dec(v) -> Decimal:
+    return Decimal(str(v or 0)).quantize(Decimal("0.01"))
+
+
+def _add(totals: SummaryTotals, row) -> None:
+    closed = row.status in CLOSED_STATUSES
+    totals.order_count += row.orders
+    if closed:
+        totals.cancelled_count += row.orders
+    else:
+        totals.revenue += _dec(row.grand_total)
+        totals.total_cost += _dec(row.total_cost)
+        totals.estimated_profit += _dec(row.estimated_profit)
+    if row.status not in SETTLED_STATUSES:
+        totals.outstanding_balance += _dec(row.balance_amount)
+
+
+@router.get("/summary", response_model=ReportSummary)
+@query_budget(5)
+def report_summary(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    db: Session = Depends(get_read_db),
+    _: User = Depends(require_roles("ADMIN", "ADMIN_OPS", "OWNER")),
+):
+    """Revenue, cost, profit, outstanding balance and order counts for orders
+    created between *from* and *to* (inclusive; default: the last 30 days).
+
+    Answered from ``order_daily_rollups`` (see app.core.order_rollups), so the
+    cost depends on the number of days and dimension values, not on the number
+    of orders. Cancelled orders count toward ``cancelled_count`` only.
+    """
+    # Rollup days are UTC creation dates
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+
+    R = OrderDailyRollup
+    in_range = (R.day >= date_from, R.day <= date_to)
+    rows = (
+        db.query(
+            R.status,
+            R.product_type,
+            R.sales_user_id,
+            func.sum(R.order_count).label("orders"),
+            func.sum(R.grand_total).label("grand_total"),
+            func.sum(R.total_cost).label("total_cost"),
+            func.sum(R.estimated_profit).label("estimated_profit"),
+            func.sum(R.balance_amount).label("balance_amount"),
+        )
+        .filter(*in_range)
+        .group_by(R.status, R.product_type, R.sales_user_id)
+        .all()
+    )
+    rows = [r for r in rows if r.orders]
+
+    revenue = case((R.status.in_(CLOSED_STATUSES), 0), else_=R.grand_total)
+    daily = (
+        db.query(
+            R.day,
+            func.sum(R.order_count).label("orders"),
+            func.sum(revenue).label("revenue"),
+        )
+        .filter(*in_range)
+        .group_by(R.day)
+        .order_by(R.day)
+        .all()
+    )
+
+    totals = SummaryTotals()
+    statuses, product_types, sales_users = {}, {}, {}
+    for r in rows:
+        _add(totals, r)
+        s = statuses.get(r.status)
+        if s is None:
+            s = statuses[r.status] = StatusBreakdown(
+                status=r.status, order_count=0, grand_total=Decimal("0")
+            )
+        s.order_count += r.orders
+        s.grand_total += _dec(r.grand_total)
+
+        if r.product_type not in product_types:
+            product_types[r.product_type] = ProductTypeBreakdown(product_type=r.product_type)
+        _add(product_types[r.product_type], r)
+
+        user_id = None if r.sales_user_id == UNKNOWN_SALES_USER else r.sales_user_id
+        if user_id not in sales_users:
+            sales_users[user_id] = SalesUserBreakdown(user_id=user_id)
+        _add(sales_users[user_id], r)
+
+    user_ids = [uid for uid in sales_users if uid is not None]
+    if user_ids:
+        for u in db.query(User.id, User.full_name, User.username).filter(User.id.in_(user_ids)):
+            sales_users[u.id].user_name = u.full_name or u.username
+
+    return ReportSummary(
+        date_from=date_from,
+        date_to=date_to,
+        totals=totals,
+        by_status=sorted(statuses.values(), key=lambda s: -s.order_count),
+        by_product_type=sorted(product_types.values(), key=lambda p: -p.revenue),
+        by_sales_user=sorted(sales_users.values(), key=lambda u: -u.revenue),
+        by_day=[
+            DailyPoint(day=d.day, order_count=d.orders, revenue=_dec(d.revenue))
+            for d in daily
+            if d.orders
+        ],
+    )
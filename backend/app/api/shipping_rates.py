@@ -0,0 +1,80 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.db.session import get_db, get_read_db
+from app.core.query_budget import query_budget
+from app.models.pricing_rule import ShippingRate
+from app.models.user import User
+from app.schemas.admin import ShippingRateCreate, ShippingRateResponse
+from app.api.rbac import require_roles
+
+router = APIRouter()
+
+
+# GET: Public Access (No Login Required) ---
+@router.get("/", response_model=List[ShippingRateResponse])
+@query_budget(3)
+def read_shipping_rates(
+    db: Session = Depends(get_read_db),
+):
+    return (
+        db.query(ShippingRate)
+        .order_by(ShippingRate.provider_name, ShippingRate.min_weight_kg)
+        .all()
+    )
+
+
+# POST: Restricted (Admin only) ---
+@router.post("/", response_model=ShippingRateResponse)
+def create_shipping_rate(
+    rate_in: ShippingRateCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles("ADMIN", "ADMIN_OPS")),
+):
+    low, high = float(rate_in.min_weight_kg), float(rate_in.max_weight_kg)
+    if low < 0 or high < low:
+        raise HTTPException(status_code=400, detail="Invalid weight range")
+    if rate_in.is_active:
+        # bands of one provider must not overlap (app/core/shipping.py bisects them)
+        clash = (
+            db.query(ShippingRate)
+            .filter(
+                ShippingRate.provider_name == rate_in.provider_name,
+                ShippingRate.is_active == 1,
+                ShippingRate.min_weight_kg <= high,
+                ShippingRate.max_weight_kg >= low,
+            )
+            .first()
+        )
+        if clash:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Overlaps {clash.provider_name} "
+                f"{clash.min_weight_kg}-{clash.max_weight_kg} kg (id {clash.id})",
+            )
+    rate = ShippingRate(
+        provider_name=rate_in.provider_name,
+        min_weight_kg=low,
+        max_weight_kg=high,
+        base_price=float(rate_in.base_price),
+        is_active=1 if rate_in.is_active else 0,
+    )
+    db.add(rate)
+    db.commit()
+    db.refresh(rate)
+    return rate
+
+
+# DELETE: Restricted (Admin only) ---
+@router.delete("/{id}")
+def delete_shipping_rate(
+    id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_roles("ADMIN", "ADMIN_OPS")),
+):
+    rate = db.query(ShippingRate).filter(ShippingRate.id == id).first()
+    if not rate:
+        raise HTTPException(status_code=404, detail="Shipping rate not found")
+    db.delete(rate)
+    db.commit()
+    return {"ok": True}
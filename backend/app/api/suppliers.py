@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.core.query_budget import query_budget
 from app.models.supplier import Supplier
 from app.models.user import User
 from app.api.rbac import require_roles
@@ -24,12 +25,14 @@ def create_supplier(
 
 
 @router.get("/", response_model=List[SupplierResponse])
-def get_suppliers(db: Session = Depends(get_db)):
+@query_budget(3)
+def get_suppliers(db: Session = Depends(get_read_db)):
     return db.query(Supplier).filter(Supplier.is_active == True).all()
 
 
 @router.get("/{supplier_id}", response_model=SupplierResponse)
-def get_supplier(supplier_id: int, db: Session = Depends(get_db)):
+@query_budget(3)
+def get_supplier(supplier_id: int, db: Session = Depends(get_read_db)):
     supplier = db.query(Supplier).filter(Supplier.id == supplier_id).first()
     if not supplier:
         raise HTTPException(status_code=404, detail="Supplier not found")
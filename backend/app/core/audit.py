@@ -0,0 +1,344 @@
+"""
+Audit pipeline.
+
+``record_audit(db, action, ...)`` is the single entry point for audit events.
+It has two modes:
+
+- ``transactional`` (default): the AuditLog row is added to the caller's
+  session and commits or rolls back with the change it describes. Use it for
+  financial and status changes.
+- ``async``: the event waits in ``db.info`` until the caller's session
+  commits and is then handed to the background AuditWriter, which inserts
+  buffered events in batches (one executemany per flush) on its own
+  connection, so the request pays neither the insert nor the index updates.
+  A rollback discards the waiting events, so a failed request leaves no
+  audit row. Use it for non-critical events (uploads, payment links, album
+  edits).
+
+Crash safety: before an async event is buffered it is appended as one JSON
+line to the current spill segment in ``AUDIT_SPILL_DIR``. A flush rotates
+the segment, inserts its events and deletes the file only after the commit.
+Segment names carry the writer's PID, so several workers can share the spill
+directory: on start each worker replays only the segments of processes that
+are gone (claiming each by renaming it under its own PID first), never the
+live segments of its siblings. Delivery is at-least-once.
+
+Async mode is only used while the writer is running (started from the app
+lifespan); otherwise, as in scripts and tests, events fall back to the
+transactional path.
+"""
+
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models.audit_log import AuditLog, order_id_for, structure_details
+
+logger = logging.getLogger(__name__)
+
+TRANSACTIONAL = "transactional"
+ASYNC = "async"
+
+# Session.info key of the async events waiting for their session to commit
+_ASYNC_KEY = "audit_async_pending"
+
+AUDIT_EVENTS = registry.counter(
+    "audit_events_total", "Audit events recorded.", ["mode"]
+)
+AUDIT_FLUSHES = registry.counter(
+    "audit_flushes_total", "Background audit batch flushes.", ["result"]
+)
+AUDIT_BUFFERED = registry.gauge(
+    "audit_events_buffered", "Async audit events waiting to be flushed."
+)
+
+
+def record_audit(
+    db: Session,
+    action: str,
+    target_type: str,
+    target_id: Any,
+    details: Any = None,
+    user_id: Optional[int] = None,
+    order_id: Optional[int] = None,
+    from_status: Optional[str] = None,
+    to_status: Optional[str] = None,
+    amount: Any = None,
+    actor_role: Optional[str] = None,
+    mode: str = TRANSACTIONAL,
+) -> Optional[AuditLog]:
+    """Record an audit event; returns the AuditLog for transactional writes.
+
+    ``details`` (a dict, or legacy text) becomes the JSON ``payload``; status
+    transitions and amounts found in it fill the structured columns unless
+    they are passed explicitly. The legacy ``details`` column keeps getting
+    the payload as JSON text for readers that have not moved to ``payload``.
+    """
+    target_id = None if target_id is None else str(target_id)
+    columns, payload = structure_details(details)
+    row = {
+        "action": action,
+        "target_type": target_type,
+        "target_id": target_id,
+        "order_id": order_id if order_id is not None else order_id_for(target_type, target_id),
+        "from_status": from_status or columns.get("from_status"),
+        "to_status": to_status or columns.get("to_status"),
+        "amount": Decimal(str(amount)) if amount is not None else columns.get("amount"),
+        "actor_role": actor_role,
+        "payload": payload,
+        # legacy column, written until a migration retires it
+        "details": None if payload is None else json.dumps(payload, ensure_ascii=False, default=str),
+        "user_id": user_id,
+    }
+
+    if mode == ASYNC and audit_writer.running:
+        row["created_at"] = datetime.now(timezone.utc)
+        # handed to the writer by _submit_async_audits once db commits
+        db.info.setdefault(_ASYNC_KEY, []).append((db.get_bind(), row))
+        return None
+
+    log = AuditLog(**row)
+    db.add(log)
+    AUDIT_EVENTS.inc(mode=TRANSACTIONAL)
+    return log
+
+
+_SEGMENT_PID = re.compile(r"^audit-p(\d+)-")
+
+
+def _encode(event: Dict[str, Any]) -> str:
+    row = dict(event)
+    row["created_at"] = row["created_at"].isoformat()
+    return json.dumps(row, ensure_ascii=False, default=str)
+
+
+def _decode(line: str) -> Dict[str, Any]:
+    row = json.loads(line)
+    row["created_at"] = datetime.fromisoformat(row["created_at"])
+    if row.get("amount") is not None:
+        row["amount"] = Decimal(row["amount"])
+    return row
+
+
+class AuditWriter:
+    """Buffers async audit events and inserts them in batches from a thread."""
+
+    def __init__(
+        self,
+        spill_dir: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        fsync: Optional[bool] = None,
+    ):
+        self.spill_dir = spill_dir or settings.AUDIT_SPILL_DIR
+        self.flush_interval = (
+            settings.AUDIT_FLUSH_INTERVAL_SECONDS if flush_interval is None else flush_interval
+        )
+        self.batch_size = batch_size or settings.AUDIT_BATCH_SIZE
+        self.fsync = settings.AUDIT_SPILL_FSYNC if fsync is None else fsync
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # (engine, event) pairs in the current segment, oldest first
+        self._buffer: List[tuple] = []
+        self._segment: Optional[str] = None
+        self._segment_fd: Optional[int] = None
+        # rotated segments whose events are in a failed batch waiting for retry
+        self._retry: List[tuple] = []
+        self._retry_segments: List[str] = []
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # -- producer side -----------------------------------------------------
+    def submit(self, engine: Engine, event: Dict[str, Any]) -> None:
+        line = (_encode(event) + "\n").encode("utf-8")
+        with self._lock:
+            if self._segment_fd is None:
+                self._open_segment()
+            os.write(self._segment_fd, line)
+            if self.fsync:
+                os.fsync(self._segment_fd)
+            self._buffer.append((engine, event))
+            pending = len(self._buffer)
+        AUDIT_BUFFERED.set(pending + len(self._retry))
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def _open_segment(self) -> None:
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._segment = self._segment_path()
+        self._segment_fd = os.open(
+            self._segment, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600
+        )
+
+    def _segment_path(self) -> str:
+        name = f"audit-p{os.getpid()}-{time.time_ns()}-{uuid.uuid4().hex[:8]}.jsonl"
+        return os.path.join(self.spill_dir, name)
+
+    # -- consumer side -----------------------------------------------------
+    def flush(self) -> int:
+        """Insert everything buffered so far; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                segment, fd = self._segment, self._segment_fd
+                self._segment = self._segment_fd = None
+            if fd is not None:
+                os.close(fd)
+            batch = self._retry + batch
+            segments = self._retry_segments + ([segment] if segment else [])
+            if not batch:
+                return 0
+            try:
+                by_engine: Dict[Engine, List[Dict[str, Any]]] = {}
+                for engine, event in batch:
+                    by_engine.setdefault(engine, []).append(event)
+                for engine, rows in by_engine.items():
+                    with engine.begin() as conn:
+                        conn.execute(insert(AuditLog.__table__), rows)
+            except Exception:
+                # keep the segments on disk and retry with the next flush
+                self._retry, self._retry_segments = batch, segments
+                AUDIT_FLUSHES.inc(result="error")
+                logger.exception("Audit flush failed; %d events kept for retry", len(batch))
+                return 0
+            self._retry, self._retry_segments = [], []
+            for path in segments:
+                _remove(path)
+            AUDIT_FLUSHES.inc(result="ok")
+            AUDIT_BUFFERED.set(len(self._buffer))
+            return len(batch)
+
+    def _orphaned(self, path: str) -> bool:
+        """True if *path* was left by a process that is no longer running."""
+        if path == self._segment or path in self._retry_segments:
+            return False
+        match = _SEGMENT_PID.match(os.path.basename(path))
+        if match is None:
+            # written before segments were named per process
+            return True
+        pid = int(match.group(1))
+        # our own PID on a segment this writer does not hold is a previous
+        # process that had the same PID (e.g. PID 1 in a restarted container)
+        return pid == os.getpid() or not _pid_alive(pid)
+
+    def replay(self, engine: Engine) -> int:
+        """Insert events from segments left by dead processes, then delete them."""
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(self.spill_dir, "audit-*.jsonl"))):
+            if not self._orphaned(path):
+                continue
+            # claim the segment so a sibling replaying at the same time skips it
+            claimed = self._segment_path()
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue
+            path = claimed
+            rows = []
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rows.append(_decode(line))
+                    except (ValueError, KeyError):
+                        # torn last line from a crash mid-write
+                        logger.warning("Skipping unreadable audit spill line in %s", path)
+            if rows:
+                for i in range(0, len(rows), self.batch_size):
+                    with engine.begin() as conn:
+                        conn.execute(insert(AuditLog.__table__), rows[i : i + self.batch_size])
+            _remove(path)
+            replayed += len(rows)
+        if replayed:
+            logger.info("Replayed %d audit events from %s", replayed, self.spill_dir)
+        return replayed
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Audit writer flush crashed")
+
+    def start(self, engine: Engine) -> None:
+        if self.running:
+            return
+        try:
+            self.replay(engine)
+        except Exception:
+            logger.exception("Audit spill replay failed; files kept in %s", self.spill_dir)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the thread and flush what is left (leftovers stay spilled)."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # exists, owned by another user
+        return True
+    return True
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+audit_writer = AuditWriter()
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_async_audits(session):
+    for engine, row in session.info.pop(_ASYNC_KEY, ()):
+        audit_writer.submit(engine, row)
+        AUDIT_EVENTS.inc(mode=ASYNC)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_async_audits(session):
+    session.info.pop(_ASYNC_KEY, None)
+
+
+def start_audit_writer(engine: Engine) -> None:
+    if settings.AUDIT_ASYNC_ENABLED:
+        audit_writer.start(engine)
+
+
+def stop_audit_writer() -> None:
+    audit_writer.stop()
@@ -30,6 +30,65 @@ class Settings(BaseSettings):
     # On Azure App Service, set STATIC_DIR=/home/static via App Settings.
     # For local dev this defaults to <cwd>/static (works out of the box).
     STATIC_DIR: str = os.path.join(os.getcwd(), "static")
+    # Order numbers are allocated as <PREFIX>-<YEAR>-<zero-padded counter>,
+    # e.g. PO-2026-000123 (see app/core/order_numbers.py).
+    ORDER_NO_PREFIX: str = "PO"
+    ORDER_NO_DIGITS: int = 6
+    # Seconds before the in-process customer autocomplete index is rebuilt
+    # from the database (picks up writes made by other workers). 0 = never.
+    CUSTOMER_SEARCH_INDEX_TTL: int = 300
+    # POST /pricing/calc quote cache (app/core/quote_cache.py): max entries
+    # (0 = off) and seconds an entry lives. Edits to necks / pricing rules /
+    # shipping rates invalidate this worker's entries immediately; the TTL
+    # bounds how stale other workers can be.
+    PRICING_QUOTE_CACHE_SIZE: int = 1024
+    PRICING_QUOTE_CACHE_TTL: int = 60
+    # Seconds before in-memory tables built from master data (neck resolver,
+    # shipping rates, pricing rules) are rebuilt even without a local edit,
+    # so edits made through other workers are picked up. 0 = never.
+    MASTER_DATA_CACHE_TTL: int = 60
+    # Estimated parcel weight per garment, used to price shipping from the
+    # ShippingRate weight bands when only a quantity is known.
+    SHIPPING_KG_PER_PIECE: float = 0.2
+    # SQLite engine profile, applied to every new connection (app/db/session.py).
+    # WAL lets readers run alongside a writer; busy_timeout makes writers wait
+    # for the lock instead of failing with "database is locked". Set
+    # SQLITE_PRAGMAS_ENABLED=false to keep SQLite's stock settings.
+    SQLITE_PRAGMAS_ENABLED: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 64000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    # Optional read replica for heavy GET endpoints (get_read_db). When unset
+    # and the primary is a WAL-mode SQLite file, a second read-only connection
+    # pool is opened on the same file instead; otherwise reads use the primary.
+    READ_DATABASE_URL: str = ""
+    SQLITE_READ_POOL_ENABLED: bool = True
+    # Statements slower than this are logged (parameters redacted). 0 = off.
+    SLOW_QUERY_MS: int = 200
+    # Expose Prometheus metrics at GET /metrics (off by default: the output
+    # names routes and carries pool and SQL timings). When METRICS_TOKEN is
+    # set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>".
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: str = ""
+    # Add a Server-Timing header (db/auth/serialize/app/total) to responses.
+    SERVER_TIMING_ENABLED: bool = True
+    # What to do when a route runs more SQL statements than its
+    # @query_budget: "off", "warn" (log) or "raise". Defaults to "raise" for
+    # dev runs on the fallback SQLite file (no DATABASE_URL set, see
+    # app/db/session.py) and to "warn" for deployments.
+    QUERY_BUDGET_MODE: str = "warn" if os.getenv("DATABASE_URL") else "raise"
+    # Non-critical audit events (record_audit(..., mode="async")) are buffered
+    # and inserted in batches by a background thread (app/core/audit.py).
+    # Each event is first appended to a spill file under AUDIT_SPILL_DIR so
+    # events buffered at a crash are replayed on the next start.
+    AUDIT_ASYNC_ENABLED: bool = True
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_SPILL_DIR: str = os.path.join(os.getcwd(), "audit_spill")
+    AUDIT_SPILL_FSYNC: bool = False
 
     model_config = SettingsConfigDict(
         case_sensitive=True,
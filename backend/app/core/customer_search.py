@@ -0,0 +1,328 @@
+"""
+Customer autocomplete index.
+
+``GET /customers/search`` must answer in milliseconds without scanning the
+customers table, on SQLite as well as Postgres. Two strategies are used:
+
+- PostgreSQL with the ``pg_trgm`` extension installed: the query runs in the
+  database against the trigram GIN indexes created by migration 0006.
+- Everything else (SQLite, Postgres without pg_trgm): an in-process n-gram
+  index over the normalized name, phone and customer code. It is built lazily
+  on the first search, kept current from the ORM session events below
+  (applied only on commit, so rolled-back writes never leak in) and rebuilt
+  after ``CUSTOMER_SEARCH_INDEX_TTL`` seconds so rows written by other worker
+  processes are picked up. That refresh runs on a background thread; searches
+  keep using the current index until it is swapped in.
+
+Ranking, best first: exact key match, prefix match, substring match, then
+trigram overlap with the query.
+"""
+
+import bisect
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, func, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.customers import normalize_customer_name, normalize_phone
+from app.models.customer import Customer
+
+logger = logging.getLogger(__name__)
+
+GRAM = 3
+_MIN_TRIGRAM_SCORE = 0.34
+
+_PENDING_KEY = "customer_search_pending"
+
+
+def _grams(s: str) -> Set[str]:
+    if len(s) < GRAM:
+        return {s} if s else set()
+    return {s[i : i + GRAM] for i in range(len(s) - GRAM + 1)}
+
+
+def _fields(name: Optional[str], phone: Optional[str], code: Optional[str]) -> List[str]:
+    out = []
+    for v in (
+        normalize_customer_name(name),
+        normalize_phone(phone),
+        normalize_customer_name(code),
+    ):
+        if v:
+            out.append(v)
+    return out
+
+
+class CustomerSearchIndex:
+    """In-memory n-gram + sorted-prefix index over customer search keys."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs: Dict[int, List[str]] = {}
+        self._names: Dict[int, str] = {}
+        self._grams: Dict[str, Set[int]] = {}
+        self._sorted: List[Tuple[str, int]] = []
+        self._built_at: Optional[float] = None
+        # one rebuild at a time; changes committed while it reads the table
+        # are collected in _replay and applied to the new index
+        self._building = threading.Lock()
+        self._replay: Optional[list] = None
+        self._invalidated = False
+
+    # -- maintenance -------------------------------------------------------
+    def invalidate(self) -> None:
+        with self._lock:
+            self._built_at = None
+            self._invalidated = True
+
+    def needs_build(self) -> bool:
+        return self._built_at is None
+
+    def is_stale(self) -> bool:
+        if self._built_at is None:
+            return True
+        ttl = settings.CUSTOMER_SEARCH_INDEX_TTL
+        return ttl > 0 and time.monotonic() - self._built_at > ttl
+
+    def rebuild(self, db: Session) -> None:
+        with self._building:
+            self._rebuild(db)
+
+    def refresh_in_background(self, bind) -> Optional[threading.Thread]:
+        """Rebuild from *bind* on a daemon thread unless a rebuild is running."""
+        if not self._building.acquire(blocking=False):
+            return None
+
+        def run():
+            try:
+                with Session(bind=bind) as db:
+                    self._rebuild(db)
+            except Exception:
+                logger.exception("Customer search index refresh failed")
+            finally:
+                self._building.release()
+
+        thread = threading.Thread(target=run, name="customer-index-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def _rebuild(self, db: Session) -> None:
+        with self._lock:
+            self._replay = []
+            self._invalidated = False
+        try:
+            rows = db.query(
+                Customer.id, Customer.name, Customer.phone, Customer.customer_code
+            ).all()
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+        fresh = CustomerSearchIndex()
+        for r in rows:
+            fresh._add(r.id, r.name, r.phone, r.customer_code)
+        fresh._sorted.sort()
+        with self._lock:
+            self._docs, self._names = fresh._docs, fresh._names
+            self._grams, self._sorted = fresh._grams, fresh._sorted
+            for cid, values in self._replay:
+                self._remove(cid)
+                if values is not None:
+                    self._insert(cid, *values)
+            self._replay = None
+            # invalidated mid-read: the rows may predate the change
+            self._built_at = None if self._invalidated else time.monotonic()
+        logger.info("Customer search index rebuilt (%d customers)", len(rows))
+
+    def upsert(self, cid: int, name, phone, code) -> None:
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((cid, (name, phone, code)))
+            if self._built_at is None:
+                return  # next search rebuilds from the database anyway
+            self._remove(cid)
+            self._insert(cid, name, phone, code)
+
+    def remove(self, cid: int) -> None:
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((cid, None))
+            if self._built_at is not None:
+                self._remove(cid)
+
+    def _insert(self, cid: int, name, phone, code) -> None:
+        for key in self._add(cid, name, phone, code):
+            bisect.insort(self._sorted, (key, cid))
+
+    def _add(self, cid: int, name, phone, code) -> List[str]:
+        keys = _fields(name, phone, code)
+        self._docs[cid] = keys
+        self._names[cid] = name or ""
+        for key in keys:
+            for g in _grams(key):
+                self._grams.setdefault(g, set()).add(cid)
+            self._sorted.append((key, cid))
+        return keys
+
+    def _remove(self, cid: int) -> None:
+        keys = self._docs.pop(cid, None)
+        self._names.pop(cid, None)
+        if not keys:
+            return
+        for key in keys:
+            for g in _grams(key):
+                ids = self._grams.get(g)
+                if ids:
+                    ids.discard(cid)
+                    if not ids:
+                        del self._grams[g]
+            pos = bisect.bisect_left(self._sorted, (key, cid))
+            if pos < len(self._sorted) and self._sorted[pos] == (key, cid):
+                del self._sorted[pos]
+
+    # -- lookup ------------------------------------------------------------
+    def search(self, q: str, limit: int = 10) -> List[int]:
+        needle = normalize_customer_name(q) or ""
+        if not needle:
+            return []
+        scores: Dict[int, float] = {}
+        with self._lock:
+            # prefix matches via the sorted key list
+            pos = bisect.bisect_left(self._sorted, (needle, -1))
+            while pos < len(self._sorted) and self._sorted[pos][0].startswith(needle):
+                key, cid = self._sorted[pos]
+                scores[cid] = max(scores.get(cid, 0), 3.0 if key == needle else 2.0)
+                pos += 1
+
+            qgrams = _grams(needle)
+            overlap: Dict[int, int] = {}
+            for g in qgrams:
+                for cid in self._grams.get(g, ()):
+                    overlap[cid] = overlap.get(cid, 0) + 1
+            for cid, shared in overlap.items():
+                if scores.get(cid, 0) >= 2.0:
+                    continue
+                if any(needle in key for key in self._docs.get(cid, ())):
+                    scores[cid] = max(scores.get(cid, 0), 1.0 + shared / len(qgrams))
+                    continue
+                ratio = shared / len(qgrams)
+                if ratio >= _MIN_TRIGRAM_SCORE:
+                    scores[cid] = max(scores.get(cid, 0), ratio)
+
+            ranked = sorted(
+                scores.items(), key=lambda kv: (-kv[1], self._names.get(kv[0], ""), kv[0])
+            )
+        return [cid for cid, _ in ranked[:limit]]
+
+
+customer_index = CustomerSearchIndex()
+
+
+_pg_trgm_available: Dict[str, bool] = {}
+
+
+def _has_pg_trgm(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    url = str(bind.url)
+    if url not in _pg_trgm_available:
+        try:
+            _pg_trgm_available[url] = bool(
+                db.execute(
+                    text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                ).first()
+            )
+        except Exception:
+            logger.exception("pg_trgm detection failed; using in-memory index")
+            _pg_trgm_available[url] = False
+    return _pg_trgm_available[url]
+
+
+def _like_escape(value: str) -> str:
+    # user input is matched literally: % and _ are not wildcards
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _pg_trgm_query(q: str, limit: int):
+    term = _like_escape(q)
+    digits = _like_escape(normalize_phone(q) or q)
+    prefix = Customer.name.ilike(f"{term}%", escape="\\")
+    return (
+        select(Customer.id)
+        .where(
+            or_(
+                Customer.name.ilike(f"%{term}%", escape="\\"),
+                Customer.phone_key.like(f"{digits}%", escape="\\"),
+                Customer.customer_code.ilike(f"{term}%", escape="\\"),
+                Customer.name.op("%")(q),
+            )
+        )
+        .order_by(prefix.desc(), func.similarity(Customer.name, q).desc(), Customer.name)
+        .limit(limit)
+    )
+
+
+def _search_pg_trgm(db: Session, q: str, limit: int) -> List[int]:
+    return list(db.execute(_pg_trgm_query(q, limit)).scalars())
+
+
+def search_customer_ids(db: Session, q: str, limit: int = 10) -> List[int]:
+    """Return up to *limit* customer ids best matching *q*."""
+    q = (q or "").strip()
+    if not q:
+        return []
+    if _has_pg_trgm(db):
+        return _search_pg_trgm(db, q, limit)
+    if customer_index.needs_build():
+        customer_index.rebuild(db)
+    elif customer_index.is_stale():
+        customer_index.refresh_in_background(db.get_bind())
+    return customer_index.search(q, limit)
+
+
+# ---------------------------------------------------------------------------
+# Incremental maintenance from ORM writes
+# ---------------------------------------------------------------------------
+def mark_customer_changed(db: Session, customer: Customer) -> None:
+    """Queue *customer* for index refresh when *db* commits.
+
+    Flushed ORM changes are picked up automatically; callers writing through
+    Core statements (e.g. ``upsert_customer``) register the row here.
+    """
+    pending = db.info.setdefault(_PENDING_KEY, {})
+    pending[customer.id] = (customer.name, customer.phone, customer.customer_code)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_customer_changes(session, flush_context):
+    changed = [o for o in list(session.new) + list(session.dirty) if isinstance(o, Customer)]
+    deleted = [o for o in session.deleted if isinstance(o, Customer)]
+    if not changed and not deleted:
+        return
+    pending = session.info.setdefault(_PENDING_KEY, {})
+    for c in changed:
+        pending[c.id] = (c.name, c.phone, c.customer_code)
+    for c in deleted:
+        pending[c.id] = None
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_customer_changes(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for cid, values in pending.items():
+        if values is None:
+            customer_index.remove(cid)
+        else:
+            customer_index.upsert(cid, *values)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_customer_changes(session):
+    session.info.pop(_PENDING_KEY, None)
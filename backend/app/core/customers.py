@@ -0,0 +1,275 @@
+"""
+Customer identity helpers.
+
+Customers are matched on a normalized name key rather than the raw display
+name so that spelling variants such as ``"บริษัท ABC  จำกัด"`` and
+``"บริษัท abc จํากัด."`` resolve to one row. The key is stored in
+``customers.name_key`` (unique index) and maintained by the model itself; the
+helpers here provide:
+
+- normalize_customer_name / normalize_phone: the canonical key functions
+- upsert_customer: single-statement INSERT ... ON CONFLICT (name_key) path
+  used by order create/update
+- resolve_customers: batch find-or-create used by the bulk order importer
+- merge_duplicate_customers: one-off dedupe job that relinks orders to the
+  surviving row (see scripts/dedupe_customers.py)
+"""
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.orm import Session
+
+from app.models.customer import Customer
+from app.models.order import Order
+
+# NFKC decomposes SARA AM (U+0E33) into NIKHAHIT + SARA AA, and keyboards
+# often type NIKHAHIT before the tone mark ("นํ้า" instead of "น้ำ").
+# Recompose both spellings into the canonical SARA AM.
+_SARA_AM_RE = re.compile("ํ([่-๋]?)า")
+
+
+def normalize_customer_name(name: Optional[str]) -> Optional[str]:
+    """Return the matching key for a customer name (``None`` for blank names).
+
+    Case, whitespace, punctuation, zero-width characters and the two common
+    Thai SARA AM spellings are all folded away. A name made only of
+    punctuation keeps its case-folded, space-collapsed text as the key, so
+    it still matches itself on the ON CONFLICT (name_key) path.
+    """
+    if not name:
+        return None
+    s = unicodedata.normalize("NFKC", str(name))
+    s = _SARA_AM_RE.sub(lambda m: m.group(1) + "ำ", s)
+    s = s.casefold()
+    folded = "".join(
+        ch for ch in s if unicodedata.category(ch)[0] not in ("P", "Z", "C")
+    )
+    return folded or " ".join(s.split()) or None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Digits-only phone key; ``+66`` numbers are folded to the local ``0`` form."""
+    if not phone:
+        return None
+    digits = "".join(ch for ch in str(phone) if ch.isdigit())
+    if digits.startswith("66") and len(digits) == 11:
+        digits = "0" + digits[2:]
+    return digits or None
+
+
+def _dialect_insert(db: Session):
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def upsert_customer(
+    db: Session,
+    name: str,
+    phone: Optional[str] = None,
+    channel: Optional[str] = None,
+    address: Optional[str] = None,
+    customer_code: Optional[str] = None,
+    update_fields: Iterable[str] = ("phone", "address"),
+) -> Customer:
+    """Find-or-create the customer for *name* in a single upsert statement.
+
+    On conflict only *update_fields* are overwritten from the incoming values,
+    matching what the order endpoints historically refreshed on an existing
+    customer. Returns the (refreshed) ORM instance.
+    """
+    clean_name = (name or "").strip() or "Unknown"
+    values = {
+        "name": clean_name,
+        "name_key": normalize_customer_name(clean_name),
+        "phone": phone,
+        "phone_key": normalize_phone(phone),
+        "channel": channel,
+        "address": address,
+        "customer_code": customer_code,
+    }
+    fields = list(update_fields)
+    if "phone" in fields:
+        fields.append("phone_key")
+
+    insert = _dialect_insert(db)
+    table = Customer.__table__
+    if insert is not None:
+        stmt = insert(table).values(**values)
+        if fields:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.name_key],
+                set_={f: stmt.excluded[f] for f in fields},
+            )
+        else:
+            # no-op update so RETURNING still yields the existing row id
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.name_key],
+                set_={"name_key": stmt.excluded.name_key},
+            )
+        customer_id = db.execute(stmt.returning(table.c.id)).scalar_one()
+        customer = db.get(Customer, customer_id, populate_existing=True)
+        # Core writes bypass the flush hooks that keep the search index current
+        from app.core.customer_search import mark_customer_changed
+
+        mark_customer_changed(db, customer)
+    else:
+        customer = (
+            db.query(Customer).filter(Customer.name_key == values["name_key"]).first()
+        )
+        if not customer:
+            customer = Customer(
+                name=clean_name,
+                phone=phone,
+                channel=channel,
+                address=address,
+                customer_code=customer_code,
+            )
+        else:
+            for f in update_fields:
+                setattr(customer, f, values[f])
+        db.add(customer)
+        db.flush()
+
+    return customer
+
+
+def resolve_customers(
+    db: Session, customers: Iterable[Dict], create: bool = True
+) -> Dict[str, Optional[int]]:
+    """Map many customers to ids in one pass: name_key -> customer id.
+
+    *customers* are dicts with ``name`` and optional ``phone`` / ``channel``
+    / ``address`` / ``customer_code``. Existing rows are found with one
+    ``name_key IN (...)`` query and left unchanged; the missing ones are
+    inserted with one executemany (or mapped to None when *create* is
+    False, as in a dry run).
+    """
+    wanted: Dict[str, Dict] = {}
+    for c in customers:
+        name = (c.get("name") or "").strip() or "Unknown"
+        key = normalize_customer_name(name)
+        if key and key not in wanted:
+            wanted[key] = dict(c, name=name)
+    if not wanted:
+        return {}
+
+    table = Customer.__table__
+
+    def lookup(keys):
+        return dict(
+            db.execute(
+                select(table.c.name_key, table.c.id).where(table.c.name_key.in_(keys))
+            ).all()
+        )
+
+    ids: Dict[str, Optional[int]] = lookup(list(wanted))
+    missing = [k for k in wanted if k not in ids]
+    if missing and create:
+        db.execute(
+            table.insert(),
+            [
+                {
+                    "name": wanted[k]["name"],
+                    "name_key": k,
+                    "phone": wanted[k].get("phone"),
+                    "phone_key": normalize_phone(wanted[k].get("phone")),
+                    "channel": wanted[k].get("channel"),
+                    "address": wanted[k].get("address"),
+                    "customer_code": wanted[k].get("customer_code"),
+                }
+                for k in missing
+            ],
+        )
+        ids.update(lookup(missing))
+        # Core inserts bypass the flush hooks that keep the search index current
+        from app.core.customer_search import customer_index
+
+        customer_index.invalidate()
+    for k in missing:
+        ids.setdefault(k, None)
+    return ids
+
+
+_MERGE_FILL_FIELDS = ("customer_code", "phone", "channel", "address")
+
+
+def merge_duplicate_customers(db: Session, dry_run: bool = False) -> List[Dict]:
+    """Collapse customers sharing a normalized name key into one row.
+
+    The lowest id survives; blank contact fields on the survivor are filled
+    from the duplicates (newest first), every order pointing at a duplicate is
+    relinked, and the duplicates are deleted. ``name_key`` is (re)computed for
+    every row on the way, so this also backfills rows created before the
+    column existed. Returns one report entry per merged group.
+    """
+    rows = db.execute(
+        select(
+            Customer.id,
+            Customer.name,
+            Customer.phone,
+            *[getattr(Customer, f) for f in _MERGE_FILL_FIELDS if f != "phone"],
+        ).order_by(Customer.id)
+    ).all()
+
+    groups: Dict[str, List] = {}
+    for row in rows:
+        key = normalize_customer_name(row.name) or f"__id_{row.id}"
+        groups.setdefault(key, []).append(row)
+
+    report = []
+    for key, members in groups.items():
+        survivor, dupes = members[0], members[1:]
+        fill = {}
+        for f in _MERGE_FILL_FIELDS:
+            if getattr(survivor, f):
+                continue
+            for d in reversed(dupes):
+                if getattr(d, f):
+                    fill[f] = getattr(d, f)
+                    break
+        if dupes:
+            report.append(
+                {
+                    "name_key": key,
+                    "survivor_id": survivor.id,
+                    "merged_ids": [d.id for d in dupes],
+                    "filled": sorted(fill),
+                }
+            )
+        if dry_run:
+            continue
+
+        dupe_ids = [d.id for d in dupes]
+        if dupe_ids:
+            db.execute(
+                update(Order)
+                .where(Order.customer_id.in_(dupe_ids))
+                .values(customer_id=survivor.id)
+            )
+            db.execute(delete(Customer).where(Customer.id.in_(dupe_ids)))
+        phone = fill.get("phone", survivor.phone)
+        db.execute(
+            update(Customer)
+            .where(Customer.id == survivor.id)
+            .values(
+                name_key=None if key.startswith("__id_") else key,
+                phone_key=normalize_phone(phone),
+                **fill,
+            )
+        )
+
+    if not dry_run:
+        db.flush()
+        from app.core.customer_search import customer_index
+
+        customer_index.invalidate()
+    return report
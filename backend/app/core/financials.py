@@ -0,0 +1,91 @@
+"""
+Order-level money columns, computed in one place.
+
+``order_financials`` is a pure function: priced lines (``price_item``
+results, or any dicts with ``line_total`` / ``line_cost`` / ``addon_total``)
+plus the order's own fields in, every derived ``orders`` column out. Order
+create and update, the bulk importer and the re-pricing job
+(app/core/order_repricing.py) all use it, so the rules below hold
+everywhere:
+
+* a manual ``add_on_cost`` equal to the sum of the items' add-ons is the
+  same charge entered twice and counts as 0;
+* ``pre_vat = items + manual add-on + shipping - discount``;
+* VAT included: ``pre_vat`` is the grand total and VAT is its 7/107 share;
+  VAT excluded: VAT is 7% of ``pre_vat`` on top;
+* ``balance = grand_total - deposit_1 - deposit_2``.
+
+Money is Decimal; VAT and grand total are rounded to satang.
+"""
+
+from dataclasses import asdict, dataclass
+from decimal import Decimal
+from typing import Dict, Iterable
+
+_CENT = Decimal("0.01")
+
+
+def _dec(value) -> Decimal:
+    return Decimal(str(value or 0))
+
+
+@dataclass(frozen=True)
+class OrderFinancials:
+    items_total: Decimal
+    total_cost: Decimal
+    add_on_options_total: Decimal
+    add_on_cost: Decimal
+    shipping_cost: Decimal
+    discount_amount: Decimal
+    vat_amount: Decimal
+    grand_total: Decimal
+    balance_amount: Decimal
+
+    def columns(self) -> Dict[str, Decimal]:
+        """The values to store on ``orders`` (``items_total`` is not a column)."""
+        values = asdict(self)
+        del values["items_total"]
+        return values
+
+
+def order_financials(
+    lines: Iterable[Dict],
+    shipping_cost=0,
+    add_on_cost=0,
+    discount_amount=0,
+    is_vat_included: bool = False,
+    deposit_1=0,
+    deposit_2=0,
+) -> OrderFinancials:
+    lines = list(lines)
+    items_total = sum((_dec(l["line_total"]) for l in lines), Decimal(0))
+    items_cost = sum((_dec(l["line_cost"]) for l in lines), Decimal(0))
+    item_addons = sum((_dec(l["addon_total"]) for l in lines), Decimal(0))
+    shipping = _dec(shipping_cost)
+    manual_addon = _dec(add_on_cost)
+    discount = _dec(discount_amount)
+
+    # Guard: if manual addon equals computed addons, treat manual as 0 to avoid double-charging
+    if manual_addon == item_addons:
+        manual_addon = Decimal(0)
+
+    pre_vat = items_total + manual_addon + shipping - discount
+    if is_vat_included:
+        # pre_vat already includes VAT. Extract the VAT portion.
+        vat = ((pre_vat * Decimal("7")) / Decimal("107")).quantize(_CENT)
+        grand_total = pre_vat.quantize(_CENT)
+    else:
+        vat = (pre_vat * Decimal("0.07")).quantize(_CENT)
+        grand_total = (pre_vat + vat).quantize(_CENT)
+
+    return OrderFinancials(
+        items_total=items_total,
+        total_cost=items_cost,
+        add_on_options_total=item_addons,
+        add_on_cost=manual_addon,
+        shipping_cost=shipping,
+        discount_amount=discount,
+        vat_amount=vat,
+        grand_total=grand_total,
+        balance_amount=grand_total - _dec(deposit_1) - _dec(deposit_2),
+    )
@@ -0,0 +1,96 @@
+"""
+Version counter for pricing master data (neck types, pricing rules, shipping
+rates).
+
+Anything derived from these tables and kept in memory (the quote cache, the
+neck resolver, the shipping table) is keyed on ``master_version()``. The
+version is bumped when a session that flushed changes to one of the tracked
+models commits, so a neck edit made through the API invalidates derived data
+in this process immediately; rolled-back edits never bump it. Other worker processes only see the edit
+once their cached entries expire, so derived caches must also have a TTL
+(``MasterDataCache`` applies ``MASTER_DATA_CACHE_TTL``).
+"""
+
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.pricing_rule import PricingRule, ShippingRate
+from app.models.product import NeckType
+
+TRACKED_MODELS = (NeckType, PricingRule, ShippingRate)
+
+_PENDING_KEY = "master_data_changed"
+
+_lock = threading.Lock()
+_version = 0
+
+
+def master_version() -> int:
+    return _version
+
+
+def bump_master_version() -> int:
+    """Invalidate everything derived from master data; returns the new version."""
+    global _version
+    with _lock:
+        _version += 1
+        return _version
+
+
+T = TypeVar("T")
+
+
+class MasterDataCache(Generic[T]):
+    """One value built from master data, rebuilt on a version bump or after the TTL."""
+
+    def __init__(self, build: Callable[[Session], T]):
+        self._build = build
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._version: Optional[int] = None
+        self._built_at = 0.0
+
+    def get(self, db: Session) -> T:
+        version = master_version()
+        ttl = settings.MASTER_DATA_CACHE_TTL
+        with self._lock:
+            if (
+                self._value is not None
+                and self._version == version
+                and not (ttl > 0 and time.monotonic() - self._built_at > ttl)
+            ):
+                return self._value
+        value = self._build(db)
+        with self._lock:
+            self._value, self._version, self._built_at = value, version, time.monotonic()
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value = None
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_master_changes(session, flush_context):
+    if session.info.get(_PENDING_KEY):
+        return
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, TRACKED_MODELS):
+            session.info[_PENDING_KEY] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_master_changes(session):
+    if session.info.pop(_PENDING_KEY, None):
+        bump_master_version()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_master_changes(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,174 @@
+"""
+Tolerant neck-name resolution shared by ``POST /pricing/calc`` and order
+pricing.
+
+Requested neck names come from free text and dropdown labels ("คอปกเชิ้ต
+(บังคับไหล่สโลป+40 บาท/ตัว)", "คอวีชน มีลิ้น", ...). They resolve to a
+NeckType row by, in order:
+
+1. exact match of the normalized name (``normalize_neck_name``);
+2. the longest configured name contained in the requested name;
+3. the longest configured name containing the requested name.
+
+Ties go to the lower id. The index over all NeckType rows is built once per
+``master_version()`` (and at most every ``MASTER_DATA_CACHE_TTL`` seconds,
+to pick up edits made by other workers): a dict for rule 1 and an Aho-Corasick
+automaton for rule 2, so a lookup is linear in the requested name rather
+than in the number of necks. Rule 3 is a scan, reached only when the first
+two miss. Results are memoized per raw string until the next rebuild.
+
+The index holds ``NeckInfo`` snapshots rather than ORM rows, so results can
+outlive the session that loaded them.
+"""
+
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.master_data import MasterDataCache
+from app.models.product import NeckType
+
+# Bound on memoized raw strings; the memo is reset when it fills up
+MEMO_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class NeckInfo:
+    id: int
+    name: str
+    additional_cost: Optional[Decimal]
+    force_slope: bool
+
+
+def normalize_neck_name(s: Optional[str]) -> str:
+    if not s:
+        return ""
+    ns = str(s)
+    ns = ns.replace("นํ้า", "น้ำ")
+    # remove parenthetical annotations
+    ns = re.sub(r"\(.*?\)", "", ns)
+    ns = re.sub(r"\s+", " ", ns).strip()
+    return ns
+
+
+class NeckIndex:
+    def __init__(self, necks: List[NeckInfo]):
+        # (normalized name, neck), lowest id first so ties keep the lower id
+        self._names: List[Tuple[str, NeckInfo]] = []
+        self._exact: Dict[str, NeckInfo] = {}
+        for neck in sorted(necks, key=lambda n: n.id):
+            norm = normalize_neck_name(neck.name)
+            if not norm:
+                continue
+            self._names.append((norm, neck))
+            self._exact.setdefault(norm, neck)
+        self._build_automaton()
+        self._memo: Dict[str, Optional[NeckInfo]] = {}
+        self._lock = threading.Lock()
+
+    def _build_automaton(self) -> None:
+        # goto[state] maps char -> state; out[state] is the best (longest,
+        # lowest id) pattern ending at that state, following failure links
+        goto: List[Dict[str, int]] = [{}]
+        out: List[Optional[int]] = [None]
+        for pos, (norm, _) in enumerate(self._names):
+            state = 0
+            for ch in norm:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(None)
+                state = nxt
+            if out[state] is None:
+                out[state] = pos
+        # breadth first, so a state's failure target is final before its children
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            inherited = out[fail[state]]
+            if inherited is not None and (
+                out[state] is None or self._better(inherited, out[state])
+            ):
+                out[state] = inherited
+            for ch, nxt in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                queue.append(nxt)
+        self._goto, self._fail, self._out = goto, fail, out
+
+    def _better(self, a: int, b: int) -> bool:
+        """Pattern *a* beats *b*: longer, then lower id."""
+        la, lb = len(self._names[a][0]), len(self._names[b][0])
+        return la > lb or (la == lb and a < b)
+
+    def _longest_contained(self, need: str) -> Optional[NeckInfo]:
+        goto, fail, out = self._goto, self._fail, self._out
+        best = None
+        state = 0
+        for ch in need:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            found = out[state]
+            if found is not None and (best is None or self._better(found, best)):
+                best = found
+        return self._names[best][1] if best is not None else None
+
+    def _longest_containing(self, need: str) -> Optional[NeckInfo]:
+        best = None
+        for norm, neck in self._names:
+            if need in norm and (best is None or len(norm) > len(best[0])):
+                best = (norm, neck)
+        return best[1] if best else None
+
+    def resolve(self, raw: Optional[str]) -> Optional[NeckInfo]:
+        key = raw or ""
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        need = normalize_neck_name(key)
+        neck = None
+        if need:
+            neck = (
+                self._exact.get(need)
+                or self._longest_contained(need)
+                or self._longest_containing(need)
+            )
+        with self._lock:
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[key] = neck
+        return neck
+
+
+def _build_index(db: Session) -> NeckIndex:
+    rows = db.query(
+        NeckType.id, NeckType.name, NeckType.additional_cost, NeckType.force_slope
+    ).all()
+    return NeckIndex(
+        [NeckInfo(r.id, r.name, r.additional_cost, bool(r.force_slope)) for r in rows]
+    )
+
+
+_index = MasterDataCache(_build_index)
+
+
+def neck_index(db: Session) -> NeckIndex:
+    """The resolver index for the current master data, rebuilt when stale."""
+    return _index.get(db)
+
+
+def resolve_neck(db: Session, raw: Optional[str]) -> Optional[NeckInfo]:
+    return neck_index(db).resolve(raw)
@@ -0,0 +1,553 @@
+"""
+Bulk order import from CSV / XLSX (POST /orders/import, scripts/import_orders.py).
+
+File layout: one row per order item, the same shape the export writes.
+Consecutive rows with the same ``order_ref`` (or ``order_no``, or else
+``customer_name``) form one order; order-level columns are read from the
+group's first row. Sizes are one column per size (``size_M`` or just ``M``)
+and ``selected_add_ons`` is a JSON list or a comma separated list of add-on
+codes.
+
+Pipeline, all streaming:
+
+1. Rows are read lazily (csv module, or ``iterparse`` over the sheet XML of
+   the workbook) and grouped into orders.
+2. Each order is validated with the same ``OrderCreate`` schema as
+   ``POST /orders``; any error rejects the whole order and is reported with
+   the spreadsheet row number and column.
+3. Valid orders are buffered into chunks. Per chunk: items are priced with
+   ``price_item`` against the shared neck index and pricing rules, supplied
+   order numbers are checked with one query, customers are resolved with
+   one ``resolve_customers`` pass, generated order numbers are reserved as
+   one block, and orders + items are inserted with two executemany
+   statements, then committed. A failing chunk is rolled back and reported;
+   later chunks continue.
+
+``dry_run`` runs steps 1-3 without writing anything, so the report shows
+exactly what would be rejected. Supplied order numbers that already exist
+are rejected, which makes re-running a partially imported file safe.
+"""
+
+import codecs
+import csv
+import json
+import re
+import uuid
+import zipfile
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import iterparse
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.api.rbac import normalize_status
+from app.core.audit import record_audit
+from app.core.customers import normalize_customer_name, resolve_customers
+from app.core.neck_resolver import NeckIndex, neck_index
+from app.core.order_export import SIZES
+from app.core.order_numbers import reserve_order_nos
+from app.core.financials import order_financials
+from app.core.order_pricing import price_item
+from app.core.order_rollups import apply_deltas, deltas_for_rows
+from app.core.pricing_constants import ADDON_PRICES
+from app.core.pricing_rules import RuleTable, rule_table
+from app.core.shipping import ShippingTable, quote_shipping, shipping_table
+from app.models.order import Order, OrderItem
+from app.schemas.order import OrderCreate
+
+ORDER_FIELDS = (
+    "order_no",
+    "customer_name",
+    "phone",
+    "contact_channel",
+    "address",
+    "brand",
+    "customer_code",
+    "graphic_code",
+    "product_type",
+    "deadline",
+    "usage_date",
+    "status",
+    "is_vat_included",
+    "shipping_cost",
+    "add_on_cost",
+    "discount_amount",
+    "design_fee",
+    "deposit_1",
+    "deposit_2",
+    "note",
+)
+ITEM_FIELDS = (
+    "product_name",
+    "fabric_type",
+    "neck_type",
+    "sleeve_type",
+    "selected_add_ons",
+    "is_oversize",
+    "cost_per_unit",
+)
+_DATE_FIELDS = ("deadline", "usage_date")
+_SIZE_BY_HEADER = {s.lower(): s for s in SIZES}
+_SIZE_BY_HEADER.update({f"size_{s.lower()}": s for s in SIZES})
+
+CHUNK_ORDERS = 200
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+_SERIAL_RE = re.compile(r"^\d+(\.\d+)?$")
+
+
+class ImportFormatError(ValueError):
+    """The file itself cannot be imported (unreadable, missing columns)."""
+
+
+# -- readers ----------------------------------------------------------------
+
+
+def iter_csv_rows(fileobj) -> Iterator[List[str]]:
+    """Rows of a UTF-8 (optionally BOM-prefixed) CSV binary stream."""
+    text = codecs.getreader("utf-8-sig")(fileobj)
+    try:
+        yield from csv.reader(text)
+    except UnicodeDecodeError as exc:
+        raise ImportFormatError("CSV file must be UTF-8 encoded") from exc
+
+
+def _column_index(ref: str) -> int:
+    idx = 0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        idx = idx * 26 + (ord(ch.upper()) - 64)
+    return idx - 1
+
+
+def _ns(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_xlsx_rows(fileobj) -> Iterator[List[str]]:
+    """Rows of the first worksheet of an XLSX workbook, as strings.
+
+    The sheet XML is parsed incrementally and each row element is discarded
+    once read; only the shared-strings table is held in memory.
+    """
+    try:
+        zf = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile as exc:
+        raise ImportFormatError("Not a valid XLSX file") from exc
+    with zf:
+        names = zf.namelist()
+        shared: List[str] = []
+        if "xl/sharedStrings.xml" in names:
+            with zf.open("xl/sharedStrings.xml") as f:
+                for _, el in iterparse(f):
+                    if _ns(el.tag) == "si":
+                        shared.append("".join(t.text or "" for t in el.iter() if _ns(t.tag) == "t"))
+                        el.clear()
+        sheets = sorted(n for n in names if n.startswith("xl/worksheets/sheet"))
+        if not sheets:
+            raise ImportFormatError("Workbook has no worksheet")
+        sheet = "xl/worksheets/sheet1.xml" if "xl/worksheets/sheet1.xml" in names else sheets[0]
+        with zf.open(sheet) as f:
+            for _, el in iterparse(f):
+                if _ns(el.tag) != "row":
+                    continue
+                row: List[str] = []
+                for pos, c in enumerate(el):
+                    if _ns(c.tag) != "c":
+                        continue
+                    ref = c.get("r")
+                    col = _column_index(ref) if ref else pos
+                    kind = c.get("t")
+                    if kind == "inlineStr":
+                        value = "".join(t.text or "" for t in c.iter() if _ns(t.tag) == "t")
+                    else:
+                        v = next((x.text for x in c if _ns(x.tag) == "v"), None) or ""
+                        if kind == "s" and v:
+                            value = shared[int(v)]
+                        elif kind == "b":
+                            value = "true" if v == "1" else "false"
+                        elif kind in (None, "n") and v.endswith(".0"):
+                            value = v[:-2]
+                        else:
+                            value = v
+                    row.extend([""] * (col - len(row)))
+                    row.append(value)
+                el.clear()
+                yield row
+
+
+def iter_rows(fileobj, filename: Optional[str]) -> Iterator[List[str]]:
+    if (filename or "").lower().endswith(".xlsx"):
+        return iter_xlsx_rows(fileobj)
+    return iter_csv_rows(fileobj)
+
+
+# -- parsing ----------------------------------------------------------------
+
+
+@dataclass
+class ImportReport:
+    dry_run: bool
+    rows: int = 0
+    orders: int = 0
+    created: int = 0
+    failed: int = 0
+    new_customers: int = 0
+    order_nos: List[str] = field(default_factory=list)
+    errors: List[Dict] = field(default_factory=list)
+
+    def error(self, row: int, order: Optional[str], message: str, column: Optional[str] = None):
+        self.errors.append({"row": row, "order": order, "column": column, "message": message})
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class _ParsedOrder:
+    key: str
+    rows: List[int]
+    order: OrderCreate
+    order_no: Optional[str] = None
+    customer_key: Optional[str] = None
+
+
+def _read_header(header: List[str]) -> Dict[int, str]:
+    columns = {}
+    for i, raw in enumerate(header):
+        name = re.sub(r"\s+", "_", (raw or "").strip().lower())
+        if name in _SIZE_BY_HEADER:
+            columns[i] = "size:" + _SIZE_BY_HEADER[name]
+        elif name in ORDER_FIELDS or name in ITEM_FIELDS or name == "order_ref":
+            columns[i] = name
+    present = set(columns.values())
+    if "customer_name" not in present:
+        raise ImportFormatError("Missing required column: customer_name")
+    if "product_name" not in present:
+        raise ImportFormatError("Missing required column: product_name")
+    return columns
+
+
+def _cells(row: List[str], columns: Dict[int, str]) -> Dict[str, str]:
+    cells = {}
+    for i, name in columns.items():
+        value = row[i].strip() if i < len(row) and row[i] is not None else ""
+        if value:
+            cells[name] = value
+    return cells
+
+
+def _group_key(cells: Dict[str, str]) -> str:
+    return cells.get("order_ref") or cells.get("order_no") or cells.get("customer_name") or ""
+
+
+def _iter_groups(rows: Iterator[List[str]], columns, report) -> Iterator[Tuple[str, List]]:
+    """Consecutive rows sharing a group key, as (key, [(row_no, cells), ...])."""
+    key, group = None, []
+    for row_no, row in enumerate(rows, start=2):
+        cells = _cells(row, columns)
+        if not cells:
+            continue
+        report.rows += 1
+        k = _group_key(cells)
+        if group and k != key:
+            yield key, group
+            group = []
+        key = k
+        group.append((row_no, cells))
+    if group:
+        yield key, group
+
+
+def _parse_date(value: str) -> str:
+    if _SERIAL_RE.match(value):
+        # Excel stores dates as day serials when the cell is date-formatted
+        return (_EXCEL_EPOCH + timedelta(days=float(value))).isoformat()
+    return value
+
+
+def _parse_add_ons(value: str) -> List[str]:
+    if value.startswith("["):
+        codes = json.loads(value)
+    else:
+        codes = [c.strip() for c in re.split(r"[,;]", value) if c.strip()]
+    unknown = [c for c in codes if c not in ADDON_PRICES]
+    if unknown:
+        raise ValueError(f"unknown add-on(s): {', '.join(unknown)}")
+    return codes
+
+
+def _parse_group(key: str, group: List, report: ImportReport) -> Optional[_ParsedOrder]:
+    first_row, head = group[0]
+    order_data = {f: head[f] for f in ORDER_FIELDS if f in head}
+    for f in _DATE_FIELDS:
+        if f in order_data:
+            order_data[f] = _parse_date(order_data[f])
+    if "status" in order_data:
+        order_data["status"] = normalize_status(order_data["status"])
+
+    ok = True
+    items = []
+    for row_no, cells in group:
+        item = {f: cells[f] for f in ITEM_FIELDS if f in cells}
+        matrix = {}
+        for name, value in cells.items():
+            if name.startswith("size:"):
+                try:
+                    qty = int(float(value))
+                except ValueError:
+                    qty = -1
+                if qty < 0:
+                    report.error(row_no, key, "quantity must be a whole number >= 0", "size_" + name[5:])
+                    ok = False
+                elif qty:
+                    matrix[name[5:]] = qty
+        if "selected_add_ons" in item:
+            try:
+                item["selected_add_ons"] = _parse_add_ons(item["selected_add_ons"])
+            except ValueError as exc:
+                report.error(row_no, key, str(exc), "selected_add_ons")
+                ok = False
+        if "product_name" not in item:
+            report.error(row_no, key, "product_name is required", "product_name")
+            ok = False
+        elif not matrix:
+            report.error(row_no, key, "row has no size quantities", None)
+            ok = False
+        item["quantity_matrix"] = matrix
+        items.append(item)
+    if not ok:
+        return None
+
+    try:
+        order = OrderCreate(**order_data, items=items)
+    except ValidationError as exc:
+        for err in exc.errors():
+            loc = err.get("loc") or ()
+            row_no, column = first_row, None
+            if len(loc) >= 2 and loc[0] == "items" and isinstance(loc[1], int):
+                row_no = group[loc[1]][0]
+                column = str(loc[2]) if len(loc) > 2 else None
+            elif loc:
+                column = str(loc[0])
+            report.error(row_no, key, err.get("msg", "invalid value"), column)
+        return None
+
+    return _ParsedOrder(
+        key=key,
+        rows=[r for r, _ in group],
+        order=order,
+        order_no=(order.order_no or "").strip() or None,
+        customer_key=normalize_customer_name((order.customer_name or "").strip() or "Unknown"),
+    )
+
+
+# -- writing ----------------------------------------------------------------
+
+
+def _reject(report: ImportReport, parsed: _ParsedOrder, message: str, column=None) -> None:
+    report.error(parsed.rows[0], parsed.key, message, column)
+    report.failed += 1
+
+
+def _process_chunk(
+    db: Session,
+    chunk: List[_ParsedOrder],
+    necks: NeckIndex,
+    rates: ShippingTable,
+    rules: RuleTable,
+    seen_order_nos: set,
+    report: ImportReport,
+    user_id: Optional[int],
+) -> None:
+    # Supplied order numbers: unique within the file and not already stored
+    supplied = [p.order_no for p in chunk if p.order_no]
+    taken = set()
+    if supplied:
+        taken = set(
+            db.execute(select(Order.order_no).where(Order.order_no.in_(supplied))).scalars()
+        )
+    valid = []
+    for p in chunk:
+        if p.order_no and (p.order_no in taken or p.order_no in seen_order_nos):
+            _reject(report, p, f"order_no {p.order_no} already exists", "order_no")
+            continue
+        if p.order_no:
+            seen_order_nos.add(p.order_no)
+        valid.append(p)
+    if not valid:
+        return
+
+    priced = []
+    for p in valid:
+        o = p.order
+        lines = []
+        for item in o.items:
+            db_neck = necks.resolve(item.neck_type)
+            lines.append(price_item(item, o.product_type, db_neck, rules))
+        shipping = o.shipping_cost
+        if "shipping_cost" not in o.model_fields_set:
+            # blank column: same default as POST /orders
+            qty = sum(sum(i.quantity_matrix.values()) for i in o.items)
+            shipping = quote_shipping(rates, qty).price
+        priced.append((p, lines, order_financials(
+            lines,
+            shipping_cost=shipping,
+            add_on_cost=o.add_on_cost,
+            discount_amount=o.discount_amount,
+            is_vat_included=o.is_vat_included,
+            deposit_1=o.deposit_1,
+            deposit_2=o.deposit_2,
+        )))
+
+    customers = [
+        {
+            "name": p.order.customer_name,
+            "phone": p.order.phone,
+            "channel": p.order.contact_channel,
+            "address": p.order.address,
+            "customer_code": p.order.customer_code,
+        }
+        for p in valid
+    ]
+    if report.dry_run:
+        ids = resolve_customers(db, customers, create=False)
+        report.new_customers += sum(1 for v in ids.values() if v is None)
+        report.created += len(valid)
+        return
+
+    try:
+        known = resolve_customers(db, customers, create=False)
+        ids = resolve_customers(db, customers)
+        new_customers = sum(1 for v in known.values() if v is None)
+        generated = iter(reserve_order_nos(db, sum(1 for p in valid if not p.order_no)))
+
+        order_rows = []
+        for p, lines, money in priced:
+            o = p.order
+            order_rows.append(
+                {
+                    "order_no": p.order_no or next(generated),
+                    "order_uuid": uuid.uuid4().hex,
+                    "customer_id": ids.get(p.customer_key),
+                    "customer_name": (o.customer_name or "").strip() or "Unknown",
+                    "brand": o.brand,
+                    "customer_code": o.customer_code,
+                    "graphic_code": o.graphic_code,
+                    "product_type": o.product_type,
+                    "contact_channel": o.contact_channel,
+                    "address": o.address,
+                    "phone": o.phone,
+                    "status": normalize_status(o.status) or "WAITING_BOOKING",
+                    **money.columns(),
+                    "design_fee": o.design_fee,
+                    "is_vat_included": o.is_vat_included,
+                    "deadline": o.deadline,
+                    "usage_date": o.usage_date,
+                    "deposit_amount": o.deposit_amount,
+                    "deposit_1": o.deposit_1,
+                    "deposit_2": o.deposit_2,
+                    "note": o.note,
+                    "created_by_id": user_id,
+                }
+            )
+        orders = Order.__table__
+        order_ids = db.execute(
+            insert(orders).returning(orders.c.id, sort_by_parameter_order=True),
+            order_rows,
+        ).scalars().all()
+
+        item_rows = []
+        for order_id, (p, lines, _) in zip(order_ids, priced):
+            for item, calc in zip(p.order.items, lines):
+                qty = sum(item.quantity_matrix.values())
+                item_rows.append(
+                    {
+                        "order_id": order_id,
+                        "product_name": item.product_name,
+                        "fabric_type": item.fabric_type,
+                        "neck_type": item.neck_type,
+                        "sleeve_type": item.sleeve_type,
+                        "quantity_matrix": json.dumps(item.quantity_matrix),
+                        "total_qty": qty,
+                        "price_per_unit": calc["unit_price"],
+                        "total_price": calc["line_total"],
+                        "cost_per_unit": item.cost_per_unit,
+                        "total_cost": calc["line_cost"],
+                        "selected_add_ons": json.dumps(calc["selected"]),
+                        "auto_add_ons": json.dumps(calc["auto"]),
+                        "is_oversize": item.is_oversize,
+                        "item_addon_total": calc["addon_total"],
+                    }
+                )
+        db.execute(insert(OrderItem.__table__), item_rows)
+        # Core inserts bypass the ORM flush listener that maintains the rollups
+        apply_deltas(db.connection(), deltas_for_rows(order_rows))
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        for p in valid:
+            _reject(report, p, f"chunk failed: {exc.__class__.__name__}: {exc}")
+        return
+
+    report.created += len(order_rows)
+    report.new_customers += new_customers
+    report.order_nos.extend(r["order_no"] for r in order_rows)
+
+
+def import_orders(
+    db: Session,
+    rows: Iterable[List[str]],
+    user_id: Optional[int] = None,
+    actor_role: Optional[str] = None,
+    dry_run: bool = False,
+    chunk_size: int = CHUNK_ORDERS,
+    source: Optional[str] = None,
+) -> ImportReport:
+    """Import orders from *rows* (header first); see the module docstring."""
+    report = ImportReport(dry_run=dry_run)
+    rows = iter(rows)
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise ImportFormatError("File is empty")
+    columns = _read_header(header)
+
+    necks = neck_index(db)
+    rates = shipping_table(db)
+    rules = rule_table(db)
+    seen_order_nos: set = set()
+    chunk: List[_ParsedOrder] = []
+    for key, group in _iter_groups(rows, columns, report):
+        report.orders += 1
+        parsed = _parse_group(key, group, report)
+        if parsed is None:
+            report.failed += 1
+            continue
+        chunk.append(parsed)
+        if len(chunk) >= chunk_size:
+            _process_chunk(db, chunk, necks, rates, rules, seen_order_nos, report, user_id)
+            chunk = []
+    if chunk:
+        _process_chunk(db, chunk, necks, rates, rules, seen_order_nos, report, user_id)
+
+    if not dry_run and report.created:
+        record_audit(
+            db,
+            "IMPORT_ORDERS",
+            "import",
+            None,
+            details={
+                "source": source,
+                "rows": report.rows,
+                "created": report.created,
+                "failed": report.failed,
+            },
+            user_id=user_id,
+            actor_role=actor_role,
+        )
+        db.commit()
+    return report
@@ -0,0 +1,175 @@
+"""
+Order-number allocation.
+
+Numbers are handed out from the ``order_sequences`` counter table with a
+single atomic upsert::
+
+    INSERT INTO order_sequences (prefix, last_value) VALUES (:key, 1)
+    ON CONFLICT (prefix) DO UPDATE SET last_value = order_sequences.last_value + 1
+    RETURNING last_value
+
+Both SQLite (>= 3.35) and PostgreSQL execute this as one statement that takes
+a row/database write lock, so two concurrent ``create_order`` calls can never
+receive the same value and no retry-probe loop against ``orders.order_no`` is
+needed. The counter row participates in the caller's transaction: a rolled
+back order releases its number again.
+
+Formatted numbers look like ``PO-2026-000123`` (prefix, year, zero-padded
+counter). The counter restarts every (UTC) year because the year is part of
+the key. Suffix counters for client-supplied numbers are keyed
+``no:<number>`` so a number such as ``PO-2026`` cannot share a row with the
+``PO-2026`` year counter.
+
+A client-supplied number is checked and then inserted, so two concurrent
+creates can both see it free; ``insert_order`` catches the unique violation
+of the loser and allocates again through the suffix path.
+"""
+
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.order import Order
+from app.models.order_sequence import OrderSequence
+
+# attempts of insert_order before a lost unique race is re-raised
+INSERT_ATTEMPTS = 3
+
+
+def _dialect_insert(db: Session):
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def next_value(db: Session, key: str, count: int = 1) -> int:
+    """Atomically add *count* to the counter for *key* and return the new value.
+
+    With ``count > 1`` the caller owns the block ``value - count + 1 .. value``.
+    """
+    insert = _dialect_insert(db)
+    table = OrderSequence.__table__
+    if insert is not None:
+        stmt = (
+            insert(table)
+            .values(prefix=key, last_value=count)
+            .on_conflict_do_update(
+                index_elements=[table.c.prefix],
+                set_={"last_value": table.c.last_value + count},
+            )
+            .returning(table.c.last_value)
+        )
+        return int(db.execute(stmt).scalar_one())
+
+    # Generic fallback for other backends: the UPDATE takes a row lock, so the
+    # follow-up SELECT inside the same transaction still sees our own value.
+    bumped = db.execute(
+        update(table)
+        .where(table.c.prefix == key)
+        .values(last_value=table.c.last_value + count)
+    )
+    if not bumped.rowcount:
+        db.add(OrderSequence(prefix=key, last_value=count))
+        db.flush()
+        return count
+    return int(
+        db.execute(select(table.c.last_value).where(table.c.prefix == key)).scalar_one()
+    )
+
+
+def format_order_no(prefix: str, year: int, value: int) -> str:
+    return f"{prefix}-{year}-{value:0{settings.ORDER_NO_DIGITS}d}"
+
+
+def next_order_no(
+    db: Session, prefix: Optional[str] = None, now: Optional[datetime] = None
+) -> str:
+    """Allocate the next formatted order number, e.g. ``PO-2026-000123``."""
+    prefix = (prefix or settings.ORDER_NO_PREFIX).strip().upper()
+    year = (now or datetime.now(timezone.utc)).year
+    value = next_value(db, f"{prefix}-{year}")
+    return format_order_no(prefix, year, value)
+
+
+def reserve_order_nos(
+    db: Session, count: int, prefix: Optional[str] = None, now: Optional[datetime] = None
+) -> List[str]:
+    """Allocate *count* consecutive order numbers with one counter update."""
+    if count <= 0:
+        return []
+    prefix = (prefix or settings.ORDER_NO_PREFIX).strip().upper()
+    year = (now or datetime.now(timezone.utc)).year
+    last = next_value(db, f"{prefix}-{year}", count)
+    return [format_order_no(prefix, year, v) for v in range(last - count + 1, last + 1)]
+
+
+def allocate_order_no(db: Session, requested: Optional[str] = None) -> str:
+    """Return a collision-free order number for a new order.
+
+    Without a client-supplied number the next sequence value is used. A
+    client-supplied number is kept when free; when it is already taken the
+    suffix (``-1``, ``-2`` ...) comes from a per-number counter instead of
+    probing ``orders.order_no`` candidate by candidate.
+
+    Suffixed numbers can also exist without the counter knowing (sent by a
+    client, or left by the old probe loop). If the counter's candidate is
+    one of them, the counter jumps past the highest existing suffix.
+    """
+    base_no = (requested or "").strip()
+    if not base_no:
+        return next_order_no(db)
+
+    if not _order_no_taken(db, base_no):
+        return base_no
+    key = _suffix_key(base_no)
+    value = next_value(db, key)
+    if not _order_no_taken(db, f"{base_no}-{value}"):
+        return f"{base_no}-{value}"
+
+    stem = f"{base_no}-"
+    rows = db.execute(
+        select(Order.order_no).where(Order.order_no.startswith(stem, autoescape=True))
+    ).scalars()
+    highest = max(
+        int(no[len(stem):]) for no in rows if no[len(stem):].isdigit()
+    )
+    value = next_value(db, key, highest + 1 - value)
+    return f"{base_no}-{value}"
+
+
+def insert_order(db: Session, order: Order, requested: Optional[str] = None) -> str:
+    """Give *order* a number from ``allocate_order_no`` and flush its INSERT.
+
+    If a concurrent transaction committed the same number between the check
+    and the INSERT, the unique violation is rolled back to a savepoint and
+    the number is allocated again (now taken, so it gets a suffix).
+    """
+    for attempt in range(INSERT_ATTEMPTS):
+        order.order_no = allocate_order_no(db, requested)
+        try:
+            with db.begin_nested():
+                db.add(order)
+                db.flush()
+            return order.order_no
+        except IntegrityError:
+            if attempt == INSERT_ATTEMPTS - 1 or not _order_no_taken(db, order.order_no):
+                raise
+
+
+def _suffix_key(base_no: str) -> str:
+    return f"no:{base_no}"
+
+
+def _order_no_taken(db: Session, order_no: str) -> bool:
+    return db.execute(
+        select(Order.id).where(Order.order_no == order_no).limit(1)
+    ).first() is not None
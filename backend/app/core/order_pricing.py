@@ -0,0 +1,112 @@
+"""
+Order line pricing shared by order create/update and the bulk importer.
+
+``price_item`` is the pure part of ``orders.calculate_item_price``: it
+takes the resolved neck (see app/core/neck_resolver.py, or None) instead of
+a session, so callers that price many items price without queries.
+Order-level totals are ``financials.order_financials``.
+"""
+
+from decimal import Decimal
+from typing import Dict, Optional
+
+from app.core.pricing_constants import (
+    STEP_PRICING,
+    ADDON_PRICES,
+    DEFAULT_SLOPE_COST,
+    SPECIAL_SLOPE_NECKS,
+)
+
+
+def price_item(item, order_prod_type: Optional[str], db_neck=None, rules=None) -> Dict:
+    """Unit price, line total, cost and effective add-ons for one order item.
+
+    *db_neck* is the neck ``item.neck_type`` resolves to (a NeckType row or
+    ``NeckInfo``; None when the neck is not configured). *rules* is the
+    PricingRule ``RuleTable``; a rule for the item's fabric covering its
+    quantity replaces the STEP_PRICING shirt tier.
+
+    ``selected`` is the client's add-ons plus those the neck and oversize
+    rules force; ``auto`` lists the forced ones, which are stored with the
+    item so re-pricing can drop them when the rule no longer applies.
+    """
+    qty = sum(item.quantity_matrix.values()) if item.quantity_matrix else 0
+    p_type = getattr(item, "product_type", None) or order_prod_type or "shirt"
+
+    # 1. Base Price
+    if p_type == "sportsPants":
+        unit_price = STEP_PRICING["sportsPants"]
+    elif p_type == "fashionPants":
+        unit_price = STEP_PRICING["fashionPants"]
+    else:
+        neck_str = (item.neck_type or "").strip()
+        is_round_v = "ปก" not in neck_str and any(
+            k in neck_str for k in ["คอกลม", "คอวี"]
+        )
+        table = (
+            STEP_PRICING["roundVNeck"] if is_round_v else STEP_PRICING["collarOthers"]
+        )
+        if qty >= 10:
+            found = next(
+                (t for t in table if qty >= t["min_qty"] and qty <= t["max_qty"]), None
+            )
+            unit_price = found["price"] if found else table[0]["price"]
+        else:
+            unit_price = Decimal(240) if is_round_v else Decimal(300)
+        # a PricingRule for the item's fabric overrides the neck tier table
+        if rules:
+            rule_price = rules.unit_price(getattr(item, "fabric_type", None), qty)
+            if rule_price is not None:
+                unit_price = rule_price
+
+    # 2. Addon Price (DB Sync)
+    neck_str = (item.neck_type or "").strip()
+    chosen = getattr(item, "selected_add_ons", []) or []
+    selected = chosen
+
+    # Use truthy check: Decimal("0") is the SQLAlchemy column default and means
+    # "not configured" — fall back to DEFAULT_SLOPE_COST in that case.
+    _ac = db_neck.additional_cost if db_neck else None
+    try:
+        slope_price_db = Decimal(_ac) if _ac else DEFAULT_SLOPE_COST
+    except Exception:
+        slope_price_db = DEFAULT_SLOPE_COST
+
+    is_special_340 = any(k in neck_str for k in SPECIAL_SLOPE_NECKS)
+
+    # Treat slope as an add-on: add slopeShoulder when neck requires it (by name or DB flag)
+    if "(บังคับไหล่สโลป" in neck_str or (
+        db_neck and getattr(db_neck, "force_slope", False)
+    ):
+        if "slopeShoulder" not in selected:
+            selected = list(selected) + ["slopeShoulder"]
+
+    # Do not auto-add collarTongue for the special forced-slope necks (tongue is shown but not charged)
+    if "มีลิ้น" in neck_str and not is_special_340 and "collarTongue" not in selected:
+        selected = list(selected) + ["collarTongue"]
+
+    if getattr(item, "is_oversize", False) and "oversizeSlopeShoulder" not in selected:
+        selected = list(selected) + ["oversizeSlopeShoulder"]
+
+    # Calculate Addon Total
+    addon_sum = Decimal(0)
+    for code in selected:
+        cost = ADDON_PRICES.get(code, Decimal(0))
+        if code == "slopeShoulder":
+            cost = slope_price_db
+        addon_sum += cost
+
+    total_addon_line = addon_sum * qty
+    line_total = (unit_price * qty) + total_addon_line
+    line_cost = Decimal(str(item.cost_per_unit or 0)) * qty
+
+    return {
+        "unit_price": unit_price,
+        "line_total": line_total,
+        "line_cost": line_cost,
+        "selected": selected,
+        # add-ons the neck / oversize rules added on top of the client's choice
+        "auto": [code for code in selected if code not in chosen],
+        "addon_total": total_addon_line,
+    }
+
@@ -0,0 +1,272 @@
+"""
+Re-price open orders against the current master data (scripts/reprice_orders.py).
+
+After a price change (neck add-on costs, pricing rules) orders that are not
+CANCELLED or COMPLETED still carry the prices they were created with.
+``reprice_open_orders`` prices every item of those orders again with
+``price_item`` against the shared neck index and pricing rules, recomputes
+the order columns with ``order_financials`` and reports, per order, every
+column that would change. Item costs, shipping, discounts, manual add-ons
+and deposits are the order's own data and are kept.
+
+Reading and writing are separate so the job never holds a long transaction:
+
+1. Orders (with their items) are streamed with ``yield_per`` on a session of
+   their own and priced in memory; unchanged orders cost nothing further.
+2. With ``apply``, each chunk of changed orders is re-read by id on a
+   short-lived session, priced again from that fresh state (so an edit made
+   since step 1 is not overwritten with stale numbers), updated through the
+   ORM (rollups follow via their flush listener) and committed.
+
+Without ``apply`` nothing is written and the report shows what would change.
+"""
+
+import json
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session, selectinload
+
+from app.api.rbac import SETTLED_STATUSES
+from app.core.audit import record_audit
+from app.core.financials import order_financials
+from app.core.neck_resolver import NeckIndex, neck_index
+from app.core.order_pricing import price_item
+from app.core.pricing_rules import RuleTable, rule_table
+from app.models.order import Order, OrderItem
+
+CHUNK_ORDERS = 200
+
+_CENT = Decimal("0.01")
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value or 0)).quantize(_CENT)
+
+
+def _json(value, default):
+    try:
+        return json.loads(value) if value else default
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class RepriceReport:
+    dry_run: bool
+    scanned: int = 0
+    changed: int = 0
+    applied: int = 0
+    grand_total_delta: Decimal = Decimal("0")
+    diffs: List[Dict] = field(default_factory=list)
+
+    def as_dict(self) -> Dict:
+        data = asdict(self)
+        data["grand_total_delta"] = str(self.grand_total_delta)
+        return data
+
+
+_JSON_LISTS = ("selected_add_ons", "auto_add_ons")
+
+
+def _item_view(item) -> SimpleNamespace:
+    """An OrderItem in the shape ``price_item`` reads (an OrderCreate item).
+
+    Its add-ons are the client's choice only: the ones a neck or oversize
+    rule added are dropped, so ``price_item`` adds them back only while the
+    rule still applies (e.g. not after a neck's ``force_slope`` is turned off).
+    """
+    matrix = _json(item.quantity_matrix, {})
+    auto = _json(item.auto_add_ons, [])
+    return SimpleNamespace(
+        quantity_matrix=matrix if isinstance(matrix, dict) else {},
+        neck_type=item.neck_type,
+        fabric_type=item.fabric_type,
+        selected_add_ons=[a for a in _json(item.selected_add_ons, []) if a not in auto],
+        is_oversize=bool(item.is_oversize),
+        cost_per_unit=item.cost_per_unit,
+    )
+
+
+def plan_order(order: Order, necks: NeckIndex, rules: RuleTable) -> Tuple[Dict, Dict]:
+    """New ``orders`` columns and new item values (by item id) for *order*.
+
+    Both hold only what differs from the stored row.
+    """
+    lines = []
+    items: Dict[int, Dict] = {}
+    for item in order.items:
+        view = _item_view(item)
+        calc = price_item(view, order.product_type, necks.resolve(item.neck_type), rules)
+        # costs are entered per order, not master data
+        calc["line_cost"] = item.total_cost
+        lines.append(calc)
+        new = {
+            "price_per_unit": calc["unit_price"],
+            "total_price": calc["line_total"],
+            "item_addon_total": calc["addon_total"],
+        }
+        changed = {
+            k: v for k, v in new.items() if _money(v) != _money(getattr(item, k))
+        }
+        if calc["selected"] != _json(item.selected_add_ons, []):
+            changed["selected_add_ons"] = calc["selected"]
+        if item.auto_add_ons is not None and calc["auto"] != _json(item.auto_add_ons, []):
+            changed["auto_add_ons"] = calc["auto"]
+        if changed:
+            items[item.id] = changed
+
+    money = order_financials(
+        lines,
+        shipping_cost=order.shipping_cost,
+        add_on_cost=order.add_on_cost,
+        discount_amount=order.discount_amount,
+        is_vat_included=bool(order.is_vat_included),
+        deposit_1=order.deposit_1,
+        deposit_2=order.deposit_2,
+    )
+    columns = {
+        k: v for k, v in money.columns().items() if _money(v) != _money(getattr(order, k))
+    }
+    return columns, items
+
+
+def _diff(order: Order, columns: Dict, items: Dict) -> Dict:
+    return {
+        "order_id": order.id,
+        "order_no": order.order_no,
+        "status": order.status,
+        "changes": {
+            k: {"from": str(_money(getattr(order, k))), "to": str(_money(v))}
+            for k, v in columns.items()
+        },
+        "items_changed": len(items),
+    }
+
+
+def _record(report: RepriceReport, order: Order, columns: Dict, items: Dict) -> None:
+    report.changed += 1
+    if "grand_total" in columns:
+        report.grand_total_delta += _money(columns["grand_total"]) - _money(order.grand_total)
+    report.diffs.append(_diff(order, columns, items))
+
+
+def _open_orders(db: Session):
+    return (
+        db.query(Order)
+        .options(selectinload(Order.items))
+        .filter(or_(Order.status.is_(None), Order.status.notin_(SETTLED_STATUSES)))
+    )
+
+
+def _scoped(query, order_ids=None, neck_types=None):
+    if order_ids is not None:
+        query = query.filter(Order.id.in_(list(order_ids)))
+    if neck_types is not None:
+        # served by ix_order_items_neck_type
+        carrying = select(OrderItem.order_id).where(OrderItem.neck_type.in_(list(neck_types)))
+        query = query.filter(Order.id.in_(carrying))
+    return query
+
+
+def count_open_orders(
+    db: Session,
+    order_ids: Optional[Iterable[int]] = None,
+    neck_types: Optional[Iterable[str]] = None,
+) -> int:
+    query = db.query(Order.id).filter(
+        or_(Order.status.is_(None), Order.status.notin_(SETTLED_STATUSES))
+    )
+    return _scoped(query, order_ids, neck_types).count()
+
+
+def _apply_chunk(bind, order_ids: List[int], report: RepriceReport) -> None:
+    db = Session(bind=bind)
+    try:
+        necks, rules = neck_index(db), rule_table(db)
+        orders = _open_orders(db).filter(Order.id.in_(order_ids)).order_by(Order.id)
+        for order in orders:
+            columns, items = plan_order(order, necks, rules)
+            if not columns and not items:
+                continue
+            _record(report, order, columns, items)
+            for item in order.items:
+                for k, v in items.get(item.id, {}).items():
+                    setattr(item, k, json.dumps(v) if k in _JSON_LISTS else v)
+            for k, v in columns.items():
+                setattr(order, k, v)
+            report.applied += 1
+        db.commit()
+    finally:
+        db.close()
+
+
+def reprice_open_orders(
+    bind,
+    apply: bool = False,
+    chunk_size: int = CHUNK_ORDERS,
+    order_ids: Optional[Iterable[int]] = None,
+    neck_types: Optional[Iterable[str]] = None,
+    user_id: Optional[int] = None,
+    actor_role: Optional[str] = None,
+    progress: Optional[Callable[[RepriceReport], None]] = None,
+    reason: Optional[str] = None,
+) -> RepriceReport:
+    """Re-price all open orders, or the open ones among *order_ids* and / or
+    carrying an item whose ``neck_type`` is one of *neck_types*.
+
+    *bind* is an engine (or connection); the job opens its own sessions.
+    *progress* is called with the report after every chunk; *reason* is
+    recorded in the audit entry of an applied run.
+    """
+    report = RepriceReport(dry_run=not apply)
+    read_db = Session(bind=bind)
+    try:
+        necks, rules = neck_index(read_db), rule_table(read_db)
+        query = _scoped(_open_orders(read_db), order_ids, neck_types)
+        pending: List[int] = []
+        for order in query.order_by(Order.id).yield_per(chunk_size):
+            report.scanned += 1
+            if progress and report.scanned % chunk_size == 0:
+                progress(report)
+            columns, items = plan_order(order, necks, rules)
+            if not columns and not items:
+                continue
+            if not apply:
+                _record(report, order, columns, items)
+                continue
+            pending.append(order.id)
+            if len(pending) >= chunk_size:
+                _apply_chunk(bind, pending, report)
+                pending = []
+        if pending:
+            _apply_chunk(bind, pending, report)
+    finally:
+        read_db.close()
+    if progress:
+        progress(report)
+
+    if apply and report.applied:
+        db = Session(bind=bind)
+        try:
+            record_audit(
+                db,
+                "REPRICE_ORDERS",
+                "order",
+                None,
+                details={
+                    "reason": reason,
+                    "scanned": report.scanned,
+                    "applied": report.applied,
+                    "grand_total_delta": str(report.grand_total_delta),
+                },
+                user_id=user_id,
+                actor_role=actor_role,
+            )
+            db.commit()
+        finally:
+            db.close()
+    return report
@@ -0,0 +1,340 @@
+"""
+Daily order rollups for the reports API.
+
+``order_daily_rollups`` holds one row per (creation day, status, product
+type, sales user) with the order count and the sums of grand_total,
+total_cost, estimated_profit and balance_amount. Reports read these few
+rows instead of scanning ``orders``.
+
+Incremental maintenance: a ``before_flush`` listener (registered in
+``app.models.order_rollup``) compares every new, changed or deleted Order
+with its persisted state, subtracts the old contribution, adds the new one
+and applies the net deltas with one dialect upsert::
+
+    INSERT INTO order_daily_rollups (...) VALUES (...)
+    ON CONFLICT (day, status, product_type, sales_user_id)
+    DO UPDATE SET order_count = order_daily_rollups.order_count + excluded.order_count, ...
+
+The upsert runs on the flush's connection, so rollups commit or roll back
+together with the order change. A status transition moves one order from
+one status row to another; edits that touch no tracked column cost nothing.
+
+Days are UTC calendar days on both paths: ``_day`` converts aware
+timestamps to UTC, and ``compute_rollups`` buckets with ``utc_day`` so the
+database session's time zone cannot move an order across midnight.
+
+Core inserts (the bulk importer) apply ``deltas_for_rows`` themselves.
+Other writes that bypass the ORM (bulk UPDATEs, scripts, the data
+generator) are not seen by the listener; ``reconcile_rollups`` recomputes the rollups
+from ``orders`` with one GROUP BY and rewrites only the keys that drifted.
+The scheduler runs it nightly.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, delete, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app.core.metrics import registry
+from app.models.order import Order
+from app.models.order_rollup import OrderDailyRollup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRODUCT_TYPE = "shirt"
+UNKNOWN_SALES_USER = 0
+
+KEY_FIELDS = ("day", "status", "product_type", "sales_user_id")
+SUM_FIELDS = ("grand_total", "total_cost", "estimated_profit", "balance_amount")
+# Order attributes whose change moves or resizes a rollup contribution
+TRACKED = ("created_at", "status", "product_type", "created_by_id") + SUM_FIELDS
+
+ROLLUP_DRIFT = registry.counter(
+    "order_rollup_drift_total", "Rollup keys rewritten by the nightly reconcile."
+)
+
+_CENT = Decimal("0.01")
+Key = Tuple[date, str, str, int]
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value or 0)).quantize(_CENT)
+
+
+def _day(value) -> date:
+    if value is None:
+        # server_default=now() is not known before the INSERT; it is today (UTC)
+        return datetime.now(timezone.utc).date()
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        # naive values are UTC (SQLite CURRENT_TIMESTAMP)
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _contribution(values: Dict[str, object]) -> Tuple[Key, Tuple[Decimal, ...]]:
+    key = (
+        _day(values["created_at"]),
+        values["status"] or "",
+        values["product_type"] or DEFAULT_PRODUCT_TYPE,
+        values["created_by_id"] or UNKNOWN_SALES_USER,
+    )
+    return key, tuple(_money(values[name]) for name in SUM_FIELDS)
+
+
+def _current(order: Order) -> Dict[str, object]:
+    return {name: getattr(order, name) for name in TRACKED}
+
+
+def _pending(order: Order) -> Dict[str, object]:
+    """Values a new Order will be inserted with (scalar column defaults applied)."""
+    values = _current(order)
+    for name, value in values.items():
+        default = Order.__table__.c[name].default
+        if value is None and default is not None and default.is_scalar:
+            values[name] = default.arg
+    return values
+
+
+def _persisted(order: Order) -> Dict[str, object]:
+    """Tracked values as they are in the database before this flush."""
+    state = inspect(order)
+    values = {}
+    for name in TRACKED:
+        hist = state.attrs[name].load_history()
+        if hist.deleted:
+            values[name] = hist.deleted[0]
+        elif hist.unchanged:
+            values[name] = hist.unchanged[0]
+        else:
+            values[name] = None
+    return values
+
+
+def _new_deltas() -> Dict[Key, list]:
+    return defaultdict(lambda: [0] + [Decimal("0")] * len(SUM_FIELDS))
+
+
+def _accumulate(deltas: Dict[Key, list], values: Dict[str, object], sign: int) -> None:
+    key, sums = _contribution(values)
+    row = deltas[key]
+    row[0] += sign
+    for i, amount in enumerate(sums, start=1):
+        row[i] += sign * amount
+
+
+def _nonzero(deltas: Dict[Key, list]) -> Dict[Key, list]:
+    return {k: v for k, v in deltas.items() if v[0] or any(v[1:])}
+
+
+def deltas_for_rows(rows) -> Dict[Key, list]:
+    """Deltas for orders inserted with Core (dicts of ``orders`` column values)."""
+    deltas = _new_deltas()
+    for row in rows:
+        _accumulate(deltas, {name: row.get(name) for name in TRACKED}, 1)
+    return _nonzero(deltas)
+
+
+def collect_deltas(session: Session) -> Dict[Key, list]:
+    """Net rollup changes implied by the pending Order inserts/updates/deletes."""
+    deltas = _new_deltas()
+
+    def add(values, sign):
+        _accumulate(deltas, values, sign)
+
+    for obj in session.new:
+        if isinstance(obj, Order):
+            add(_pending(obj), 1)
+    for obj in session.dirty:
+        if isinstance(obj, Order) and session.is_modified(obj, include_collections=False):
+            old, new = _persisted(obj), _current(obj)
+            if _contribution(old) != _contribution(new):
+                add(old, -1)
+                add(new, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            add(_persisted(obj), -1)
+
+    return _nonzero(deltas)
+
+
+def _dialect_insert(conn):
+    name = conn.dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def apply_deltas(conn, deltas: Dict[Key, list]) -> None:
+    """Add *deltas* to the rollup rows (one executemany upsert)."""
+    if not deltas:
+        return
+    table = OrderDailyRollup.__table__
+    rows = [
+        dict(zip(KEY_FIELDS, key), order_count=v[0], **dict(zip(SUM_FIELDS, v[1:])))
+        for key, v in deltas.items()
+    ]
+    dialect_insert = _dialect_insert(conn)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in KEY_FIELDS],
+            set_={
+                name: table.c[name] + stmt.excluded[name]
+                for name in ("order_count",) + SUM_FIELDS
+            },
+        )
+        conn.execute(stmt, rows)
+        return
+
+    # Generic fallback: UPDATE by key, INSERT the keys that were missing
+    match = and_(*(table.c[name] == bindparam(f"k_{name}") for name in KEY_FIELDS))
+    bump = (
+        update(table)
+        .where(match)
+        .values(
+            {
+                name: table.c[name] + bindparam(f"d_{name}")
+                for name in ("order_count",) + SUM_FIELDS
+            }
+        )
+    )
+    for row in rows:
+        params = {f"k_{name}": row[name] for name in KEY_FIELDS}
+        params.update({f"d_{name}": row[name] for name in ("order_count",) + SUM_FIELDS})
+        if not conn.execute(bump, params).rowcount:
+            conn.execute(insert(table), row)
+
+
+def apply_flush_deltas(session: Session) -> None:
+    """before_flush hook: fold this flush's Order changes into the rollups."""
+    if not any(
+        isinstance(obj, Order)
+        for objs in (session.new, session.dirty, session.deleted)
+        for obj in objs
+    ):
+        return
+    apply_deltas(session.connection(), collect_deltas(session))
+
+
+def utc_day(conn, column):
+    """SQL for the UTC calendar day of timestamp *column*, matching ``_day``."""
+    if conn.dialect.name == "postgresql":
+        # date() of a timestamptz follows the session TimeZone
+        return func.date(func.timezone("UTC", column))
+    return func.date(column)
+
+
+def compute_rollups(
+    conn, start: Optional[date] = None, end: Optional[date] = None
+) -> Dict[Key, Tuple]:
+    """Rollups recomputed from ``orders`` (one GROUP BY), keyed like the table."""
+    orders = Order.__table__
+    day = utc_day(conn, orders.c.created_at)
+    keys = (
+        day,
+        func.coalesce(orders.c.status, ""),
+        func.coalesce(orders.c.product_type, DEFAULT_PRODUCT_TYPE),
+        func.coalesce(orders.c.created_by_id, UNKNOWN_SALES_USER),
+    )
+    stmt = select(
+        *keys,
+        func.count(),
+        *(func.sum(func.coalesce(orders.c[name], 0)) for name in SUM_FIELDS),
+    ).group_by(*keys)
+    if start is not None:
+        stmt = stmt.where(day >= start.isoformat())
+    if end is not None:
+        stmt = stmt.where(day <= end.isoformat())
+
+    result = {}
+    for row in conn.execute(stmt):
+        key = (_day(row[0]), row[1], row[2], int(row[3]))
+        result[key] = (int(row[4]),) + tuple(_money(v) for v in row[5:])
+    return result
+
+
+def _stored_rollups(conn, start: Optional[date], end: Optional[date]) -> Dict[Key, Tuple]:
+    table = OrderDailyRollup.__table__
+    stmt = select(*(table.c[n] for n in KEY_FIELDS + ("order_count",) + SUM_FIELDS))
+    if start is not None:
+        stmt = stmt.where(table.c.day >= start)
+    if end is not None:
+        stmt = stmt.where(table.c.day <= end)
+    result = {}
+    for row in conn.execute(stmt):
+        if row.order_count == 0 and not any(getattr(row, n) for n in SUM_FIELDS):
+            continue  # emptied by transitions; same as a missing row
+        key = (row.day, row.status, row.product_type, row.sales_user_id)
+        result[key] = (int(row.order_count),) + tuple(
+            _money(getattr(row, n)) for n in SUM_FIELDS
+        )
+    return result
+
+
+def reconcile_rollups(
+    conn, start: Optional[date] = None, end: Optional[date] = None
+) -> int:
+    """Rewrite the rollup keys in [start, end] that disagree with ``orders``.
+
+    Returns the number of keys rewritten (0 when the incremental path kept
+    up). Run inside a transaction; the caller commits.
+    """
+    expected = compute_rollups(conn, start, end)
+    stored = _stored_rollups(conn, start, end)
+    table = OrderDailyRollup.__table__
+    drifted = [
+        key
+        for key in expected.keys() | stored.keys()
+        if expected.get(key) != stored.get(key)
+    ]
+    if not drifted:
+        return 0
+
+    match = and_(*(table.c[name] == bindparam(f"k_{name}") for name in KEY_FIELDS))
+    conn.execute(
+        delete(table).where(match),
+        [{f"k_{name}": v for name, v in zip(KEY_FIELDS, key)} for key in drifted],
+    )
+    fresh = [
+        dict(
+            zip(KEY_FIELDS, key),
+            **dict(zip(("order_count",) + SUM_FIELDS, expected[key])),
+        )
+        for key in drifted
+        if key in expected
+    ]
+    if fresh:
+        conn.execute(insert(table), fresh)
+    ROLLUP_DRIFT.inc(len(drifted))
+    return len(drifted)
+
+
+def reconcile_order_rollups() -> None:
+    """Nightly scheduler job: reconcile all rollups on the primary database."""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        fixed = reconcile_rollups(db.connection())
+        db.commit()
+        if fixed:
+            logger.warning("Order rollup reconcile rewrote %d drifted keys", fixed)
+        else:
+            logger.info("Order rollups in sync with orders")
+    except Exception:
+        db.rollback()
+        logger.exception("Order rollup reconcile failed")
+    finally:
+        db.close()
@@ -0,0 +1,217 @@
+"""
+Full-text order search.
+
+Searchable fields: order_no, customer_name, brand, graphic_code,
+customer_code, tracking_number and note.
+
+- SQLite: an FTS5 external-content table ``orders_fts`` over ``orders``,
+  kept in sync by AFTER INSERT/UPDATE/DELETE triggers, so every write path
+  (ORM, Core bulk inserts, scripts) updates the index in the same
+  transaction. The ``trigram`` tokenizer is used when available (SQLite >=
+  3.34) because Thai text has no word spaces; results are ranked by bm25.
+- PostgreSQL: a GIN expression index over ``to_tsvector('simple', ...)``
+  (migration 0008) queried with prefix tsqueries and ranked by ts_rank. No
+  sync is needed for an expression index.
+- Anything else, or SQLite without FTS5: a LIKE scan over the same columns.
+
+The index is installed by ``install_search_index`` from the ``orders``
+table's after_create hook (dev create_all, tests) and by migration 0008.
+"""
+
+import logging
+import re
+import sqlite3
+import weakref
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import or_, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.models.order import Order
+
+logger = logging.getLogger(__name__)
+
+SEARCH_COLUMNS: Tuple[str, ...] = (
+    "order_no",
+    "customer_name",
+    "brand",
+    "graphic_code",
+    "customer_code",
+    "tracking_number",
+    "note",
+)
+
+FTS_TABLE = "orders_fts"
+
+_HAS_TRIGRAM = sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+def _sqlite_ddl(tokenizer: str) -> List[str]:
+    cols = ", ".join(SEARCH_COLUMNS)
+    new_vals = ", ".join(f"new.{c}" for c in SEARCH_COLUMNS)
+    old_vals = ", ".join(f"old.{c}" for c in SEARCH_COLUMNS)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{cols}, content='orders', content_rowid='id', tokenize='{tokenizer}')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON orders BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON orders BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) "
+        f"VALUES ('delete', old.id, {old_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {cols} ON orders BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) "
+        f"VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+    ]
+
+
+SQLITE_DROP_DDL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+PG_TSVECTOR = "to_tsvector('simple', {})".format(
+    " || ' ' || ".join(f"coalesce({c}, '')" for c in SEARCH_COLUMNS)
+)
+PG_INDEX_NAME = "ix_orders_search_tsv"
+
+
+def install_search_index(connection: Connection) -> bool:
+    """Create the FTS5 table + sync triggers on a SQLite connection.
+
+    Returns False (and leaves search on the LIKE fallback) when the SQLite
+    build lacks FTS5. PostgreSQL needs nothing at runtime.
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+    tokenizer = "trigram" if _HAS_TRIGRAM else "unicode61"
+    try:
+        for stmt in _sqlite_ddl(tokenizer):
+            connection.exec_driver_sql(stmt)
+    except OperationalError:
+        logger.warning("SQLite FTS5 unavailable; order search falls back to LIKE")
+        return False
+    _fts_state.pop(connection.engine, None)
+    return True
+
+
+def rebuild_search_index(connection: Connection) -> None:
+    """Re-read every order into the FTS5 index (backfill / repair)."""
+    if connection.dialect.name == "sqlite" and _fts_mode(connection) is not None:
+        connection.exec_driver_sql(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+
+# engine -> "trigram" | "unicode61" | None (no FTS table)
+_fts_state: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _fts_mode(connection: Connection) -> Optional[str]:
+    engine = connection.engine
+    if engine not in _fts_state:
+        row = connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (FTS_TABLE,),
+        ).first()
+        if not row:
+            mode = None
+        else:
+            mode = "trigram" if "trigram" in (row[0] or "") else "unicode61"
+        _fts_state[engine] = mode
+    return _fts_state[engine]
+
+
+_TERM_RE = re.compile(r"[^\W_]+(?:[-/.][^\W_]+)*", re.UNICODE)
+
+
+def _terms(q: str) -> List[str]:
+    return _TERM_RE.findall(q or "")
+
+
+def _fts5_query(terms: Sequence[str], columns: Sequence[str], mode: str) -> str:
+    quoted = []
+    for t in terms:
+        phrase = '"' + t.replace('"', '""') + '"'
+        quoted.append(phrase if mode == "trigram" else phrase + "*")
+    expr = " AND ".join(quoted)
+    if tuple(columns) != SEARCH_COLUMNS:
+        expr = "{" + " ".join(columns) + "} : (" + expr + ")"
+    return expr
+
+
+def _search_sqlite_fts(
+    db: Session, terms: List[str], columns: Sequence[str], skip: int, limit: int
+) -> Optional[List[int]]:
+    conn = db.connection()
+    mode = _fts_mode(conn)
+    if mode is None:
+        return None
+    if mode == "trigram" and any(len(t) < 3 for t in terms):
+        # trigram tokens cannot match 1-2 character terms
+        return None
+    rows = db.execute(
+        text(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q "
+            f"ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT :limit OFFSET :skip"
+        ),
+        {"q": _fts5_query(terms, columns, mode), "limit": limit, "skip": skip},
+    ).all()
+    return [r[0] for r in rows]
+
+
+def _search_postgres(
+    db: Session, terms: List[str], columns: Sequence[str], skip: int, limit: int
+) -> List[int]:
+    if tuple(columns) == SEARCH_COLUMNS:
+        vector = PG_TSVECTOR  # matches the GIN expression index
+    else:
+        vector = "to_tsvector('simple', {})".format(
+            " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+        )
+    tsquery = " & ".join(re.sub(r"[&|!():*'\\\s]", "", t) + ":*" for t in terms)
+    rows = db.execute(
+        text(
+            f"SELECT id FROM orders WHERE {vector} @@ to_tsquery('simple', :q) "
+            f"ORDER BY ts_rank({vector}, to_tsquery('simple', :q)) DESC, id DESC "
+            f"LIMIT :limit OFFSET :skip"
+        ),
+        {"q": tsquery, "limit": limit, "skip": skip},
+    ).all()
+    return [r[0] for r in rows]
+
+
+def _search_like(
+    db: Session, terms: List[str], columns: Sequence[str], skip: int, limit: int
+) -> List[int]:
+    query = db.query(Order.id)
+    for t in terms:
+        pattern = f"%{t}%"
+        query = query.filter(or_(*[getattr(Order, c).ilike(pattern) for c in columns]))
+    rows = query.order_by(Order.id.desc()).offset(skip).limit(limit).all()
+    return [r[0] for r in rows]
+
+
+def search_order_ids(
+    db: Session,
+    q: str,
+    skip: int = 0,
+    limit: int = 20,
+    columns: Sequence[str] = SEARCH_COLUMNS,
+) -> List[int]:
+    """Return the ids of orders matching every term in *q*, best match first."""
+    terms = _terms(q)
+    if not terms or not columns:
+        return []
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return _search_postgres(db, terms, columns, skip, limit)
+    if dialect == "sqlite":
+        ids = _search_sqlite_fts(db, terms, columns, skip, limit)
+        if ids is not None:
+            return ids
+    return _search_like(db, terms, columns, skip, limit)
@@ -38,6 +38,24 @@ STEP_PRICING: Dict[str, Any] = {
     "fashionPants": Decimal(280),
 }
 
+# ---------------------------------------------------------------------------
+# Shipping by quantity
+# ---------------------------------------------------------------------------
+# Used when no ShippingRate weight band applies (app/core/shipping.py).
+# Each entry: {min_qty, max_qty, price}  (both bounds inclusive); above the
+# last tier every extra piece adds SHIPPING_PER_EXTRA_PIECE.
+SHIPPING_QTY_TIERS: List[Dict[str, Any]] = [
+    {"min_qty": 0, "max_qty": 9, "price": 0},
+    {"min_qty": 10, "max_qty": 15, "price": 60},
+    {"min_qty": 16, "max_qty": 20, "price": 80},
+    {"min_qty": 21, "max_qty": 30, "price": 100},
+    {"min_qty": 31, "max_qty": 40, "price": 120},
+    {"min_qty": 41, "max_qty": 50, "price": 180},
+    {"min_qty": 51, "max_qty": 70, "price": 200},
+    {"min_qty": 71, "max_qty": 100, "price": 230},
+]
+SHIPPING_PER_EXTRA_PIECE: int = 50
+
 # ---------------------------------------------------------------------------
 # Add-on prices
 # ---------------------------------------------------------------------------
@@ -0,0 +1,105 @@
+"""
+Per-fabric tier pricing from ``PricingRule`` rows.
+
+Rules (fabric_type, min_qty, max_qty, unit_price; bounds inclusive) are
+compiled per fabric into sorted, non-overlapping interval arrays, once per
+master-data version (``MasterDataCache``, so a rule written through
+``/pricing-rules`` is live on the next request without any per-request
+query). A shirt's base unit price comes from the rule whose interval holds
+its quantity, found by bisect; when the fabric has no rules, or none covers
+the quantity, the ``STEP_PRICING`` neck tables apply as before.
+
+Overlaps are rejected when rules are written (``find_overlap``). Rows that
+overlap anyway (written before validation, or directly in the database) are
+skipped at compile time in favour of the lower ``min_qty``, and logged.
+"""
+
+import bisect
+import logging
+import re
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.master_data import MasterDataCache
+from app.models.pricing_rule import PricingRule
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_fabric(name: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", (name or "").strip()).lower()
+
+
+class RuleTable:
+    def __init__(self, rules: Sequence[Tuple[int, str, int, int, float]]):
+        grouped: Dict[str, List[Tuple[int, int, int, float]]] = {}
+        for rid, fabric, low, high, price in rules:
+            key = normalize_fabric(fabric)
+            if key and low <= high:
+                grouped.setdefault(key, []).append((low, rid, high, price))
+        self._mins: Dict[str, List[int]] = {}
+        self._tiers: Dict[str, List[Tuple[int, int, Decimal]]] = {}
+        for key, rows in grouped.items():
+            tiers: List[Tuple[int, int, Decimal]] = []
+            for low, rid, high, price in sorted(rows):
+                if tiers and low <= tiers[-1][1]:
+                    logger.warning(
+                        "Pricing rule %s for %r overlaps %s-%s; ignored",
+                        rid, key, tiers[-1][0], tiers[-1][1],
+                    )
+                    continue
+                tiers.append((low, high, Decimal(str(price))))
+            self._tiers[key] = tiers
+            self._mins[key] = [t[0] for t in tiers]
+
+    def __bool__(self) -> bool:
+        return bool(self._tiers)
+
+    def tiers(self, fabric: Optional[str]) -> List[Tuple[int, int, Decimal]]:
+        return list(self._tiers.get(normalize_fabric(fabric), ()))
+
+    def unit_price(self, fabric: Optional[str], qty: int) -> Optional[Decimal]:
+        """Rule price for *qty* pieces of *fabric*, or None to use STEP_PRICING."""
+        key = normalize_fabric(fabric)
+        mins = self._mins.get(key)
+        if not mins:
+            return None
+        pos = bisect.bisect_right(mins, qty) - 1
+        if pos < 0:
+            return None
+        low, high, price = self._tiers[key][pos]
+        return price if qty <= high else None
+
+
+def _build_table(db: Session) -> RuleTable:
+    rows = db.query(
+        PricingRule.id,
+        PricingRule.fabric_type,
+        PricingRule.min_qty,
+        PricingRule.max_qty,
+        PricingRule.unit_price,
+    ).all()
+    return RuleTable([tuple(r) for r in rows])
+
+
+_table = MasterDataCache(_build_table)
+
+
+def rule_table(db: Session) -> RuleTable:
+    return _table.get(db)
+
+
+def find_overlap(
+    db: Session, fabric: str, min_qty: int, max_qty: int, exclude_id: Optional[int] = None
+) -> Optional[PricingRule]:
+    """An existing rule of the same fabric whose interval meets [min_qty, max_qty]."""
+    key = normalize_fabric(fabric)
+    query = db.query(PricingRule).filter(
+        PricingRule.min_qty <= max_qty, PricingRule.max_qty >= min_qty
+    )
+    if exclude_id is not None:
+        query = query.filter(PricingRule.id != exclude_id)
+    # few candidates per range; compare fabrics the way the table keys them
+    return next((r for r in query if normalize_fabric(r.fabric_type) == key), None)
@@ -0,0 +1,140 @@
+"""
+Query budgets: catch N+1 regressions before they reach production.
+
+Routes declare how many SQL statements one request may execute::
+
+    @router.get("/{order_id}")
+    @query_budget(6)
+    def read_order(...): ...
+
+RequestMetricsMiddleware compares the per-request statement count against
+the budget before the response is sent. ``QUERY_BUDGET_MODE`` decides what
+happens when it is exceeded: ``warn`` logs, ``raise`` fails the request
+with QueryBudgetExceeded (dev and the test suite run in this mode), ``off``
+skips the check.
+
+By the time the response starts, a write endpoint has already committed, so
+in ``raise`` mode the budget is also checked when a session commits inside
+a request: an over-budget write is rolled back instead of persisting behind
+a 500.
+
+For tests, ``assert_max_queries(n)`` counts every statement executed on an
+engine inside a block (across threads, so TestClient calls are included);
+conftest exposes it as the ``query_budget`` fixture.
+"""
+
+import contextvars
+import logging
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.instrumentation import current_query_stats
+
+logger = logging.getLogger(__name__)
+
+BUDGET_ATTR = "__query_budget__"
+
+# ASGI scope of the request being served (set by RequestMetricsMiddleware)
+_current_scope: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "query_budget_scope", default=None
+)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    def __init__(self, label: str, budget: int, count: int, statements=None):
+        self.label = label
+        self.budget = budget
+        self.count = count
+        self.statements = list(statements or [])
+        detail = f"{label}: {count} SQL statements, budget is {budget}"
+        if self.statements:
+            detail += "\n" + "\n".join(f"  {s}" for s in self.statements)
+        super().__init__(detail)
+
+
+def query_budget(max_queries: int) -> Callable:
+    """Declare the statement budget of a route handler (apply under @router.*)."""
+
+    def decorator(fn):
+        setattr(fn, BUDGET_ATTR, int(max_queries))
+        return fn
+
+    return decorator
+
+
+def endpoint_budget(endpoint) -> Optional[int]:
+    return getattr(endpoint, BUDGET_ATTR, None)
+
+
+def enforce_query_budget(scope, count: int) -> None:
+    """Apply QUERY_BUDGET_MODE to a finished request that ran *count* statements."""
+    mode = (settings.QUERY_BUDGET_MODE or "off").lower()
+    if mode == "off":
+        return
+    budget = endpoint_budget(scope.get("endpoint"))
+    if budget is None or count <= budget:
+        return
+    label = f"{scope.get('method', '')} {scope.get('path', '')}"
+    if mode == "raise":
+        raise QueryBudgetExceeded(label, budget, count)
+    logger.warning("Query budget exceeded: %s ran %d statements (budget %d)", label, count, budget)
+
+
+def track_request(scope) -> contextvars.Token:
+    return _current_scope.set(scope)
+
+
+def untrack_request(token: contextvars.Token) -> None:
+    _current_scope.reset(token)
+
+
+@event.listens_for(Session, "before_commit")
+def _enforce_before_commit(session):
+    if (settings.QUERY_BUDGET_MODE or "off").lower() != "raise":
+        return
+    scope = _current_scope.get()
+    stats = current_query_stats()
+    if scope is None or stats is None:
+        return
+    # count the statements of the final flush too, before anything persists
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    enforce_query_budget(scope, stats.count)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine=Engine):
+    """Count statements executed on *engine* (default: every engine) in the block."""
+    counter = QueryCounter()
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(" ".join(statement.split())[:200])
+
+    event.listen(engine, "after_cursor_execute", _count)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "after_cursor_execute", _count)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, engine=Engine, label: str = "block"):
+    """Fail with QueryBudgetExceeded if the block runs more than *max_queries*."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > max_queries:
+        raise QueryBudgetExceeded(label, max_queries, counter.count, counter.statements)
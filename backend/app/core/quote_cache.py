@@ -0,0 +1,128 @@
+"""
+In-process LRU + TTL cache for ``POST /pricing/calc`` quotes.
+
+The order form re-sends the same payload on nearly every keystroke. A quote
+depends only on the items and the pricing master data, so the cache key is
+a hash of the canonical items (what the calculator actually reads:
+fabric, stripped neck name, total quantity, add-on set and oversize flag,
+in item order) plus ``master_version()``. A neck / rule / shipping edit bumps
+the version, which orphans every older entry; the TTL bounds how long
+another worker may serve a quote from before an edit made elsewhere.
+
+Hits and misses are counted in ``pricing_quote_cache_requests_total``; the
+hit ratio and entry count are exposed as gauges at scrape time.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from app.core.config import settings
+from app.core.master_data import master_version
+from app.core.metrics import registry
+from app.core.pricing_rules import normalize_fabric
+
+QUOTE_CACHE_REQUESTS = registry.counter(
+    "pricing_quote_cache_requests_total",
+    "Pricing quote cache lookups by result (hit/miss).",
+    ["result"],
+)
+QUOTE_CACHE_HIT_RATIO = registry.gauge(
+    "pricing_quote_cache_hit_ratio", "Share of pricing quote lookups served from cache."
+)
+QUOTE_CACHE_ENTRIES = registry.gauge(
+    "pricing_quote_cache_entries", "Pricing quotes currently cached."
+)
+
+
+def _quantity(matrix) -> int:
+    if not isinstance(matrix, dict):
+        return 0
+    return sum(int(v) for v in matrix.values() if v)
+
+
+def canonical_items(items: Iterable[Any]) -> list:
+    """The parts of each request item that affect its price."""
+    return [
+        [
+            normalize_fabric(getattr(it, "fabric_type", None)),
+            (it.neck_type or "").strip(),
+            _quantity(it.quantity_matrix),
+            sorted(set(it.selected_add_ons or [])),
+            bool(it.is_oversize),
+        ]
+        for it in items
+    ]
+
+
+def quote_key(items: Iterable[Any], version: Optional[int] = None) -> str:
+    if version is None:
+        version = master_version()
+    raw = json.dumps([version, canonical_items(items)], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class QuoteCache:
+    """Thread-safe LRU of quote dicts, each valid for ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (expires_at, quote)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._version = master_version()
+
+    def _drop_stale_version(self) -> None:
+        # entries keyed on an older master version can never hit again
+        version = master_version()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            self._drop_stale_version()
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                QUOTE_CACHE_REQUESTS.inc(result="miss")
+                return None
+            self._entries.move_to_end(key)
+        QUOTE_CACHE_REQUESTS.inc(result="hit")
+        return entry[1]
+
+    def put(self, key: str, quote: Dict) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._drop_stale_version()
+            self._entries[key] = (time.monotonic() + self.ttl, quote)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+quote_cache = QuoteCache(settings.PRICING_QUOTE_CACHE_SIZE, settings.PRICING_QUOTE_CACHE_TTL)
+
+
+def _collect() -> None:
+    hits = QUOTE_CACHE_REQUESTS.value(result="hit")
+    total = hits + QUOTE_CACHE_REQUESTS.value(result="miss")
+    QUOTE_CACHE_HIT_RATIO.set(hits / total if total else 0.0)
+    QUOTE_CACHE_ENTRIES.set(len(quote_cache))
+
+
+registry.add_collector(_collect)
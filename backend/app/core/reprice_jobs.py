@@ -0,0 +1,190 @@
+"""
+Background re-pricing after a neck edit (``PUT /products/necks/{id}``).
+
+Changing a neck's ``additional_cost``, ``force_slope`` or name changes the
+price of open orders whose items carry it, but those orders keep the prices
+they were saved with. ``update_neck`` therefore starts an impact job after
+the edit commits; it runs as a background task, so the admin request
+returns at once:
+
+1. The distinct ``order_items.neck_type`` values (an index-only scan of
+   ``ix_order_items_neck_type``) are resolved with the neck index; the names
+   that resolve to the edited neck, or equal its previous name, are kept.
+2. Open orders carrying those names are re-priced with
+   ``reprice_open_orders`` in dry-run mode, in chunks, updating the job's
+   progress as they go. The finished job holds the impact report: every
+   order whose totals would change, and how.
+3. ``POST /products/reprice-jobs/{id}/apply`` starts a second job that
+   writes the new prices for exactly the orders in that report (each is
+   priced again at write time, see app/core/order_repricing.py).
+
+Jobs live in this process only (the latest ``JOB_HISTORY`` are kept) and
+are polled with ``GET /products/reprice-jobs/{id}``.
+"""
+
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.neck_resolver import neck_index, normalize_neck_name
+from app.core.order_repricing import RepriceReport, count_open_orders, reprice_open_orders
+from app.models.order import OrderItem
+
+logger = logging.getLogger(__name__)
+
+JOB_HISTORY = 50
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class RepriceJob:
+    id: str
+    neck_id: int
+    neck_name: str
+    apply: bool
+    previous_name: Optional[str] = None
+    # apply jobs re-price exactly these orders; impact jobs find their own
+    order_ids: Optional[List[int]] = None
+    source_job_id: Optional[str] = None
+    status: str = QUEUED
+    total: int = 0
+    processed: int = 0
+    report: Optional[RepriceReport] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=_now)
+    finished_at: Optional[datetime] = None
+
+    def as_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "neck_id": self.neck_id,
+            "neck_name": self.neck_name,
+            "apply": self.apply,
+            "source_job_id": self.source_job_id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+            "report": self.report.as_dict() if self.report else None,
+        }
+
+
+_jobs: "OrderedDict[str, RepriceJob]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _register(job: RepriceJob) -> RepriceJob:
+    with _lock:
+        _jobs[job.id] = job
+        while len(_jobs) > JOB_HISTORY:
+            _jobs.popitem(last=False)
+    return job
+
+
+def get_job(job_id: str) -> Optional[RepriceJob]:
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def neck_item_names(db: Session, neck_id: int, previous_name: Optional[str] = None) -> List[str]:
+    """Item ``neck_type`` values priced with neck *neck_id* (before or after an edit)."""
+    index = neck_index(db)
+    previous = normalize_neck_name(previous_name)
+    names = []
+    for (raw,) in db.query(OrderItem.neck_type).distinct():
+        if not raw:
+            continue
+        neck = index.resolve(raw)
+        if (neck is not None and neck.id == neck_id) or (
+            previous and normalize_neck_name(raw) == previous
+        ):
+            names.append(raw)
+    return names
+
+
+def impact_job(neck_id: int, neck_name: str, previous_name: Optional[str] = None) -> RepriceJob:
+    """A queued dry-run job for the open orders using neck *neck_id*."""
+    return _register(
+        RepriceJob(
+            id=uuid.uuid4().hex,
+            neck_id=neck_id,
+            neck_name=neck_name,
+            apply=False,
+            previous_name=previous_name if previous_name != neck_name else None,
+        )
+    )
+
+
+def apply_job(source: RepriceJob) -> RepriceJob:
+    """A queued job writing the prices of finished impact job *source*."""
+    if source.apply or source.status != DONE or source.report is None:
+        raise ValueError("Only a finished impact report can be applied")
+    return _register(
+        RepriceJob(
+            id=uuid.uuid4().hex,
+            neck_id=source.neck_id,
+            neck_name=source.neck_name,
+            apply=True,
+            order_ids=[d["order_id"] for d in source.report.diffs],
+            source_job_id=source.id,
+        )
+    )
+
+
+def run_job(
+    bind,
+    job_id: str,
+    user_id: Optional[int] = None,
+    actor_role: Optional[str] = None,
+) -> None:
+    """Run a queued job to completion (a background task; never raises)."""
+    job = get_job(job_id)
+    if job is None or job.status != QUEUED:
+        return
+    job.status = RUNNING
+    try:
+        neck_types = None
+        db = Session(bind=bind)
+        try:
+            if job.order_ids is None:
+                neck_types = neck_item_names(db, job.neck_id, job.previous_name)
+            job.total = count_open_orders(db, job.order_ids, neck_types)
+        finally:
+            db.close()
+
+        def progress(report: RepriceReport) -> None:
+            job.processed = report.scanned
+
+        if job.total:
+            job.report = reprice_open_orders(
+                bind,
+                apply=job.apply,
+                order_ids=job.order_ids,
+                neck_types=neck_types,
+                user_id=user_id,
+                actor_role=actor_role,
+                progress=progress,
+                reason=f"neck {job.neck_id} ({job.neck_name}) edited",
+            )
+        else:
+            job.report = RepriceReport(dry_run=not job.apply)
+        job.status = DONE
+    except Exception as exc:
+        logger.exception("Re-pricing job %s failed", job.id)
+        job.error = str(exc)
+        job.status = FAILED
+    finally:
+        job.finished_at = _now()
@@ -0,0 +1,180 @@
+"""
+Per-request metrics middleware (pure ASGI, so it adds no extra task or
+response buffering per request).
+
+For every HTTP request it records, under the matched route template (e.g.
+``/api/v1/orders/{order_id}``):
+
+- latency, response size and status (``http_request_duration_seconds``,
+  ``http_response_size_bytes``) plus an in-flight gauge;
+- the number of SQL statements and the DB time, which is what surfaces N+1
+  patterns (statement hooks in app/db/instrumentation.py), checked against
+  the route's @query_budget before the response starts.
+
+It also emits a ``Server-Timing`` header splitting the time to first byte
+into ``db``, ``auth``, ``serialize`` and the remaining ``app`` time. Code
+marks its phases with ``timed_phase("auth")``; DB time spent inside a phase
+is reported under ``db`` only, so the parts add up to ``total``.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from starlette.routing import Mount
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.query_budget import enforce_query_budget, track_request, untrack_request
+from app.db.instrumentation import (
+    current_query_stats,
+    start_query_stats,
+    stop_query_stats,
+)
+
+_QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233)
+_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the last response byte.",
+    ["method", "route", "status"],
+)
+RESPONSE_BYTES = registry.histogram(
+    "http_response_size_bytes",
+    "HTTP response body size.",
+    ["method", "route"],
+    buckets=_SIZE_BUCKETS,
+)
+IN_FLIGHT = registry.gauge("http_requests_in_flight", "HTTP requests being served.")
+REQUEST_QUERIES = registry.histogram(
+    "http_request_db_queries",
+    "SQL statements executed per HTTP request.",
+    ["method", "route"],
+    buckets=_QUERY_BUCKETS,
+)
+REQUEST_DB_SECONDS = registry.histogram(
+    "http_request_db_seconds",
+    "Time spent in SQL per HTTP request.",
+    ["method", "route"],
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope) -> str:
+    """Full route template for *scope*, or UNMATCHED_ROUTE (keeps labels bounded).
+
+    Depending on the FastAPI version, ``scope["route"].path`` is either the
+    full template or only the part below the including router's prefix. The
+    prefix is recovered from the request path by dropping as many trailing
+    segments as the template has, which gives the same answer in both cases.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return UNMATCHED_ROUTE
+    if isinstance(route, Mount) or ":path}" in template:
+        return template + ("/{path}" if isinstance(route, Mount) else "")
+    path = scope.get("path", "")
+    depth = template.count("/")
+    prefix = path.rsplit("/", depth)[0] if depth else path
+    return prefix + template
+
+
+# ---------------------------------------------------------------------------
+# Request phases (Server-Timing)
+# ---------------------------------------------------------------------------
+_current_phases: contextvars.ContextVar[Optional[Dict[str, float]]] = (
+    contextvars.ContextVar("request_phases", default=None)
+)
+
+
+@contextmanager
+def timed_phase(name: str):
+    """Attribute the non-DB time spent in this block to phase *name*."""
+    phases = _current_phases.get()
+    if phases is None:
+        yield
+        return
+    stats = current_query_stats()
+    db_before = stats.seconds if stats else 0.0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if stats:
+            elapsed -= stats.seconds - db_before
+        phases[name] = phases.get(name, 0.0) + max(elapsed, 0.0)
+
+
+def _server_timing(total: float, phases: Dict[str, float], stats) -> bytes:
+    db = stats.seconds if stats else 0.0
+    parts = [f'db;dur={db * 1000:.2f};desc="{stats.count if stats else 0} queries"']
+    accounted = db
+    for name in sorted(phases):
+        parts.append(f"{name};dur={phases[name] * 1000:.2f}")
+        accounted += phases[name]
+    parts.append(f"app;dur={max(total - accounted, 0.0) * 1000:.2f}")
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts).encode("latin-1")
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app, exclude_paths=("/metrics",)):
+        self.app = app
+        self.exclude_paths = set(exclude_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        stats_token = start_query_stats()
+        stats = current_query_stats()
+        scope_token = track_request(scope)
+        phases: Dict[str, float] = {}
+        phases_token = _current_phases.set(phases)
+        status_code = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                enforce_query_budget(scope, stats.count)
+                if settings.SERVER_TIMING_ENABLED:
+                    headers = list(message.get("headers", []))
+                    headers.append(
+                        (
+                            b"server-timing",
+                            _server_timing(time.perf_counter() - start, phases, stats),
+                        )
+                    )
+                    message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            IN_FLIGHT.dec()
+            _current_phases.reset(phases_token)
+            untrack_request(scope_token)
+            stop_query_stats(stats_token)
+            method = scope.get("method", "")
+            route = route_template(scope)
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=method,
+                route=route,
+                status=str(status_code),
+            )
+            RESPONSE_BYTES.observe(size, method=method, route=route)
+            REQUEST_QUERIES.observe(stats.count, method=method, route=route)
+            REQUEST_DB_SECONDS.observe(stats.seconds, method=method, route=route)
@@ -1,16 +1,23 @@
-
 import logging
 import json
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
 from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
+from app.core.order_rollups import reconcile_order_rollups
+from app.models.audit_log import AuditLog
 from app.models.order import Order
 from app.models.notification import Notification
-from app.models.user import User
 
 logger = logging.getLogger(__name__)
 
+DESIGN_STATUSES = ["WAITING_ARTWORK", "WAITING_CUSTOMER_APPROVAL", "EDIT_ROUND_1", "EDIT_ROUND_2", "EDIT_ROUND_3"]
+# An alert for the same order and type is not repeated within this window
+ALERT_DEDUPE_WINDOW = timedelta(hours=23)
+
+
 def check_smart_alerts():
     """
     Background task to check for critical order events and create system notifications.
@@ -20,82 +27,106 @@ def check_smart_alerts():
     """
     db = SessionLocal()
     try:
-        now = datetime.utcnow()
-        
-        # 1. PRE-ALERT: Customer Usage (Deadline Critical)
-        # Alert when usage_date is within 2 days.
-        usage_threshold = now + timedelta(days=2)
-        near_usage = db.query(Order).filter(
-            Order.usage_date != None,
-            Order.usage_date <= usage_threshold,
-            Order.usage_date >= now - timedelta(days=1), # avoid alerting for very old ones
-            Order.status.notin_(["SHIPPED", "CANCELLED", "COMPLETED"])
-        ).all()
-        
-        for o in near_usage:
-            _create_alert(
-                db, 
-                o, 
-                "USAGE_DATE_NEAR", 
-                f"🚨 แผนส่งงานด่วน: ออเดอร์ {o.order_no or o.id} ถึงวันใช้งานลูกค้าใน 2 วัน ({o.usage_date.date()})"
-            )
-
-        # 2. FOLLOW-UP: Design Cycle (1-2 days in WAITING_ARTWORK or WAITING_CUSTOMER_APPROVAL)
-        # Check AuditLogs or just updated_at (if Order had it)
-        # Since Order doesn't have updated_at in schema shown, we use created_at as fallback or assume status hasn't moved.
-        # Let's check status age.
-        followup_threshold = now - timedelta(days=2)
-        # This is a bit tricky without a dedicated status_changed_at field.
-        # We can look at the latest AuditLog for the order.
-        from app.models.audit_log import AuditLog
-        
-        design_statuses = ["WAITING_ARTWORK", "WAITING_CUSTOMER_APPROVAL", "EDIT_ROUND_1", "EDIT_ROUND_2", "EDIT_ROUND_3"]
-        stagnant_orders = db.query(Order).filter(
-            Order.status.in_(design_statuses)
-        ).all()
-        
-        for o in stagnant_orders:
-            last_audit = db.query(AuditLog).filter(
-                AuditLog.target_type == "order",
-                AuditLog.target_id == str(o.id)
-            ).order_by(AuditLog.created_at.desc()).first()
-            
-            if last_audit and last_audit.created_at <= followup_threshold:
-                _create_alert(
-                    db,
-                    o,
-                    "DESIGN_FOLLOWUP",
-                    f"⏰ ติดตามงานออกแบบ: ออเดอร์ {o.order_no or o.id} ค้างอยู่ที่สถานะ {o.status} นานกว่า 2 วันแล้ว"
-                )
-
+        smart_alerts(db)
         db.commit()
     except Exception as e:
         logger.exception("Error during smart alerts check")
     finally:
         db.close()
 
-def _create_alert(db: Session, order: Order, alert_type: str, message: str):
+
+def smart_alerts(db: Session, now: Optional[datetime] = None) -> int:
+    """Create the due smart alerts on *db* (not committed); returns how many.
+
+    Runs a fixed number of statements however many orders qualify: the
+    candidate orders, their latest audit entries and the recent alerts are
+    each read with one query, and the new alerts are inserted with one
+    executemany.
+    """
+    now = now or datetime.utcnow()
+    alerts: List[Tuple[Order, str, str]] = []
+
+    # 1. PRE-ALERT: Customer Usage (Deadline Critical)
+    # Alert when usage_date is within 2 days.
+    usage_threshold = now + timedelta(days=2)
+    near_usage = db.query(Order.id, Order.order_no, Order.usage_date).filter(
+        Order.usage_date != None,
+        Order.usage_date <= usage_threshold,
+        Order.usage_date >= now - timedelta(days=1), # avoid alerting for very old ones
+        Order.status.notin_(["SHIPPED", "CANCELLED", "COMPLETED"])
+    ).all()
+    for o in near_usage:
+        alerts.append((
+            o,
+            "USAGE_DATE_NEAR",
+            f"🚨 แผนส่งงานด่วน: ออเดอร์ {o.order_no or o.id} ถึงวันใช้งานลูกค้าใน 2 วัน ({o.usage_date.date()})"
+        ))
+
+    # 2. FOLLOW-UP: Design Cycle (1-2 days in WAITING_ARTWORK or WAITING_CUSTOMER_APPROVAL)
+    # Order has no status_changed_at, so the latest AuditLog of each order
+    # tells how long it has been sitting in its status.
+    followup_threshold = now - timedelta(days=2)
+    stagnant_orders = db.query(Order.id, Order.order_no, Order.status).filter(
+        Order.status.in_(DESIGN_STATUSES)
+    ).all()
+    last_audit = _last_audit_times(db, [o.id for o in stagnant_orders])
+    for o in stagnant_orders:
+        last = last_audit.get(o.id)
+        if last and last <= followup_threshold:
+            alerts.append((
+                o,
+                "DESIGN_FOLLOWUP",
+                f"⏰ ติดตามงานออกแบบ: ออเดอร์ {o.order_no or o.id} ค้างอยู่ที่สถานะ {o.status} นานกว่า 2 วันแล้ว"
+            ))
+
+    if not alerts:
+        return 0
     # Avoid duplicate alerts for the same order/type within a short window
-    existing = db.query(Notification).filter(
-        Notification.payload.like(f'%"order_id": {order.id}%'),
-        Notification.type == alert_type,
-        Notification.created_at >= datetime.utcnow() - timedelta(hours=23)
-    ).first()
-    
-    if existing:
-        return
+    recent = _recent_alerts(db, {t for _, t, _ in alerts}, now - ALERT_DEDUPE_WINDOW)
+    rows = []
+    for order, alert_type, message in alerts:
+        if (alert_type, order.id) in recent:
+            continue
+        recent.add((alert_type, order.id))
+        # Global notification (user_id=None): appears on the Dashboard for everyone with access
+        rows.append({
+            "type": alert_type,
+            "message": message,
+            "payload": json.dumps({"order_id": order.id, "order_no": order.order_no}),
+            "is_read": False,
+        })
+        logger.info(f"Created smart alert: {alert_type} for Order {order.id}")
+    if rows:
+        db.execute(insert(Notification), rows)
+    return len(rows)
+
+
+def _last_audit_times(db: Session, order_ids: List[int]) -> Dict[int, datetime]:
+    if not order_ids:
+        return {}
+    rows = (
+        db.query(AuditLog.order_id, func.max(AuditLog.created_at))
+        .filter(AuditLog.target_type == "order", AuditLog.order_id.in_(order_ids))
+        .group_by(AuditLog.order_id)
+        .all()
+    )
+    return {order_id: created_at for order_id, created_at in rows}
+
 
-    # Create notification for relevant roles (Admins/Sales)
-    # For simplicity, we create a global notification (user_id=None) or notify all Admins
-    # Here we'll create a generic notification that appears on the Dashboard for everyone with access
-    notif = Notification(
-        type=alert_type,
-        message=message,
-        payload=json.dumps({"order_id": order.id, "order_no": order.order_no}),
-        is_read=False
+def _recent_alerts(db: Session, types: Set[str], since: datetime) -> Set[Tuple[str, int]]:
+    seen = set()
+    rows = db.query(Notification.type, Notification.payload).filter(
+        Notification.type.in_(types),
+        Notification.created_at >= since,
     )
-    db.add(notif)
-    logger.info(f"Created smart alert: {alert_type} for Order {order.id}")
+    for ntype, payload in rows:
+        try:
+            order_id = json.loads(payload or "{}").get("order_id")
+        except (TypeError, ValueError, AttributeError):
+            continue
+        if order_id is not None:
+            seen.add((ntype, order_id))
+    return seen
 
 def start_scheduler():
     scheduler = BackgroundScheduler()
@@ -103,5 +134,7 @@ def start_scheduler():
     scheduler.add_job(check_smart_alerts, 'interval', hours=6)
     # Also run once at startup
     scheduler.add_job(check_smart_alerts, 'date', run_date=datetime.now() + timedelta(seconds=10))
+    # Nightly: repair report rollups that drifted from orders (bulk edits, scripts)
+    scheduler.add_job(reconcile_order_rollups, 'cron', hour=2, minute=30)
     scheduler.start()
-    logger.info("APScheduler started for smart alerts.")
+    logger.info("APScheduler started for smart alerts and rollup reconcile.")
@@ -0,0 +1,131 @@
+"""
+Shipping cost engine for ``POST /pricing/calc`` and order creation.
+
+Two sources, tried in order:
+
+1. ``ShippingRate`` weight bands. Active rows are loaded once per master-data
+   version (``MasterDataCache``) into one sorted interval list per provider;
+   a weight is answered with one bisect per provider, and without a provider
+   the cheapest provider whose band covers the weight wins. A quantity is
+   converted to an estimated weight with ``SHIPPING_KG_PER_PIECE``.
+2. The quantity tiers in ``pricing_constants.SHIPPING_QTY_TIERS`` (the
+   historical price list), also answered by bisect. These apply when no rate
+   rows exist or no band covers the parcel.
+"""
+
+import bisect
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.master_data import MasterDataCache
+from app.core.pricing_constants import SHIPPING_PER_EXTRA_PIECE, SHIPPING_QTY_TIERS
+from app.models.pricing_rule import ShippingRate
+
+_QTY_MINS = [t["min_qty"] for t in SHIPPING_QTY_TIERS]
+
+
+def qty_shipping_cost(total_qty: int) -> int:
+    """Shipping from the quantity tiers alone."""
+    pos = bisect.bisect_right(_QTY_MINS, total_qty) - 1
+    if pos < 0:
+        return 0
+    tier = SHIPPING_QTY_TIERS[pos]
+    if total_qty <= tier["max_qty"]:
+        return tier["price"]
+    last = SHIPPING_QTY_TIERS[-1]
+    return last["price"] + (total_qty - last["max_qty"]) * SHIPPING_PER_EXTRA_PIECE
+
+
+@dataclass(frozen=True)
+class ShippingQuote:
+    provider: Optional[str]
+    price: Decimal
+    weight_kg: Optional[float] = None
+
+
+class ShippingTable:
+    """Weight bands per provider, each list sorted by lower bound."""
+
+    def __init__(self, rates: List[Tuple[str, float, float, float]]):
+        bands: Dict[str, List[Tuple[float, float, float]]] = {}
+        for provider, low, high, price in rates:
+            bands.setdefault(provider, []).append((low, high, price))
+        self._bands = {p: sorted(b) for p, b in bands.items()}
+        self._mins = {p: [b[0] for b in bands] for p, bands in self._bands.items()}
+
+    def __bool__(self) -> bool:
+        return bool(self._bands)
+
+    @property
+    def providers(self) -> List[str]:
+        return sorted(self._bands)
+
+    def _band_price(self, provider: str, weight: float) -> Optional[float]:
+        bands = self._bands.get(provider)
+        if not bands:
+            return None
+        pos = bisect.bisect_right(self._mins[provider], weight) - 1
+        if pos >= 0 and weight <= bands[pos][1]:
+            return bands[pos][2]
+        return None
+
+    def quote(self, weight_kg: float, provider: Optional[str] = None) -> Optional[ShippingQuote]:
+        candidates = [provider] if provider else self.providers
+        best = None
+        for p in candidates:
+            price = self._band_price(p, weight_kg)
+            if price is not None and (best is None or price < best[1]):
+                best = (p, price)
+        if best is None:
+            return None
+        return ShippingQuote(best[0], Decimal(str(best[1])), weight_kg)
+
+
+def _build_table(db: Session) -> ShippingTable:
+    rows = (
+        db.query(
+            ShippingRate.provider_name,
+            ShippingRate.min_weight_kg,
+            ShippingRate.max_weight_kg,
+            ShippingRate.base_price,
+        )
+        .filter(ShippingRate.is_active == 1)
+        .all()
+    )
+    return ShippingTable(
+        [(r[0], float(r[1] or 0), float(r[2] or 0), float(r[3] or 0)) for r in rows]
+    )
+
+
+_table = MasterDataCache(_build_table)
+
+
+def shipping_table(db: Session) -> ShippingTable:
+    return _table.get(db)
+
+
+def estimate_weight(total_qty: int) -> float:
+    return round(max(total_qty, 0) * settings.SHIPPING_KG_PER_PIECE, 3)
+
+
+def quote_shipping(
+    table: ShippingTable,
+    total_qty: int,
+    weight_kg: Optional[float] = None,
+    provider: Optional[str] = None,
+) -> ShippingQuote:
+    """Shipping for a parcel of *total_qty* pieces (or a known weight)."""
+    if table:
+        weight = weight_kg if weight_kg is not None else estimate_weight(total_qty)
+        quote = table.quote(weight, provider)
+        if quote is not None:
+            return quote
+    return ShippingQuote(None, Decimal(qty_shipping_cost(total_qty)))
+
+
+def shipping_cost(db: Session, total_qty: int, weight_kg: Optional[float] = None) -> Decimal:
+    return quote_shipping(shipping_table(db), total_qty, weight_kg).price
@@ -2,9 +2,11 @@ from app.db.base_class import Base
 from app.models.user import User
 from app.models.customer import Customer
 from app.models.order import Order, OrderItem
+from app.models.order_sequence import OrderSequence
 from app.models.product import FabricType, NeckType, SleeveType
 from app.models.supplier import Supplier
 from app.models.pricing_rule import PricingRule
 from app.models.company import Company
 from app.models.audit_log import AuditLog
 from app.models.album import OrderAlbum, AlbumImage
+from app.models.order_rollup import OrderDailyRollup
@@ -0,0 +1,199 @@
+"""
+SQLAlchemy instrumentation: statement timing, per-request query counts,
+slow-query logging and connection-pool metrics.
+
+The cursor hooks are registered on the ``Engine`` class, so every engine in
+the process is covered (primary, read pool, the test engine). Per-request
+stats live in a context variable that ``RequestMetricsMiddleware`` opens for
+each HTTP request; sync endpoints running in the threadpool inherit it.
+
+Slow statements (``SLOW_QUERY_MS``) are logged with their SQL text only;
+bound parameter values are replaced by placeholders so customer names,
+phone numbers and addresses never reach the logs.
+"""
+
+import contextvars
+import logging
+import re
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger("app.db.slow_query")
+
+QUERY_SECONDS = registry.histogram(
+    "db_query_duration_seconds",
+    "Time spent executing SQL statements.",
+    ["operation"],
+)
+QUERY_ERRORS = registry.counter(
+    "db_query_errors_total", "SQL statements that raised an error.", ["operation"]
+)
+SLOW_QUERIES = registry.counter(
+    "db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS.", ["operation"]
+)
+POOL_WAIT_SECONDS = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ["pool"],
+)
+POOL_TIMEOUTS = registry.counter(
+    "db_pool_checkout_timeouts_total", "Pool checkouts that timed out.", ["pool"]
+)
+POOL_SIZE = registry.gauge("db_pool_size", "Configured pool size.", ["pool"])
+POOL_CHECKED_OUT = registry.gauge(
+    "db_pool_checked_out", "Connections currently checked out.", ["pool"]
+)
+POOL_OVERFLOW = registry.gauge(
+    "db_pool_overflow", "Overflow connections currently open.", ["pool"]
+)
+
+
+# ---------------------------------------------------------------------------
+# Per-request statistics
+# ---------------------------------------------------------------------------
+class QueryStats:
+    """Statement count and DB time accumulated during one request."""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+_current_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar(
+    "db_query_stats", default=None
+)
+
+
+def start_query_stats() -> contextvars.Token:
+    """Begin collecting stats for the current context (one HTTP request)."""
+    return _current_stats.set(QueryStats())
+
+
+def stop_query_stats(token: contextvars.Token) -> None:
+    _current_stats.reset(token)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+# ---------------------------------------------------------------------------
+# Statement hooks
+# ---------------------------------------------------------------------------
+_OP_RE = re.compile(r"^\s*(?:--[^\n]*\n\s*)*(\w+)")
+
+
+def _operation(statement: str) -> str:
+    m = _OP_RE.match(statement or "")
+    return m.group(1).upper() if m else "OTHER"
+
+
+def redact_parameters(parameters, executemany: bool = False) -> str:
+    """Describe bound parameters without their values."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        return f"<{len(parameters)} parameter sets>"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}=?" for k in parameters) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join("?" for _ in parameters) + ")"
+    return "?" if parameters else "()"
+
+
+def _truncate(statement: str, limit: int = 2000) -> str:
+    s = " ".join((statement or "").split())
+    return s if len(s) <= limit else s[:limit] + "..."
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start_time")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    op = _operation(statement)
+    QUERY_SECONDS.observe(elapsed, operation=op)
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+    threshold = settings.SLOW_QUERY_MS
+    if threshold > 0 and elapsed * 1000 >= threshold:
+        SLOW_QUERIES.inc(operation=op)
+        logger.warning(
+            "Slow query %.1f ms: %s params=%s",
+            elapsed * 1000,
+            _truncate(statement),
+            redact_parameters(parameters, executemany),
+        )
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None:
+        starts = conn.info.get("query_start_time")
+        if starts:
+            starts.pop()
+    QUERY_ERRORS.inc(operation=_operation(exception_context.statement or ""))
+
+
+# ---------------------------------------------------------------------------
+# Connection pool
+# ---------------------------------------------------------------------------
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    metrics_name = "default"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc(pool=self.metrics_name)
+            raise
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - start, pool=self.metrics_name)
+
+
+def timed_pool_class(name: str) -> type:
+    """A TimedQueuePool subclass labelled *name* (survives pool.recreate())."""
+    return type(f"TimedQueuePool_{name}", (TimedQueuePool,), {"metrics_name": name})
+
+
+_pools: Dict[str, Engine] = {}
+
+
+def register_pool(name: str, engine: Engine) -> None:
+    """Report *engine*'s pool gauges under ``pool=<name>`` on every scrape."""
+    _pools[name] = engine
+
+
+def _collect_pool_gauges() -> None:
+    for name, engine in list(_pools.items()):
+        pool = engine.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        POOL_SIZE.set(pool.size(), pool=name)
+        POOL_CHECKED_OUT.set(pool.checkedout(), pool=name)
+        POOL_OVERFLOW.set(max(pool.overflow(), 0), pool=name)
+
+
+registry.add_collector(_collect_pool_gauges)
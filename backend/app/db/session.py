@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
 import os
 
+from app.core.config import settings
+from app.db.instrumentation import register_pool, timed_pool_class
+
 # Explicit DATABASE_URL env var wins. Falls back to local SQLite for dev/test
 # runs without any environment setup. Production deployments (Railway, Azure)
 # always set DATABASE_URL explicitly.
@@ -9,11 +13,62 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL") or "sqlite:///./blook_dev.db
 
 _is_sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
 
+
+def sqlite_pragmas(in_memory: bool = False, read_only: bool = False) -> list:
+    """PRAGMA statements for the SQLite profile configured in Settings.
+
+    journal_mode and mmap_size only make sense for file databases, so they
+    are skipped for ``:memory:`` connections. Read-only connections cannot
+    change the journal mode and inherit it from the file instead.
+    """
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}",
+        # negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size = -{int(settings.SQLITE_CACHE_SIZE_KB)}",
+        f"PRAGMA temp_store = {settings.SQLITE_TEMP_STORE}",
+    ]
+    if not in_memory:
+        if not read_only:
+            pragmas.insert(0, f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+        pragmas.append(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}")
+    return pragmas
+
+
+def configure_sqlite_engine(target: Engine, read_only: bool = False) -> Engine:
+    """Apply the SQLite pragma profile to every connection *target* opens."""
+    in_memory = target.url.database in (None, "", ":memory:")
+    statements = sqlite_pragmas(in_memory, read_only)
+
+    @event.listens_for(target, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for stmt in statements:
+                cursor.execute(stmt)
+        finally:
+            cursor.close()
+
+    return target
+
+
+def _pool_args(url: str, name: str) -> dict:
+    # Timed QueuePool for checkout-wait metrics; in-memory SQLite keeps the
+    # dialect's default single-connection pool.
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:"):
+        return {}
+    return {"poolclass": timed_pool_class(name)}
+
+
 if _is_sqlite:
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
         connect_args={"check_same_thread": False},
+        **_pool_args(SQLALCHEMY_DATABASE_URL, "primary"),
     )
+    if settings.SQLITE_PRAGMAS_ENABLED:
+        configure_sqlite_engine(engine)
 else:
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
@@ -21,9 +76,63 @@ else:
         pool_size=10,
         max_overflow=20,
         pool_recycle=1800,
+        **_pool_args(SQLALCHEMY_DATABASE_URL, "primary"),
     )
+register_pool("primary", engine)
+
+
+def _make_read_engine(primary: Engine) -> Engine:
+    """Engine for get_read_db: replica URL, read-only SQLite pool, or the primary.
+
+    A Postgres replica may lag the primary slightly; endpoints that must read
+    their own writes keep using get_db. SQLite readers share the primary file
+    under WAL, so they see every committed write immediately without taking
+    connections (or locks) away from writers.
+    """
+    if settings.READ_DATABASE_URL:
+        if settings.READ_DATABASE_URL.startswith("sqlite"):
+            read_engine = create_engine(
+                settings.READ_DATABASE_URL,
+                connect_args={"check_same_thread": False},
+                **_pool_args(settings.READ_DATABASE_URL, "read"),
+            )
+            if settings.SQLITE_PRAGMAS_ENABLED:
+                configure_sqlite_engine(read_engine, read_only=True)
+            return read_engine
+        return create_engine(
+            settings.READ_DATABASE_URL,
+            pool_pre_ping=True,
+            pool_size=10,
+            max_overflow=20,
+            pool_recycle=1800,
+            **_pool_args(settings.READ_DATABASE_URL, "read"),
+        )
+    database = primary.url.database
+    if (
+        primary.dialect.name == "sqlite"
+        and settings.SQLITE_READ_POOL_ENABLED
+        and settings.SQLITE_PRAGMAS_ENABLED
+        and settings.SQLITE_JOURNAL_MODE.upper() == "WAL"
+        and database not in (None, "", ":memory:")
+        and not database.startswith("file:")
+    ):
+        path = os.path.abspath(database)
+        url = f"sqlite:///file:{path}?mode=ro&uri=true"
+        read_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            **_pool_args(url, "read"),
+        )
+        return configure_sqlite_engine(read_engine, read_only=True)
+    return primary
+
+
+read_engine = _make_read_engine(engine)
+if read_engine is not engine:
+    register_pool("read", read_engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 
 def get_db():
@@ -32,3 +141,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Session for read-only endpoints (list/detail/report GETs).
+
+    Never commit through it: on SQLite the pool is opened read-only.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
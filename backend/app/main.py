@@ -1,13 +1,16 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
 import logging
 import os
+import secrets
 from app.db.session import engine, SessionLocal
 from app.db.base import Base
 from app.core.config import settings
+from app.core.metrics import registry, PROMETHEUS_CONTENT_TYPE
+from app.core.request_metrics import RequestMetricsMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.api import (
     auth,
@@ -16,12 +19,14 @@ from app.api import (
     suppliers,
     customers,
     pricing_rules,
+    shipping_rates,
     company,
     pricing,
     admin,
     public,
     notifications,
     albums,
+    reports,
 )
 
 logging.basicConfig(level=logging.INFO)
@@ -60,8 +65,14 @@ async def lifespan(app: FastAPI):
     except Exception:
         logger.exception("Failed to start background scheduler")
 
+    # Batched writer for async audit events (replays any spilled events first)
+    from app.core.audit import start_audit_writer, stop_audit_writer
+
+    start_audit_writer(engine)
+
     yield
     logger.info("Shutting down %s", settings.PROJECT_NAME)
+    stop_audit_writer()
 
 
 app = FastAPI(title="B-Look OMS API (Production)", lifespan=lifespan)
@@ -73,6 +84,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 
 # ---------------------------------------------------------------------------
@@ -84,6 +96,18 @@ def health_check():
     return {"status": "ok"}
 
 
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", tags=["Health"], include_in_schema=False)
+    def metrics(request: Request):
+        """Prometheus scrape endpoint: query timing, pool and request metrics."""
+        if settings.METRICS_TOKEN:
+            sent = request.headers.get("authorization", "")
+            if not secrets.compare_digest(sent, f"Bearer {settings.METRICS_TOKEN}"):
+                return Response(status_code=status.HTTP_401_UNAUTHORIZED)
+        return Response(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Authentication"])
 app.include_router(orders.router, prefix="/api/v1/orders", tags=["Orders"])
 app.include_router(products.router, prefix="/api/v1/products", tags=["Products"])
@@ -92,6 +116,9 @@ app.include_router(customers.router, prefix="/api/v1/customers", tags=["Customer
 app.include_router(
     pricing_rules.router, prefix="/api/v1/pricing-rules", tags=["Pricing Rules"]
 )
+app.include_router(
+    shipping_rates.router, prefix="/api/v1/shipping-rates", tags=["Shipping Rates"]
+)
 app.include_router(pricing.router, prefix="/api/v1/pricing", tags=["Pricing"])
 app.include_router(company.router, prefix="/api/v1/company", tags=["Company"])
 app.include_router(admin.router, prefix="/api/v1/admin", tags=["Admin"])
@@ -100,6 +127,7 @@ app.include_router(
     notifications.router, prefix="/api/v1/notifications", tags=["Notifications"]
 )
 app.include_router(albums.router, prefix="/api/v1/orders", tags=["Albums"])
+app.include_router(reports.router, prefix="/api/v1/reports", tags=["Reports"])
 
 app.mount("/static", StaticFiles(directory=settings.STATIC_DIR), name="static")
 
@@ -1,9 +1,11 @@
 from .user import User
 from .customer import Customer
 from .order import Order, OrderItem
+from .order_sequence import OrderSequence
 from .product import FabricType, NeckType, SleeveType
 from .supplier import Supplier
 from .pricing_rule import PricingRule
 from .company import Company
 from .audit_log import AuditLog
 from .album import OrderAlbum, AlbumImage
+from .order_rollup import OrderDailyRollup
@@ -1,19 +1,130 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+import json
+import re
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import (
+    JSON,
+    Column,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    DateTime,
+    ForeignKey,
+    Index,
+    event,
+)
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base_class import Base
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("ix_audit_logs_target_created", "target_type", "target_id", "created_at"),
+        Index("ix_audit_logs_order_created", "order_id", "created_at"),
+        Index("ix_audit_logs_action_created", "action", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    
+
     action = Column(String, nullable=False)
     target_type = Column(String, index=True)
     target_id = Column(String, index=True)
+    # Legacy free-form details (JSON text or "key=value" text). New events
+    # carry the same information in the structured columns + payload below
+    # and still write the payload here as JSON text for older readers.
     details = Column(Text, nullable=True)
-    
+
+    # Integer order reference for the order timeline, so lookups do not cast
+    # target_id. Filled from target_id for target_type="order"; album events
+    # set it explicitly. No FK: the history outlives a deleted order.
+    order_id = Column(Integer, nullable=True)
+
+    # Structured fields for reporting (status transitions, money, who)
+    from_status = Column(String, nullable=True)
+    to_status = Column(String, nullable=True)
+    amount = Column(Numeric(12, 2), nullable=True)
+    actor_role = Column(String, nullable=True)
+    # Event-specific fields as a JSON object
+    payload = Column(JSON, nullable=True)
+
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     user = relationship("User")
-    
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+def order_id_for(target_type, target_id):
+    """Integer order id implied by an order-targeted event, else None."""
+    if target_type != "order":
+        return None
+    try:
+        return int(target_id)
+    except (TypeError, ValueError):
+        return None
+
+
+_KEY_VALUE_RE = re.compile(r"(\w+)=(\S*)")
+
+
+def _scalar(value: str):
+    return int(value) if value.isdigit() else value
+
+
+def _decimal(value):
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def structure_details(details):
+    """Split event details into (structured column values, JSON payload).
+
+    *details* may be a dict or legacy text: JSON, ``key=value`` pairs (as the
+    public slip upload used to write) or free text, which is kept under
+    ``payload["text"]``. Status transitions are read from
+    changed_from/changed_to, from/to or an UPDATE_ORDER ``changes.status``
+    diff; ``amount`` from a top-level amount.
+    """
+    if details is None or details == "":
+        return {}, None
+    data = details
+    if isinstance(details, str):
+        try:
+            data = json.loads(details)
+        except ValueError:
+            pairs = _KEY_VALUE_RE.findall(details)
+            data = {k: _scalar(v) for k, v in pairs} if pairs else {"text": details}
+    if not isinstance(data, dict):
+        data = {"value": data}
+
+    columns = {}
+    from_status = data.get("changed_from", data.get("from"))
+    to_status = data.get("changed_to", data.get("to"))
+    changes = data.get("changes")
+    if isinstance(changes, dict) and isinstance(changes.get("status"), dict):
+        from_status = from_status or changes["status"].get("from")
+        to_status = to_status or changes["status"].get("to")
+    if isinstance(from_status, str):
+        columns["from_status"] = from_status
+    if isinstance(to_status, str):
+        columns["to_status"] = to_status
+    amount = _decimal(data.get("amount"))
+    if amount is not None:
+        columns["amount"] = amount
+    return columns, data
+
+
+@event.listens_for(AuditLog, "before_insert")
+def _fill_structured_fields(mapper, connection, target: AuditLog) -> None:
+    if target.order_id is None:
+        target.order_id = order_id_for(target.target_type, target.target_id)
+    if target.payload is None and target.details:
+        columns, target.payload = structure_details(target.details)
+        for name, value in columns.items():
+            if getattr(target, name) is None:
+                setattr(target, name, value)
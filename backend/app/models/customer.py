@@ -1,7 +1,7 @@
 from typing import Optional, List, TYPE_CHECKING
 from datetime import datetime
 from sqlalchemy import Integer, String, Text, DateTime
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from sqlalchemy.sql import func
 from app.db.base_class import Base
 
@@ -14,8 +14,14 @@ class Customer(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    # Normalized matching keys, maintained from name/phone by the validators
+    # below (see app/core/customers.py for the normalization rules).
+    name_key: Mapped[Optional[str]] = mapped_column(
+        String, unique=True, index=True, nullable=True
+    )
     customer_code: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     phone: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    phone_key: Mapped[Optional[str]] = mapped_column(String, index=True, nullable=True)
     channel: Mapped[Optional[str]] = mapped_column(
         String, nullable=True
     )  # LINE OA, Facebook, Phone
@@ -26,3 +32,17 @@ class Customer(Base):
 
     # Relationship: 1 Customer has Many Orders
     orders: Mapped[List["Order"]] = relationship("Order", back_populates="customer")
+
+    @validates("name")
+    def _sync_name_key(self, key, value):
+        from app.core.customers import normalize_customer_name
+
+        self.name_key = normalize_customer_name(value)
+        return value
+
+    @validates("phone")
+    def _sync_phone_key(self, key, value):
+        from app.core.customers import normalize_phone
+
+        self.phone_key = normalize_phone(value)
+        return value
@@ -1,7 +1,7 @@
 from typing import Optional, List, TYPE_CHECKING
 from decimal import Decimal
 from datetime import datetime
-from sqlalchemy import Integer, String, Boolean, DateTime, ForeignKey, Numeric, Text
+from sqlalchemy import event, Integer, String, Boolean, DateTime, ForeignKey, Numeric, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 from app.db.base_class import Base
@@ -27,13 +27,15 @@ class Order(Base):
     brand: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     customer_code: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     graphic_code: Mapped[Optional[str]] = mapped_column(String, nullable=True)
-    product_type: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    product_type: Mapped[Optional[str]] = mapped_column(
+        String, nullable=True, active_history=True
+    )
 
     contact_channel: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     address: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     phone: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     customer_id: Mapped[Optional[int]] = mapped_column(
-        Integer, ForeignKey("customers.id"), nullable=True
+        Integer, ForeignKey("customers.id"), nullable=True, index=True
     )
     customer: Mapped[Optional["Customer"]] = relationship(
         "Customer", back_populates="orders"
@@ -48,8 +50,13 @@ class Order(Base):
     urgency_level: Mapped[str] = mapped_column(
         String, default="normal"
     )  # normal, warning, critical
+    # active_history=True (here and on the totals below): the previous value is
+    # loaded even when the attribute was expired, so the rollup listener in
+    # app.core.order_rollups can subtract the order's old contribution.
     # New status values for payment flow: WAITING_BOOKING, WAITING_DEPOSIT, WAITING_BALANCE, etc.
-    status: Mapped[str] = mapped_column(String, default="WAITING_BOOKING")
+    status: Mapped[str] = mapped_column(
+        String, default="WAITING_BOOKING", active_history=True
+    )
 
     # Financials
     is_vat_included: Mapped[bool] = mapped_column(Boolean, default=True)
@@ -81,7 +88,7 @@ class Order(Base):
         Numeric(10, 2), nullable=True, default=Decimal("0")
     )
     grand_total: Mapped[Optional[Decimal]] = mapped_column(
-        Numeric(10, 2), nullable=True, default=Decimal("0")
+        Numeric(10, 2), nullable=True, default=Decimal("0"), active_history=True
     )
 
     deposit_amount: Mapped[Optional[Decimal]] = mapped_column(
@@ -95,7 +102,7 @@ class Order(Base):
     )
 
     balance_amount: Mapped[Optional[Decimal]] = mapped_column(
-        Numeric(10, 2), nullable=True, default=Decimal("0")
+        Numeric(10, 2), nullable=True, default=Decimal("0"), active_history=True
     )
 
     # Public payment link secret and slip URLs
@@ -131,10 +138,10 @@ class Order(Base):
 
     # Cost & Profit
     total_cost: Mapped[Optional[Decimal]] = mapped_column(
-        Numeric(10, 2), nullable=True, default=Decimal("0")
+        Numeric(10, 2), nullable=True, default=Decimal("0"), active_history=True
     )
     estimated_profit: Mapped[Optional[Decimal]] = mapped_column(
-        Numeric(10, 2), nullable=True, default=Decimal("0")
+        Numeric(10, 2), nullable=True, default=Decimal("0"), active_history=True
     )
 
     note: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
@@ -147,7 +154,7 @@ class Order(Base):
     )
 
     created_by_id: Mapped[Optional[int]] = mapped_column(
-        Integer, ForeignKey("users.id"), nullable=True
+        Integer, ForeignKey("users.id"), nullable=True, active_history=True
     )
     created_by: Mapped[Optional["User"]] = relationship(
         "User", foreign_keys=[created_by_id]
@@ -174,7 +181,7 @@ class OrderItem(Base):
 
     product_name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     fabric_type: Mapped[Optional[str]] = mapped_column(String, nullable=True)
-    neck_type: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    neck_type: Mapped[Optional[str]] = mapped_column(String, nullable=True, index=True)
     sleeve_type: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
     quantity_matrix: Mapped[Optional[str]] = mapped_column(
@@ -193,6 +200,9 @@ class OrderItem(Base):
     selected_add_ons: Mapped[Optional[str]] = mapped_column(
         Text, nullable=True
     )  # JSON array of add-on ids
+    # JSON array: the part of selected_add_ons added by neck / oversize rules
+    # rather than chosen by the client (NULL: not recorded)
+    auto_add_ons: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     is_oversize: Mapped[bool] = mapped_column(Boolean, default=False)
 
     # Optional: Store per-item addon totals and sizing surcharge for reporting
@@ -211,3 +221,11 @@ class OrderItem(Base):
     )
 
     order: Mapped["Order"] = relationship("Order", back_populates="items")
+
+
+@event.listens_for(Order.__table__, "after_create")
+def _create_order_search_index(target, connection, **kw):
+    # FTS5 table + sync triggers for order search (SQLite only)
+    from app.core.order_search import install_search_index
+
+    install_search_index(connection)
@@ -0,0 +1,46 @@
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Date, Integer, Numeric, String, event
+from sqlalchemy.orm import Mapped, Session, mapped_column
+from app.db.base_class import Base
+
+
+class OrderDailyRollup(Base):
+    """Order totals per creation day x status x product type x sales user.
+
+    Kept current by ``app.core.order_rollups`` on every flush that inserts,
+    updates or deletes an Order, and reconciled nightly against ``orders``.
+    Missing dimensions use sentinels instead of NULL so the composite key
+    works with ON CONFLICT: ``product_type`` defaults to "shirt" (as in the
+    customer summary) and an unknown sales user is ``0``.
+    """
+
+    __tablename__ = "order_daily_rollups"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    status: Mapped[str] = mapped_column(String, primary_key=True)
+    product_type: Mapped[str] = mapped_column(String, primary_key=True)
+    sales_user_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    order_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    grand_total: Mapped[Decimal] = mapped_column(
+        Numeric(14, 2), nullable=False, default=Decimal("0")
+    )
+    total_cost: Mapped[Decimal] = mapped_column(
+        Numeric(14, 2), nullable=False, default=Decimal("0")
+    )
+    estimated_profit: Mapped[Decimal] = mapped_column(
+        Numeric(14, 2), nullable=False, default=Decimal("0")
+    )
+    balance_amount: Mapped[Decimal] = mapped_column(
+        Numeric(14, 2), nullable=False, default=Decimal("0")
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _maintain_order_rollups(session, flush_context, instances) -> None:
+    # Rollup deltas for the orders in this flush, in the same transaction
+    from app.core.order_rollups import apply_flush_deltas
+
+    apply_flush_deltas(session)
@@ -0,0 +1,17 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base_class import Base
+
+
+class OrderSequence(Base):
+    """Per-prefix counter used to allocate human-readable order numbers.
+
+    One row per sequence key (e.g. ``PO-2026``). ``last_value`` is bumped
+    atomically by ``app.core.order_numbers.next_order_no`` so concurrent
+    order creation never hands out the same number twice.
+    """
+
+    __tablename__ = "order_sequences"
+
+    prefix: Mapped[str] = mapped_column(String, primary_key=True)
+    last_value: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,304 @@
+"""
+In-process load benchmark for the hot order flows.
+
+Seeds a synthetic dataset (benchmarks/dataset.py) into a scratch SQLite file,
+then drives the ASGI app directly through httpx's ASGITransport - no server,
+no network - with a fixed number of requests per scenario issued at the
+chosen concurrency:
+
+    pricing_calc   POST  /api/v1/pricing/calc
+    pricing_matrix POST  /api/v1/pricing/matrix (50 necks x 20 quantities x 16 add-on combos)
+    create_order   POST  /api/v1/orders/
+    list_orders    GET   /api/v1/orders/?limit=50
+    read_order     GET   /api/v1/orders/{id}
+    update_status  PATCH /api/v1/orders/{id}/status
+    upload_slip    POST  /api/v1/public/orders/{uuid}/slip
+    smart_alerts   check_smart_alerts() (the scheduler job, run sequentially)
+
+Each scenario reports p50/p95/p99 latency, req/s and the number of non-2xx
+responses. Results can be written as JSON and compared against a saved
+baseline; any scenario whose p95 grows or whose req/s drops by more than
+--threshold is flagged and the exit status is 1.
+
+Usage:
+    cd backend
+    python -m benchmarks.order_flows                         # 5000 orders, 200 req/scenario, 8 concurrent
+    python -m benchmarks.order_flows --orders 20000 --requests 500 --concurrency 16
+    python -m benchmarks.order_flows --json results.json
+    python -m benchmarks.order_flows --save-baseline benchmarks/baseline.json
+    python -m benchmarks.order_flows --baseline benchmarks/baseline.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# 1x1 transparent PNG: passes the slip endpoint's magic-byte check.
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082"
+)
+# every subset of four add-ons: 16 combos
+_MATRIX_ADDONS = ("longSleeve", "pocket", "numberName", "collarTongue")
+_MATRIX_COMBOS = [
+    [code for bit, code in enumerate(_MATRIX_ADDONS) if n >> bit & 1] for n in range(16)
+]
+_STATUS_CYCLE = ["WAITING_DEPOSIT", "WAITING_ARTWORK", "IN_PRODUCTION", "WAITING_BALANCE"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+def summarize(latencies: List[float], errors: int, wall: float) -> Dict[str, float]:
+    lat = sorted(latencies)
+    return {
+        "requests": len(lat),
+        "errors": errors,
+        "p50_ms": round(percentile(lat, 50) * 1000, 2),
+        "p95_ms": round(percentile(lat, 95) * 1000, 2),
+        "p99_ms": round(percentile(lat, 99) * 1000, 2),
+        "rps": round(len(lat) / wall, 1) if wall > 0 else 0.0,
+    }
+
+
+async def _drive(
+    count: int, concurrency: int, make_call: Callable[[int], Awaitable[int]]
+) -> Dict[str, float]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with sem:
+            start = time.perf_counter()
+            status = await make_call(i)
+            latencies.append(time.perf_counter() - start)
+            if not 200 <= status < 300:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return summarize(latencies, errors, time.perf_counter() - wall_start)
+
+
+async def run_scenarios(app, ds, args) -> Dict[str, Dict[str, float]]:
+    import httpx
+
+    from app.core.scheduler import check_smart_alerts
+    from app.core.security import create_access_token
+    from benchmarks.dataset import random_items
+
+    rng = random.Random(args.seed)
+    headers = {
+        "Authorization": "Bearer "
+        + create_access_token({"sub": str(ds.user_ids["ADMIN"])})
+    }
+    transport = httpx.ASGITransport(app=app)
+    results: Dict[str, Dict[str, float]] = {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def pricing_calc(i):
+            items = random_items(rng, 2)
+            for it in items:
+                it["product_type"] = "shirt"
+            r = await client.post("/api/v1/pricing/calc", json={"items": items})
+            return r.status_code
+
+        async def pricing_matrix(i):
+            r = await client.post(
+                "/api/v1/pricing/matrix",
+                json={
+                    "necks": [it["neck_type"] for it in random_items(rng, 50)],
+                    "quantities": list(range(10, 410, 20)),
+                    "add_on_combos": _MATRIX_COMBOS,
+                },
+            )
+            return r.status_code
+
+        async def create_order(i):
+            payload = {
+                "customer_name": rng.choice(ds.customer_names),
+                "phone": f"08{rng.randint(10000000, 99999999)}",
+                "items": random_items(rng, 2),
+            }
+            r = await client.post("/api/v1/orders/", json=payload, headers=headers)
+            return r.status_code
+
+        async def list_orders(i):
+            r = await client.get(
+                "/api/v1/orders/", params={"skip": rng.randint(0, 200), "limit": 50}, headers=headers
+            )
+            return r.status_code
+
+        async def read_order(i):
+            r = await client.get(f"/api/v1/orders/{rng.choice(ds.order_ids)}", headers=headers)
+            return r.status_code
+
+        async def update_status(i):
+            r = await client.patch(
+                f"/api/v1/orders/{rng.choice(ds.order_ids)}/status",
+                json={"status": _STATUS_CYCLE[i % len(_STATUS_CYCLE)]},
+                headers=headers,
+            )
+            return r.status_code
+
+        async def upload_slip(i):
+            r = await client.post(
+                f"/api/v1/public/orders/{rng.choice(ds.order_uuids)}/slip",
+                data={"installment": rng.choice(["booking", "deposit", "balance"])},
+                files={"file": ("slip.png", _PNG, "image/png")},
+            )
+            return r.status_code
+
+        scenarios = {
+            "pricing_calc": pricing_calc,
+            "pricing_matrix": pricing_matrix,
+            "create_order": create_order,
+            "list_orders": list_orders,
+            "read_order": read_order,
+            "update_status": update_status,
+            "upload_slip": upload_slip,
+        }
+        selected = args.only or list(scenarios) + ["smart_alerts"]
+        for name, call in scenarios.items():
+            if name not in selected:
+                continue
+            await _drive(min(args.warmup, args.requests), args.concurrency, call)
+            results[name] = await _drive(args.requests, args.concurrency, call)
+            _print_row(name, results[name])
+
+    if "smart_alerts" in selected:
+
+        async def smart_alerts(i):
+            await asyncio.to_thread(check_smart_alerts)
+            return 200
+
+        results["smart_alerts"] = await _drive(args.alert_runs, 1, smart_alerts)
+        _print_row("smart_alerts", results["smart_alerts"])
+    return results
+
+
+def _print_row(name: str, r: Dict[str, float]) -> None:
+    print(
+        f"{name:<14} n={r['requests']:<6} err={r['errors']:<4} "
+        f"p50={r['p50_ms']:>8.2f}ms p95={r['p95_ms']:>8.2f}ms "
+        f"p99={r['p99_ms']:>8.2f}ms {r['rps']:>8.1f} req/s"
+    )
+
+
+def compare(
+    current: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    """Regressions of *current* vs *baseline*: p95 up or req/s down beyond threshold."""
+    regressions = []
+    for name, cur in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base["p95_ms"] > 0 and cur["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {base['p95_ms']:.2f}ms -> {cur['p95_ms']:.2f}ms"
+            )
+        if base["rps"] > 0 and cur["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{name}: {base['rps']:.1f} -> {cur['rps']:.1f} req/s")
+        if cur["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: errors {base.get('errors', 0)} -> {cur['errors']}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--items-per-order", type=int, default=2)
+    parser.add_argument("--audits-per-order", type=int, default=3)
+    parser.add_argument("--notifications", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--alert-runs", type=int, default=3)
+    parser.add_argument("--only", nargs="*", help="run only these scenarios")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="blook-bench-")
+    # Settings are read at import time, so point the app at the scratch
+    # database and upload directory before importing it.
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["STATIC_DIR"] = os.path.join(workdir, "static")
+    os.environ.setdefault("QUERY_BUDGET_MODE", "warn")
+    for sub in ("slips", "mockups", "artworks", "print_files", "albums"):
+        os.makedirs(os.path.join(os.environ["STATIC_DIR"], sub), exist_ok=True)
+    logging.basicConfig(level=logging.WARNING)
+
+    from app.main import app
+    from app.db.session import engine
+    from benchmarks.dataset import seed
+
+    logging.getLogger().setLevel(logging.WARNING)
+    t0 = time.perf_counter()
+    ds = seed(
+        engine,
+        customers=args.customers,
+        orders=args.orders,
+        items_per_order=args.items_per_order,
+        audits_per_order=args.audits_per_order,
+        notifications=args.notifications,
+        rng_seed=args.seed,
+    )
+    print(f"seeded {args.orders} orders into {workdir} in {time.perf_counter() - t0:.1f}s")
+
+    results = asyncio.run(run_scenarios(app, ds, args))
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "orders": args.orders,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": results,
+    }
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("scenarios", {})
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nREGRESSIONS (threshold {args.threshold:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nno regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+SQLite concurrency benchmark: stock settings vs the tuned pragma profile.
+
+Runs a mixed workload against a scratch database file: writer threads insert
+an order-sized row and commit (one transaction per write, like the API), while
+reader threads run a paginated SELECT. Each profile is measured on a fresh
+file with the same workload and duration, reporting reads/s, writes/s and the
+number of "database is locked" errors.
+
+    stock  - the engine as production created it before the profile existed
+             (only check_same_thread=False: rollback journal, synchronous=FULL)
+    tuned  - configure_sqlite_engine() with the Settings-driven pragmas
+             (WAL, busy_timeout, synchronous=NORMAL, cache/mmap/temp_store)
+
+Usage:
+    cd backend
+    python -m benchmarks.sqlite_concurrency                # 4 writers, 8 readers, 5s
+    python -m benchmarks.sqlite_concurrency --writers 8 --readers 16 --seconds 10
+    python -m benchmarks.sqlite_concurrency --json results.json
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.db.session import configure_sqlite_engine
+
+_SCHEMA = """
+CREATE TABLE bench_orders (
+    id INTEGER PRIMARY KEY,
+    order_no TEXT NOT NULL,
+    customer_name TEXT,
+    note TEXT,
+    grand_total NUMERIC(10, 2),
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def _make_engine(path: str, tuned: bool):
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        pool_size=64,
+        max_overflow=0,
+    )
+    if tuned:
+        configure_sqlite_engine(engine)
+    return engine
+
+
+def _seed(engine, rows: int) -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(_SCHEMA)
+        conn.execute(
+            text(
+                "INSERT INTO bench_orders (order_no, customer_name, note, grand_total) "
+                "VALUES (:no, :name, :note, :total)"
+            ),
+            [
+                {"no": f"SEED-{i}", "name": f"Customer {i % 500}", "note": "x" * 80, "total": i}
+                for i in range(rows)
+            ],
+        )
+
+
+def run_profile(tuned: bool, writers: int, readers: int, seconds: float, seed_rows: int) -> dict:
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="blook_bench_")
+    os.close(fd)
+    os.unlink(path)
+    engine = _make_engine(path, tuned)
+    try:
+        _seed(engine, seed_rows)
+        stop = time.monotonic() + seconds
+        counts = {"reads": 0, "writes": 0, "locked": 0, "write_ms": []}
+        lock = threading.Lock()
+
+        def writer(wid: int):
+            n = 0
+            while time.monotonic() < stop:
+                t0 = time.perf_counter()
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(
+                            text(
+                                "INSERT INTO bench_orders (order_no, customer_name, note, grand_total) "
+                                "VALUES (:no, :name, :note, :total)"
+                            ),
+                            {"no": f"W{wid}-{n}", "name": "Writer", "note": "y" * 80, "total": n},
+                        )
+                    ms = (time.perf_counter() - t0) * 1000
+                    with lock:
+                        counts["writes"] += 1
+                        counts["write_ms"].append(ms)
+                except OperationalError:
+                    with lock:
+                        counts["locked"] += 1
+                n += 1
+
+        def reader(rid: int):
+            while time.monotonic() < stop:
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(
+                            text(
+                                "SELECT id, order_no, customer_name, grand_total FROM bench_orders "
+                                "ORDER BY id DESC LIMIT 100"
+                            )
+                        ).all()
+                    with lock:
+                        counts["reads"] += 1
+                except OperationalError:
+                    with lock:
+                        counts["locked"] += 1
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        write_ms = sorted(counts["write_ms"]) or [0.0]
+        return {
+            "profile": "tuned" if tuned else "stock",
+            "reads_per_s": round(counts["reads"] / seconds, 1),
+            "writes_per_s": round(counts["writes"] / seconds, 1),
+            "locked_errors": counts["locked"],
+            "write_p50_ms": round(write_ms[len(write_ms) // 2], 2),
+            "write_p99_ms": round(write_ms[min(len(write_ms) - 1, int(len(write_ms) * 0.99))], 2),
+        }
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.unlink(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--seed-rows", type=int, default=20000)
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    args = parser.parse_args()
+
+    results = [
+        run_profile(tuned, args.writers, args.readers, args.seconds, args.seed_rows)
+        for tuned in (False, True)
+    ]
+    header = f"{'profile':<8}{'reads/s':>12}{'writes/s':>12}{'locked':>9}{'w p50 ms':>11}{'w p99 ms':>11}"
+    print(header)
+    for r in results:
+        print(
+            f"{r['profile']:<8}{r['reads_per_s']:>12}{r['writes_per_s']:>12}"
+            f"{r['locked_errors']:>9}{r['write_p50_ms']:>11}{r['write_p99_ms']:>11}"
+        )
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
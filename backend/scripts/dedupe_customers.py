@@ -0,0 +1,44 @@
+"""
+One-off maintenance job that merges customers whose names only differ in
+spelling (case, spacing, punctuation, Thai SARA AM variants) into a single row.
+
+For each group sharing a normalized name key the lowest id survives, its blank
+contact fields are filled from the duplicates, all orders are relinked to it
+and the duplicates are deleted. Also backfills customers.name_key/phone_key.
+
+Usage:
+    python backend/scripts/dedupe_customers.py            # report only
+    python backend/scripts/dedupe_customers.py --apply    # merge and commit
+
+This script uses the project's SQLAlchemy SessionLocal. Make sure your environment
+is configured with the correct DATABASE_URL.
+"""
+
+import sys
+
+from app.db.session import SessionLocal
+from app.core.customers import merge_duplicate_customers
+
+
+def main():
+    apply = "--apply" in sys.argv[1:]
+    db = SessionLocal()
+    try:
+        report = merge_duplicate_customers(db, dry_run=not apply)
+        for entry in report:
+            print(
+                f"{entry['name_key']}: keep #{entry['survivor_id']} "
+                f"merge {entry['merged_ids']} fill {entry['filled']}"
+            )
+        if apply:
+            db.commit()
+            print(f"Merged {len(report)} duplicate customer groups")
+        else:
+            db.rollback()
+            print(f"{len(report)} duplicate customer groups (dry run, use --apply)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Bulk-load a synthetic production-scale dataset for performance testing.
+
+Appends customers, orders (Thai neck names, size matrices, add-ons), order
+items, audit trails, notifications and album images using Core multi-row
+INSERTs (see benchmarks/dataset.py). The defaults produce about a million
+rows from 100k orders.
+
+Usage:
+    cd backend
+    python -m scripts.generate_data                        # 100k orders into DATABASE_URL
+    python -m scripts.generate_data --orders 10000 --seed 7
+    python -m scripts.generate_data --database-url sqlite:////tmp/scale.db --create-schema
+    python -m scripts.generate_data --database-url postgresql://user:pw@host/db
+
+This script uses the project's SQLAlchemy engine unless --database-url is
+given. Never point it at a production database: the rows are fake.
+"""
+
+import argparse
+import logging
+import time
+
+from sqlalchemy import create_engine
+
+from app.db.base import Base
+from app.db.session import configure_sqlite_engine, engine as default_engine
+from benchmarks.dataset import seed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic B-Look data")
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--customers", type=int, help="default: orders / 5")
+    parser.add_argument("--items-per-order", type=int, default=2)
+    parser.add_argument("--audits-per-order", type=int, default=4)
+    parser.add_argument("--notifications", type=int, help="default: one per order")
+    parser.add_argument("--albums-per-order", type=float, default=0.5)
+    parser.add_argument("--images-per-album", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", help="load into this database instead")
+    parser.add_argument(
+        "--create-schema", action="store_true", help="create missing tables first"
+    )
+    args = parser.parse_args(argv)
+    # every 5000-row batch would otherwise be reported as a slow query
+    logging.getLogger("app.db.slow_query").setLevel(logging.ERROR)
+
+    engine = default_engine
+    if args.database_url:
+        if args.database_url.startswith("sqlite"):
+            engine = create_engine(
+                args.database_url, connect_args={"check_same_thread": False}
+            )
+            configure_sqlite_engine(engine)
+        else:
+            engine = create_engine(args.database_url)
+    if args.create_schema:
+        Base.metadata.create_all(bind=engine)
+
+    start = time.perf_counter()
+
+    def progress(table, rows):
+        print(f"  {table:<16} {rows:>9,} rows  ({time.perf_counter() - start:6.1f}s)")
+
+    print(f"Loading into {engine.url.render_as_string(hide_password=True)}")
+    ds = seed(
+        engine,
+        customers=args.customers if args.customers is not None else max(1, args.orders // 5),
+        orders=args.orders,
+        items_per_order=args.items_per_order,
+        audits_per_order=args.audits_per_order,
+        notifications=args.notifications if args.notifications is not None else args.orders,
+        albums_per_order=args.albums_per_order,
+        images_per_album=args.images_per_album,
+        rng_seed=args.seed,
+        progress=progress,
+    )
+    elapsed = time.perf_counter() - start
+    total = sum(ds.row_counts.values())
+    print(f"Inserted {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
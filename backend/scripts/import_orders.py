@@ -0,0 +1,73 @@
+"""
+Bulk-import orders from a CSV or XLSX file (same pipeline as POST /orders/import).
+
+Every order in the file is validated; invalid orders are reported with their
+row numbers and skipped, valid ones are created in chunks. Order numbers that
+already exist are rejected, so a partially imported file can be re-run.
+
+Usage:
+    python backend/scripts/import_orders.py orders.xlsx --dry-run
+    python backend/scripts/import_orders.py orders.csv --user admin --report out.json
+    python backend/scripts/import_orders.py orders.csv --chunk-size 500
+
+This script uses the project's SQLAlchemy SessionLocal. Make sure your environment
+is configured with the correct DATABASE_URL.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from app.db.session import SessionLocal
+from app.core.order_import import CHUNK_ORDERS, ImportFormatError, import_orders, iter_rows
+from app.models.user import User
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import orders from CSV / XLSX")
+    parser.add_argument("path")
+    parser.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_ORDERS)
+    parser.add_argument("--user", help="username recorded as the orders' creator")
+    parser.add_argument("--report", help="write the full JSON report to this file")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user = None
+        if args.user:
+            user = db.query(User).filter(User.username == args.user).first()
+            if not user:
+                sys.exit(f"Unknown user: {args.user}")
+        with open(args.path, "rb") as f:
+            try:
+                report = import_orders(
+                    db,
+                    iter_rows(f, args.path),
+                    user_id=user.id if user else None,
+                    actor_role=user.role if user else None,
+                    dry_run=args.dry_run,
+                    chunk_size=args.chunk_size,
+                    source=os.path.basename(args.path),
+                )
+            except ImportFormatError as exc:
+                sys.exit(f"Cannot import {args.path}: {exc}")
+    finally:
+        db.close()
+
+    for err in report.errors:
+        column = f" [{err['column']}]" if err["column"] else ""
+        print(f"row {err['row']} ({err['order']}){column}: {err['message']}")
+    verb = "would create" if report.dry_run else "created"
+    print(
+        f"{report.rows} rows, {report.orders} orders: {verb} {report.created}, "
+        f"rejected {report.failed}, new customers {report.new_customers}"
+    )
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as out:
+            json.dump(report.as_dict(), out, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
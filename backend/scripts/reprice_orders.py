@@ -0,0 +1,71 @@
+"""
+Re-price open (not CANCELLED / COMPLETED) orders against the current necks and
+pricing rules, e.g. after a price change. Reports every order whose totals
+would change; nothing is written without --apply.
+
+Usage:
+    python backend/scripts/reprice_orders.py
+    python backend/scripts/reprice_orders.py --report diffs.json
+    python backend/scripts/reprice_orders.py --apply --user admin
+    python backend/scripts/reprice_orders.py --order 12 --order 15 --apply
+
+This script uses the project's SQLAlchemy engine. Make sure your environment
+is configured with the correct DATABASE_URL.
+"""
+
+import argparse
+import json
+import sys
+
+from app.db.session import SessionLocal, engine
+from app.core.order_repricing import CHUNK_ORDERS, reprice_open_orders
+from app.models.user import User
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-price open orders")
+    parser.add_argument("--apply", action="store_true", help="write the new prices")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_ORDERS)
+    parser.add_argument(
+        "--order", type=int, action="append", help="only this order id (repeatable)"
+    )
+    parser.add_argument("--user", help="username recorded in the audit log")
+    parser.add_argument("--report", help="write the full JSON report to this file")
+    args = parser.parse_args()
+
+    user = None
+    if args.user:
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.username == args.user).first()
+        finally:
+            db.close()
+        if not user:
+            sys.exit(f"Unknown user: {args.user}")
+
+    report = reprice_open_orders(
+        engine,
+        apply=args.apply,
+        chunk_size=args.chunk_size,
+        order_ids=args.order,
+        user_id=user.id if user else None,
+        actor_role=user.role if user else None,
+    )
+
+    for diff in report.diffs:
+        moves = ", ".join(
+            f"{k} {v['from']} -> {v['to']}" for k, v in diff["changes"].items()
+        )
+        print(f"{diff['order_no'] or diff['order_id']}: {moves or 'items only'}")
+    verb = "would change" if report.dry_run else "changed"
+    print(
+        f"{report.scanned} open orders: {verb} {report.changed}, "
+        f"grand total {report.grand_total_delta:+}"
+    )
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as out:
+            json.dump(report.as_dict(), out, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
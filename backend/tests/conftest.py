@@ -5,6 +5,9 @@ Uses an in-memory SQLite database (StaticPool) so tests are fully isolated
 from the dev/production database.
 """
 
+import os
+import tempfile
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -29,9 +32,25 @@ engine_test = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine_test)
 
+# The app's own engine (create_all at import, scheduler, health checks) gets a
+# throwaway file instead of the developer's blook_dev.db
+os.environ.setdefault(
+    "DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="blook-test-"), "app.db")
+)
+
 # Import app modules AFTER engine is defined to ensure they can be patched
+from app.core.config import settings  # noqa: E402
+
+# Routes that exceed their @query_budget fail the test instead of logging
+settings.QUERY_BUDGET_MODE = "raise"
+# The background audit writer would share the single StaticPool connection
+# with request threads; async audit events fall back to the request session.
+settings.AUDIT_ASYNC_ENABLED = False
+# /metrics is off by default; the instrumentation tests scrape it
+settings.METRICS_ENABLED = True
+
 from app.db.base import Base  # noqa: E402  (registers all ORM models)
-from app.db.session import get_db  # noqa: E402
+from app.db.session import get_db, get_read_db  # noqa: E402
 from app.main import app  # noqa: E402
 
 # Create all tables in the test DB
@@ -48,6 +67,7 @@ def override_get_db():
 
 # Wire the test DB into the FastAPI app for the entire test session
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 
 # ── Session-scoped fixtures ───────────────────────────────────────────────────
@@ -59,6 +79,15 @@ def client():
         yield c
 
 
+@pytest.fixture(scope="session", autouse=True)
+def upload_dir(tmp_path_factory):
+    """Keep uploads made by tests out of the source tree's static/ folder."""
+    original = settings.STATIC_DIR
+    settings.STATIC_DIR = str(tmp_path_factory.mktemp("static"))
+    yield settings.STATIC_DIR
+    settings.STATIC_DIR = original
+
+
 @pytest.fixture(scope="session", autouse=True)
 def seeded_db():
     """Populate the test DB with the data needed by all tests."""
@@ -127,3 +156,13 @@ def admin_token(seeded_db):
 @pytest.fixture(scope="session")
 def admin_headers(admin_token):
     return {"Authorization": f"Bearer {admin_token}"}
+
+
+@pytest.fixture
+def query_budget():
+    """``with query_budget(n): client.get(...)`` fails if the block runs > n statements."""
+    from functools import partial
+
+    from app.core.query_budget import assert_max_queries
+
+    return partial(assert_max_queries, engine=engine_test)
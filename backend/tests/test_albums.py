@@ -129,3 +129,38 @@ def test_album_rbac_restrictions(client, admin_b_headers, sales_admin_headers, s
     album_data = {"name": "Forbidden Album"}
     res = client.post(f"/api/v1/orders/{order_id}/albums", json=album_data, headers=sales_admin_headers)
     assert res.status_code == 403
+
+def test_album_writes_commit_once_with_their_audit(client, admin_b_headers, seeded_db):
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+    from tests.conftest import TestingSessionLocal
+    from app.models.audit_log import AuditLog
+
+    res = client.post("/api/v1/orders", json={"customer_name": "Commit Customer", "items": []}, headers=admin_b_headers)
+    order_id = res.json()["id"]
+
+    commits = []
+    listener = lambda session: commits.append(session)
+    event.listen(Session, "after_commit", listener)
+    try:
+        res = client.post(f"/api/v1/orders/{order_id}/albums", json={"name": "One Commit"}, headers=admin_b_headers)
+        assert res.status_code == 201
+        album_id = res.json()["id"]
+        assert len(commits) == 1
+
+        res = client.delete(f"/api/v1/orders/{order_id}/albums/{album_id}", headers=admin_b_headers)
+        assert res.status_code == 204
+        assert len(commits) == 2
+    finally:
+        event.remove(Session, "after_commit", listener)
+
+    db = TestingSessionLocal()
+    try:
+        actions = {
+            a for (a,) in db.query(AuditLog.action).filter(
+                AuditLog.order_id == order_id, AuditLog.target_id == str(album_id)
+            )
+        }
+    finally:
+        db.close()
+    assert actions == {"CREATE_ALBUM", "DELETE_ALBUM"}
@@ -0,0 +1,255 @@
+"""
+Tests for the audit pipeline (app/core/audit.py):
+  - transactional events ride on the caller's session
+  - async events are spilled, buffered and inserted in one batch per flush,
+    only once the caller's session commits (a rollback drops them)
+  - spill segments left by a crash are replayed on start, those of live
+    workers sharing the directory are left alone
+  - a failed flush keeps its events for the next attempt
+  - structured columns parsed from JSON / key=value / free-text details
+"""
+
+import glob
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core import audit
+from app.core.audit import ASYNC, AuditWriter, record_audit
+from app.core.query_budget import count_queries
+from app.db.base import Base
+from app.models.audit_log import AuditLog, structure_details
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture()
+def file_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(engine)
+    yield engine, sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _count(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(AuditLog.__table__)).scalar()
+
+
+def test_transactional_event_commits_with_session(file_db):
+    engine, Session = file_db
+    db = Session()
+    log = record_audit(db, "UPDATE_STATUS", "order", 42, details={"to": "SHIPPED"}, user_id=1)
+    assert log.order_id == 42
+    # the legacy column still carries the payload for older readers
+    assert json.loads(log.details) == log.payload == {"to": "SHIPPED"}
+    db.rollback()
+    assert _count(engine) == 0
+
+    record_audit(db, "UPDATE_STATUS", "order", 42, details={"to": "SHIPPED"})
+    db.commit()
+    db.close()
+    assert _count(engine) == 1
+
+
+def test_async_falls_back_to_session_when_writer_stopped(file_db):
+    engine, Session = file_db
+    db = Session()
+    assert record_audit(db, "GENERATE_PAYMENT_LINK", "order", 7, mode=ASYNC) is not None
+    db.commit()
+    db.close()
+    assert _count(engine) == 1
+
+
+def test_async_events_batch_and_clear_spill(file_db, tmp_path, monkeypatch):
+    engine, Session = file_db
+    writer = AuditWriter(spill_dir=str(tmp_path / "spill"), flush_interval=60)
+    monkeypatch.setattr(audit, "audit_writer", writer)
+    writer.start(engine)
+    try:
+        db = Session()
+        for i in range(25):
+            assert record_audit(db, "UPLOAD_ALBUM_IMAGE", "album_image", i, order_id=9, mode=ASYNC) is None
+        # nothing reaches the writer before the caller's transaction commits
+        assert glob.glob(str(tmp_path / "spill" / "*.jsonl")) == []
+        db.commit()
+        db.close()
+        assert _count(engine) == 0
+        assert len(glob.glob(str(tmp_path / "spill" / "*.jsonl"))) == 1
+
+        with count_queries(engine) as counter:
+            assert writer.flush() == 25
+        inserts = [s for s in counter.statements if s.startswith("INSERT")]
+        assert len(inserts) == 1
+        assert _count(engine) == 25
+        assert glob.glob(str(tmp_path / "spill" / "*.jsonl")) == []
+    finally:
+        writer.stop()
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(AuditLog.order_id, AuditLog.created_at)).all()
+    assert {r.order_id for r in rows} == {9}
+    assert all(r.created_at is not None for r in rows)
+
+
+def test_async_events_of_a_rolled_back_request_are_dropped(file_db, tmp_path, monkeypatch):
+    engine, Session = file_db
+    writer = AuditWriter(spill_dir=str(tmp_path / "spill"), flush_interval=60)
+    monkeypatch.setattr(audit, "audit_writer", writer)
+    writer.start(engine)
+    try:
+        db = Session()
+        db.connection()  # the request has done some work
+        record_audit(db, "DELETE_ALBUM", "order_album", 1, order_id=9, mode=ASYNC)
+        db.rollback()
+        db.commit()
+        db.close()
+        assert writer.flush() == 0
+    finally:
+        writer.stop()
+    assert _count(engine) == 0
+
+
+def test_spilled_events_replayed_after_crash(file_db, tmp_path):
+    engine, _ = file_db
+    spill = str(tmp_path / "spill")
+    crashed = AuditWriter(spill_dir=spill)
+    for i in range(3):
+        crashed.submit(
+            engine,
+            {
+                "action": "QUEUE_NOTIFY",
+                "target_type": "order",
+                "target_id": str(i),
+                "order_id": i,
+                "details": None,
+                "user_id": None,
+                "created_at": datetime.now(timezone.utc),
+            },
+        )
+    # simulate a crash: the process dies with a torn line at the end
+    with open(crashed._segment, "a") as f:
+        f.write('{"action": "TRUNC')
+    os.close(crashed._segment_fd)
+
+    restarted = AuditWriter(spill_dir=spill)
+    assert restarted.replay(engine) == 3
+    assert _count(engine) == 3
+    assert os.listdir(spill) == []
+
+
+def _segment_of(spill, pid, engine):
+    writer = AuditWriter(spill_dir=spill)
+    writer.submit(
+        engine,
+        {
+            "action": "QUEUE_NOTIFY",
+            "target_type": "order",
+            "target_id": str(pid),
+            "order_id": pid,
+            "details": None,
+            "user_id": None,
+            "created_at": datetime.now(timezone.utc),
+        },
+    )
+    os.close(writer._segment_fd)
+    path = writer._segment.replace(f"audit-p{os.getpid()}-", f"audit-p{pid}-")
+    os.rename(writer._segment, path)
+    return path
+
+
+def test_replay_keeps_segments_of_live_workers(file_db, tmp_path):
+    engine, _ = file_db
+    spill = str(tmp_path / "spill")
+    sibling = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    gone = subprocess.Popen([sys.executable, "-c", "pass"])
+    gone.wait()
+    try:
+        live = _segment_of(spill, sibling.pid, engine)
+        _segment_of(spill, gone.pid, engine)
+
+        assert AuditWriter(spill_dir=spill).replay(engine) == 1
+        assert _count(engine) == 1
+        assert os.listdir(spill) == [os.path.basename(live)]
+    finally:
+        sibling.kill()
+        sibling.wait()
+
+
+def test_failed_flush_is_retried(file_db, tmp_path, monkeypatch):
+    engine, _ = file_db
+    writer = AuditWriter(spill_dir=str(tmp_path / "spill"))
+    event = {
+        "action": "X",
+        "target_type": "order",
+        "target_id": "1",
+        "order_id": 1,
+        "details": None,
+        "user_id": None,
+        "created_at": datetime.now(timezone.utc),
+    }
+    writer.submit(engine, event)
+
+    real_begin = engine.begin
+    monkeypatch.setattr(engine, "begin", lambda: (_ for _ in ()).throw(RuntimeError("db down")))
+    assert writer.flush() == 0
+    assert len(os.listdir(tmp_path / "spill")) == 1
+
+    monkeypatch.setattr(engine, "begin", real_begin)
+    writer.submit(engine, dict(event, target_id="2", order_id=2))
+    assert writer.flush() == 2
+    assert _count(engine) == 2
+    assert os.listdir(tmp_path / "spill") == []
+
+
+def test_structure_details_formats():
+    cols, payload = structure_details('{"changed_from": "WAITING_BOOKING", "changed_to": "WAITING_DEPOSIT"}')
+    assert cols == {"from_status": "WAITING_BOOKING", "to_status": "WAITING_DEPOSIT"}
+    cols, payload = structure_details("installment=deposit filename=a_b.png size=2048")
+    assert cols == {}
+    assert payload == {"installment": "deposit", "filename": "a_b.png", "size": 2048}
+    cols, payload = structure_details({"changes": {"status": {"from": "A", "to": "B"}}, "amount": "99.50"})
+    assert cols == {"from_status": "A", "to_status": "B", "amount": Decimal("99.50")}
+    assert structure_details("checked by phone") == ({}, {"text": "checked by phone"})
+    assert structure_details(None) == ({}, None)
+
+
+def test_slip_approvals_per_admin_per_day(client, admin_headers):
+    resp = client.post(
+        "/api/v1/orders/", json={"customer_name": "Audit Slip", "items": []}, headers=admin_headers
+    )
+    oid = resp.json()["id"]
+    resp = client.patch(
+        f"/api/v1/orders/{oid}/approve-slip",
+        json={"installment": "booking", "approved": True},
+        headers=admin_headers,
+    )
+    assert resp.status_code == 200, resp.text
+
+    db = TestingSessionLocal()
+    try:
+        log = (
+            db.query(AuditLog)
+            .filter(AuditLog.order_id == oid, AuditLog.action == "APPROVE_SLIP")
+            .one()
+        )
+        assert (log.from_status, log.to_status) == ("WAITING_BOOKING", "WAITING_DEPOSIT")
+        assert log.actor_role == "ADMIN"
+        assert log.payload["installment"] == "booking"
+
+        day = func.date(AuditLog.created_at)
+        rows = (
+            db.query(AuditLog.user_id, day, func.count())
+            .filter(AuditLog.action == "APPROVE_SLIP")
+            .group_by(AuditLog.user_id, day)
+            .all()
+        )
+        assert any(user_id == log.user_id and n >= 1 for user_id, _, n in rows)
+    finally:
+        db.close()
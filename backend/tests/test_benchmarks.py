@@ -0,0 +1,32 @@
+from benchmarks.order_flows import compare, percentile, summarize
+
+
+def test_percentile_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 95) == 0.095
+    assert percentile(values, 99) == 0.099
+    assert percentile([], 95) == 0.0
+
+
+def test_summarize_reports_latency_and_throughput():
+    r = summarize([0.01, 0.02, 0.03, 0.04], errors=1, wall=0.5)
+    assert r["requests"] == 4
+    assert r["errors"] == 1
+    assert r["p50_ms"] == 20.0
+    assert r["rps"] == 8.0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    base = {
+        "read_order": {"p95_ms": 10.0, "rps": 100.0, "errors": 0},
+        "list_orders": {"p95_ms": 20.0, "rps": 50.0, "errors": 0},
+    }
+    current = {
+        "read_order": {"p95_ms": 11.0, "rps": 95.0, "errors": 0},
+        "list_orders": {"p95_ms": 30.0, "rps": 30.0, "errors": 2},
+        "new_scenario": {"p95_ms": 1.0, "rps": 1.0, "errors": 0},
+    }
+    regressions = compare(current, base, threshold=0.2)
+    assert all(r.startswith("list_orders") for r in regressions)
+    assert len(regressions) == 3
@@ -0,0 +1,284 @@
+"""
+Tests for customer identity handling:
+  - normalize_customer_name / normalize_phone key functions
+  - order create/update resolving spelling variants to one customer (upsert)
+  - merge_duplicate_customers relinking orders to the survivor
+  - autocomplete: ranking, tracking writes, refreshing a stale index off the
+    request path, and matching % and _ literally on Postgres
+"""
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql
+
+from app.core.config import settings
+
+from app.core.customers import (
+    normalize_customer_name,
+    normalize_phone,
+    merge_duplicate_customers,
+)
+from app.models.customer import Customer
+from app.models.order import Order
+from tests.conftest import TestingSessionLocal, engine_test
+
+
+@pytest.mark.parametrize(
+    "a,b",
+    [
+        ("ABC Co., Ltd.", "abc co ltd"),
+        ("  บริษัท  น้ำใจ ", "บริษัท นํ้าใจ"),
+        ("โรงเรียน​สวนกุหลาบ", "โรงเรียนสวนกุหลาบ"),
+        ("บริษัท ABC จำกัด", "บริษัท abc จํากัด"),
+    ],
+)
+def test_name_variants_share_key(a, b):
+    assert normalize_customer_name(a) == normalize_customer_name(b)
+
+
+def test_blank_name_has_no_key():
+    assert normalize_customer_name("   ") is None
+    assert normalize_customer_name(None) is None
+
+
+def test_punctuation_only_name_reuses_customer(client, admin_headers):
+    assert normalize_customer_name(" -- ") == normalize_customer_name("--") == "--"
+    ids = set()
+    for _ in range(2):
+        resp = client.post(
+            "/api/v1/orders/", json={"customer_name": "--", "items": []}, headers=admin_headers
+        )
+        assert resp.status_code == 201, resp.text
+        ids.add(resp.json()["customer_id"])
+    assert len(ids) == 1 and None not in ids
+
+
+def test_normalize_phone():
+    assert normalize_phone("081-234-5678") == "0812345678"
+    assert normalize_phone("+66 81 234 5678") == "0812345678"
+    assert normalize_phone("") is None
+
+
+def test_model_maintains_keys():
+    c = Customer(name="Key Sync Shop", phone="+66 81 000 0000")
+    assert c.name_key == "keysyncshop"
+    assert c.phone_key == "0810000000"
+
+
+def test_order_spelling_variants_reuse_customer(client, admin_headers):
+    first = client.post(
+        "/api/v1/orders/",
+        json={"customer_name": "Upsert Sport Club", "phone": "0811111111", "items": []},
+        headers=admin_headers,
+    )
+    second = client.post(
+        "/api/v1/orders/",
+        json={"customer_name": "upsert  sport club.", "phone": "0822222222", "items": []},
+        headers=admin_headers,
+    )
+    assert first.status_code == 201 and second.status_code == 201
+
+    db = TestingSessionLocal()
+    try:
+        o1 = db.get(Order, first.json()["id"])
+        o2 = db.get(Order, second.json()["id"])
+        assert o1.customer_id == o2.customer_id
+        cust = db.get(Customer, o1.customer_id)
+        # display name is kept from the first order, contact refreshed by the second
+        assert cust.name == "Upsert Sport Club"
+        assert cust.phone == "0822222222"
+    finally:
+        db.close()
+
+
+def test_create_customer_duplicate_name_conflicts(client, admin_headers):
+    payload = {"name": "Conflict Customer"}
+    ok = client.post("/api/v1/customers/", json=payload, headers=admin_headers)
+    dup = client.post(
+        "/api/v1/customers/", json={"name": "conflict  customer"}, headers=admin_headers
+    )
+    assert ok.status_code == 200
+    assert dup.status_code == 409
+
+
+def test_merge_duplicate_customers_relinks_orders():
+    db = TestingSessionLocal()
+    try:
+        keep = Customer(name="Merge Target")
+        dupe = Customer(name="Merge Target Copy", phone="0833333333")
+        db.add_all([keep, dupe])
+        db.flush()
+        order = Order(order_no="MERGE-TEST-1", customer_id=dupe.id)
+        db.add(order)
+        db.flush()
+        # simulate a legacy row that slipped in before the unique key existed
+        dupe.name = "merge target"
+        dupe.name_key = None
+        db.flush()
+
+        report = merge_duplicate_customers(db)
+        entry = next(r for r in report if r["survivor_id"] == keep.id)
+        assert entry["merged_ids"] == [dupe.id]
+        assert entry["filled"] == ["phone"]
+
+        db.expire_all()
+        assert db.get(Customer, dupe.id) is None
+        assert db.get(Order, order.id).customer_id == keep.id
+        assert db.get(Customer, keep.id).phone == "0833333333"
+    finally:
+        db.rollback()
+        db.close()
+
+
+# ── Autocomplete search ──────────────────────────────────────────────────────
+
+
+def test_search_index_ranking():
+    from app.core.customer_search import CustomerSearchIndex
+
+    idx = CustomerSearchIndex()
+    idx._built_at = 0  # mark as built without a database
+    idx.upsert(1, "Sunrise Football Club", "0812223333", "C-100")
+    idx.upsert(2, "Sun Shop", None, None)
+    idx.upsert(3, "โรงเรียนอนุบาลสุพรรณ", "021234567", None)
+
+    assert idx.search("sun")[:2] == [2, 1]  # both prefix matches, shorter name first
+    assert idx.search("football") == [1]  # substring
+    assert idx.search("sunrise fotball") == [1]  # trigram overlap tolerates a typo
+    assert idx.search("0812") == [1]  # phone prefix
+    assert idx.search("c100") == [1]  # customer code
+    assert idx.search("อนุบาล") == [3]
+
+    idx.remove(1)
+    assert idx.search("football") == []
+
+
+def test_search_endpoint_tracks_writes(client, admin_headers):
+    created = client.post(
+        "/api/v1/customers/",
+        json={"name": "Searchable Volleyball Team", "phone": "0891112222"},
+        headers=admin_headers,
+    )
+    assert created.status_code == 200
+    cid = created.json()["id"]
+
+    resp = client.get("/api/v1/customers/search", params={"q": "volleyball"})
+    assert resp.status_code == 200
+    assert [c["id"] for c in resp.json()] == [cid]
+
+    by_phone = client.get("/api/v1/customers/search", params={"q": "089-111"})
+    assert cid in [c["id"] for c in by_phone.json()]
+
+    # renames are reflected without a rebuild
+    client.put(
+        f"/api/v1/customers/{cid}",
+        json={"name": "Searchable Badminton Team", "phone": "0891112222"},
+        headers=admin_headers,
+    )
+    assert client.get("/api/v1/customers/search", params={"q": "volleyball"}).json() == []
+    renamed = client.get("/api/v1/customers/search", params={"q": "badminton"}).json()
+    assert [c["id"] for c in renamed] == [cid]
+
+    # customers created through the order upsert path are searchable too
+    client.post(
+        "/api/v1/orders/",
+        json={"customer_name": "Searchable Order Customer", "items": []},
+        headers=admin_headers,
+    )
+    names = [
+        c["name"]
+        for c in client.get(
+            "/api/v1/customers/search", params={"q": "searchable order"}
+        ).json()
+    ]
+    assert names[0] == "Searchable Order Customer"
+
+
+def test_stale_index_refreshes_in_background(monkeypatch):
+    from app.core.customer_search import CustomerSearchIndex
+
+    idx = CustomerSearchIndex()
+    db = TestingSessionLocal()
+    try:
+        idx.rebuild(db)
+        # Core insert: bypasses the session hooks, like a write by another worker
+        db.execute(insert(Customer).values(name="Refreshed Elsewhere", name_key="refreshed elsewhere"))
+        db.commit()
+        assert idx.search("refreshed elsewhere") == []
+
+        monkeypatch.setattr(settings, "CUSTOMER_SEARCH_INDEX_TTL", 1)
+        idx._built_at -= 5
+        assert idx.is_stale() and not idx.needs_build()
+        thread = idx.refresh_in_background(engine_test)
+        assert thread is not None
+        thread.join(5)
+        assert len(idx.search("refreshed elsewhere")) == 1
+        assert not idx.is_stale()
+    finally:
+        db.close()
+
+
+def test_pg_trgm_query_matches_wildcards_literally():
+    from app.core.customer_search import _pg_trgm_query
+
+    compiled = _pg_trgm_query("50%_off", 10).compile(dialect=postgresql.dialect())
+    patterns = [v for v in compiled.params.values() if isinstance(v, str)]
+    assert "%50\\%\\_off%" in patterns  # contains
+    assert "50\\%\\_off%" in patterns  # prefix
+    assert str(compiled).count("ESCAPE") >= 3
+
+
+# ── Summary ──────────────────────────────────────────────────────────────────
+
+
+def test_customer_summary_aggregates_orders(client, admin_headers):
+    def _order(product_type, qty):
+        resp = client.post(
+            "/api/v1/orders/",
+            json={
+                "customer_name": "Summary Customer",
+                "product_type": product_type,
+                "deposit_1": 100,
+                "items": [
+                    {
+                        "product_name": "Shirt",
+                        "neck_type": "คอกลม",
+                        "quantity_matrix": {"M": qty},
+                    }
+                ],
+            },
+            headers=admin_headers,
+        )
+        assert resp.status_code == 201, resp.text
+        return resp.json()
+
+    a = _order("shirt", 10)
+    b = _order("shirt", 20)
+    c = _order("sportsPants", 10)
+    client.patch(
+        f"/api/v1/orders/{c['id']}/status",
+        json={"status": "CANCELLED"},
+        headers=admin_headers,
+    )
+
+    db = TestingSessionLocal()
+    try:
+        cid = db.get(Order, a["id"]).customer_id
+    finally:
+        db.close()
+
+    resp = client.get(f"/api/v1/customers/{cid}/summary", headers=admin_headers)
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert body["order_count"] == 3
+    assert body["cancelled_count"] == 1
+    expected_value = float(a["grand_total"]) + float(b["grand_total"])
+    assert float(body["lifetime_value"]) == pytest.approx(expected_value)
+    assert float(body["outstanding_balance"]) == pytest.approx(expected_value - 200)
+    assert body["top_product_types"][0] == {"product_type": "shirt", "order_count": 2}
+    assert body["last_order_at"] is not None
+
+
+def test_customer_summary_missing_customer(client, admin_headers):
+    resp = client.get("/api/v1/customers/999999/summary", headers=admin_headers)
+    assert resp.status_code == 404
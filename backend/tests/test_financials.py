@@ -0,0 +1,107 @@
+"""
+Tests for order money columns and re-pricing:
+  - order_financials: VAT included / excluded, manual add-on guard, balance
+  - reprice_open_orders: dry run reports diffs only, apply matches a fresh
+    order priced on the new neck cost, settled orders are left alone
+"""
+
+from decimal import Decimal
+
+from app.core.financials import order_financials
+from app.core.order_repricing import reprice_open_orders
+from app.models.order import Order
+from app.models.product import NeckType
+from tests.conftest import TestingSessionLocal, engine_test
+
+
+def _line(total, cost=0, addons=0):
+    return {"line_total": Decimal(total), "line_cost": Decimal(cost), "addon_total": Decimal(addons)}
+
+
+def test_order_financials():
+    lines = [_line("1000", "600", "100"), _line("500", "200")]
+    excl = order_financials(
+        lines, shipping_cost=60, add_on_cost=50, discount_amount=10, deposit_1=500
+    )
+    assert excl.items_total == Decimal("1500")
+    assert excl.total_cost == Decimal("800")
+    assert excl.vat_amount == Decimal("112.00")  # 7% of 1600
+    assert excl.grand_total == Decimal("1712.00")
+    assert excl.balance_amount == Decimal("1212.00")
+
+    incl = order_financials(lines, shipping_cost=60, is_vat_included=True, deposit_2=60)
+    assert incl.grand_total == Decimal("1560.00")
+    assert incl.vat_amount == Decimal("102.06")  # 7/107 of 1560
+    assert incl.balance_amount == Decimal("1500.00")
+
+    # manual add-on equal to the items' add-ons is the same charge entered twice
+    guarded = order_financials(lines, add_on_cost="100.00")
+    assert guarded.add_on_cost == 0
+    assert guarded.grand_total == Decimal("1605.00")
+    assert set(guarded.columns()) == {
+        "total_cost", "add_on_options_total", "add_on_cost", "shipping_cost",
+        "discount_amount", "vat_amount", "grand_total", "balance_amount",
+    }
+
+
+def _set_neck_cost(name, cost):
+    db = TestingSessionLocal()
+    try:
+        db.query(NeckType).filter(NeckType.name == name).one().additional_cost = cost
+        db.commit()
+    finally:
+        db.close()
+
+
+def _db_order(order_id):
+    db = TestingSessionLocal()
+    try:
+        return db.get(Order, order_id)
+    finally:
+        db.close()
+
+
+def test_reprice_open_orders(client, admin_headers):
+    client.post(
+        "/api/v1/products/necks",
+        json={"name": "คอปกทดสอบราคาใหม่", "additional_cost": 40, "force_slope": True},
+        headers=admin_headers,
+    )
+    payload = {
+        "customer_name": "Reprice Job",
+        "deposit_1": 100,
+        "items": [{"product_name": "เสื้อ", "neck_type": "คอปกทดสอบราคาใหม่", "quantity_matrix": {"M": 20}}],
+    }
+    open_order = client.post("/api/v1/orders/", json=payload, headers=admin_headers).json()
+    done = client.post("/api/v1/orders/", json=payload, headers=admin_headers).json()
+    db = TestingSessionLocal()
+    try:
+        db.get(Order, done["id"]).status = "COMPLETED"
+        db.commit()
+    finally:
+        db.close()
+    ids = [open_order["id"], done["id"]]
+    before = _db_order(open_order["id"]).grand_total
+
+    assert reprice_open_orders(engine_test, order_ids=ids).changed == 0
+
+    _set_neck_cost("คอปกทดสอบราคาใหม่", 60)
+    fresh = client.post("/api/v1/orders/", json=payload, headers=admin_headers).json()
+    new_total = Decimal(str(fresh["grand_total"])).quantize(Decimal("0.01"))
+
+    dry = reprice_open_orders(engine_test, order_ids=ids)
+    assert (dry.scanned, dry.changed, dry.applied) == (1, 1, 0)
+    diff = dry.diffs[0]
+    assert diff["order_id"] == open_order["id"] and diff["items_changed"] == 1
+    assert diff["changes"]["grand_total"] == {"from": str(before), "to": str(new_total)}
+    assert _db_order(open_order["id"]).grand_total == before
+
+    done_report = reprice_open_orders(engine_test, apply=True, chunk_size=1, order_ids=ids)
+    assert done_report.applied == 1
+    assert done_report.grand_total_delta == new_total - before
+    repriced = _db_order(open_order["id"])
+    assert repriced.grand_total == new_total
+    assert repriced.balance_amount == repriced.grand_total - 100
+    assert _db_order(done["id"]).grand_total == before
+
+    assert reprice_open_orders(engine_test, order_ids=ids).changed == 0
@@ -0,0 +1,115 @@
+"""
+Tests for the instrumentation surface:
+  - GET /metrics renders Prometheus text with query and per-route metrics,
+    and requires the bearer token when METRICS_TOKEN is set
+  - slow-query logging never includes bound parameter values
+  - the timed pool records checkout waits and pool gauges
+"""
+
+import logging
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+from app.core.metrics import Registry
+from app.db.instrumentation import (
+    POOL_WAIT_SECONDS,
+    redact_parameters,
+    register_pool,
+    timed_pool_class,
+)
+from tests.conftest import TestingSessionLocal
+
+
+def test_metrics_endpoint_reports_route_queries(client, admin_headers):
+    assert client.get("/api/v1/orders/", headers=admin_headers).status_code == 200
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    body = resp.text
+    assert "# TYPE db_query_duration_seconds histogram" in body
+    assert 'db_query_duration_seconds_count{operation="SELECT"}' in body
+    assert 'http_request_db_queries_count{method="GET",route="/api/v1/orders/"}' in body
+
+
+def test_metrics_endpoint_requires_configured_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    wrong = {"Authorization": "Bearer nope"}
+    assert client.get("/metrics", headers=wrong).status_code == 401
+    ok = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert ok.status_code == 200
+    assert "http_request_duration_seconds" in ok.text
+
+
+def test_histogram_rendering():
+    reg = Registry()
+    h = reg.histogram("demo_seconds", "Demo.", ["route"], buckets=(0.1, 1.0))
+    h.observe(0.05, route="/a")
+    h.observe(0.5, route="/a")
+    out = reg.render()
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in out
+    assert 'demo_seconds_bucket{route="/a",le="1"} 2' in out
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 2' in out
+    assert 'demo_seconds_count{route="/a"} 2' in out
+
+
+def test_redact_parameters():
+    assert redact_parameters({"name": "สมชาย", "phone": "0812345678"}) == "{name=?, phone=?}"
+    assert redact_parameters(("secret", 1)) == "(?, ?)"
+    assert redact_parameters([("a",), ("b",)], executemany=True) == "<2 parameter sets>"
+
+
+def test_slow_query_log_is_redacted(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0.000001)
+    db = TestingSessionLocal()
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.db.slow_query"):
+            db.execute(text("SELECT :v AS v"), {"v": "0899999999"}).scalar()
+    finally:
+        db.close()
+    messages = [r.getMessage() for r in caplog.records]
+    assert any("Slow query" in m and "params=(?)" in m for m in messages)
+    assert not any("0899999999" in m for m in messages)
+
+
+def test_timed_pool_records_checkout(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=timed_pool_class("test_pool")
+    )
+    try:
+        before = POOL_WAIT_SECONDS.count(pool="test_pool")
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        assert POOL_WAIT_SECONDS.count(pool="test_pool") == before + 1
+
+        register_pool("test_pool", engine)
+        from app.core.metrics import registry
+
+        assert 'db_pool_size{pool="test_pool"}' in registry.render()
+    finally:
+        engine.dispose()
+
+
+def test_server_timing_and_route_latency(client, admin_headers):
+    resp = client.get("/api/v1/orders/", headers=admin_headers)
+    assert resp.status_code == 200
+    timing = resp.headers["server-timing"]
+    names = [part.strip().split(";")[0] for part in timing.split(",")]
+    assert names[0] == "db" and names[-2:] == ["app", "total"]
+    assert "auth" in names and "serialize" in names
+
+    body = client.get("/metrics").text
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/api/v1/orders/",status="200"}'
+    ) in body
+    assert 'http_response_size_bytes_count{method="GET",route="/api/v1/orders/"}' in body
+    assert "http_requests_in_flight 0" in body
+
+
+def test_route_template_keeps_path_parameters(client, admin_headers):
+    client.get("/api/v1/orders/999999", headers=admin_headers)
+    body = client.get("/metrics").text
+    assert 'route="/api/v1/orders/{order_id}",status="404"' in body
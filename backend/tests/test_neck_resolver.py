@@ -0,0 +1,81 @@
+"""
+Tests for the neck-name resolver (app/core/neck_resolver.py):
+  - the index agrees with the linear-scan matching it replaced
+  - adding a neck is picked up on the next lookup
+  - order pricing uses the same tolerant matching as POST /pricing/calc
+"""
+
+import random
+
+from app.core.neck_resolver import NeckIndex, NeckInfo, neck_index, normalize_neck_name
+from app.models.product import NeckType
+from tests.conftest import TestingSessionLocal
+
+NAMES = [
+    "คอกลม",
+    "คอวี",
+    "คอวีชน",
+    "คอวีชน มีลิ้น",
+    "คอปกเชิ้ต",
+    "คอปกคางหมู(บังคับไหล่สโลป+40 บาท/ตัว)",
+    "คอปก",
+    "ปก",
+    "คอนํ้าเงิน",
+]
+
+
+def _linear(necks, raw):
+    """The matching calculate_price did per item before the index."""
+    need = normalize_neck_name(raw)
+    cands = [(n, normalize_neck_name(n.name)) for n in necks if normalize_neck_name(n.name)]
+    for n, norm in cands:
+        if norm == need:
+            return n
+    for test in (lambda norm: norm in need, lambda norm: need in norm):
+        matches = [(n, norm) for n, norm in cands if test(norm)]
+        if matches:
+            return max(matches, key=lambda x: len(x[1]))[0]
+    return None
+
+
+def test_index_matches_linear_scan():
+    necks = [NeckInfo(i, name, None, False) for i, name in enumerate(NAMES, start=1)]
+    index = NeckIndex(necks)
+    rng = random.Random(45)
+    pieces = NAMES + ["มีลิ้น", " ", "(พิเศษ)", "ตัด", "ไขว้", "x"]
+    queries = ["คอปกคางหมู มีลิ้น", "คอน้ำเงิน", "วีช", "ปกเชิ้ตแขนยาว", "zzz"]
+    queries += ["".join(rng.choice(pieces) for _ in range(rng.randint(1, 3))) for _ in range(300)]
+    for q in queries:
+        if not normalize_neck_name(q):
+            continue
+        assert index.resolve(q) == _linear(necks, q), q
+    assert index.resolve("") is None
+    assert index.resolve("คอน้ำเงิน").name == "คอนํ้าเงิน"
+
+
+def test_new_neck_is_resolved_after_commit():
+    db = TestingSessionLocal()
+    try:
+        assert neck_index(db).resolve("คอทดสอบดัชนี") is None
+        db.add(NeckType(name="คอทดสอบดัชนี", force_slope=True, additional_cost=55))
+        db.commit()
+        found = neck_index(db).resolve("คอทดสอบดัชนี (ใหม่)")
+        assert (found.name, found.force_slope, found.additional_cost) == ("คอทดสอบดัชนี", True, 55)
+    finally:
+        db.close()
+
+
+def test_order_pricing_uses_tolerant_match(client, admin_headers):
+    # not an exact NeckType name, but contains "คอปกคางหมู" (forced slope)
+    item = {"product_name": "เสื้อ", "neck_type": "คอปกคางหมู ตัดต่อ", "quantity_matrix": {"M": 10}}
+    resp = client.post(
+        "/api/v1/orders/",
+        json={"customer_name": "Neck Resolver", "items": [item]},
+        headers=admin_headers,
+    )
+    assert resp.status_code == 201, resp.text
+    order_item = resp.json()["items"][0]
+    assert "slopeShoulder" in order_item["selected_add_ons"]
+
+    calc = client.post("/api/v1/pricing/calc", json={"items": [item]}).json()
+    assert float(order_item["total_price"]) == calc["total_price"]
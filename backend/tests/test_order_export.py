@@ -0,0 +1,124 @@
+"""
+Tests for the streaming order export (GET /orders/export):
+  - CSV: one row per item, size matrix spread over size columns
+  - XLSX: a valid workbook with the same rows
+  - masked roles get no price / customer columns
+  - the streaming writers chunk their output
+"""
+
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+from app.core.order_export import CHUNK_ROWS, csv_chunks, xlsx_chunks
+from app.core.security import create_access_token, get_password_hash
+from app.models.order import Order, OrderItem
+from app.models.user import User
+from tests.conftest import TestingSessionLocal
+
+_NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def _seed_order(order_no):
+    db = TestingSessionLocal()
+    try:
+        order = Order(
+            order_no=order_no,
+            customer_name="ทีมส่งออก",
+            grand_total=1284,
+            items=[
+                OrderItem(
+                    product_name="เสื้อทีม",
+                    neck_type="คอกลม",
+                    quantity_matrix='{"S": 10, "XL": 5, "7XL": 1}',
+                    total_qty=16,
+                    price_per_unit=80,
+                ),
+                OrderItem(product_name="เสื้อโปโล", quantity_matrix='{"M": 12}', total_qty=12),
+            ],
+        )
+        db.add(order)
+        db.commit()
+        return order.id
+    finally:
+        db.close()
+
+
+def _csv(client, headers, **params):
+    resp = client.get("/api/v1/orders/export", params=params, headers=headers)
+    assert resp.status_code == 200, resp.text
+    text = resp.content.decode("utf-8-sig")
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def test_csv_export_flattens_items_and_sizes(client, admin_headers):
+    _seed_order("EXP-CSV-1")
+    rows = [r for r in _csv(client, admin_headers) if r["order_no"] == "EXP-CSV-1"]
+    assert [r["product_name"] for r in rows] == ["เสื้อทีม", "เสื้อโปโล"]
+    first = rows[0]
+    assert (first["size_S"], first["size_XL"], first["size_M"]) == ("10", "5", "")
+    assert first["other_sizes"] == '{"7XL": 1}'
+    assert first["grand_total"] == "1284.00"
+    assert first["customer_name"] == "ทีมส่งออก"
+
+
+def test_xlsx_export_is_a_workbook(client, admin_headers):
+    _seed_order("EXP-XLSX-1")
+    resp = client.get("/api/v1/orders/export", params={"format": "xlsx"}, headers=admin_headers)
+    assert resp.status_code == 200, resp.text
+    assert "attachment" in resp.headers["content-disposition"]
+
+    with zipfile.ZipFile(io.BytesIO(resp.content)) as zf:
+        assert "xl/workbook.xml" in zf.namelist()
+        sheet = ElementTree.fromstring(zf.read("xl/worksheets/sheet1.xml"))
+    rows = [
+        [c.findtext(".//x:t", namespaces=_NS) or c.findtext("x:v", namespaces=_NS) for c in row]
+        for row in sheet.iterfind(".//x:row", _NS)
+    ]
+    assert rows[0][0] == "order_no"
+    assert sum(1 for r in rows if r[0] == "EXP-XLSX-1") == 2
+
+
+def test_masked_role_export_hides_finance_and_customer(client, admin_headers):
+    _seed_order("EXP-MASK-1")
+    db = TestingSessionLocal()
+    try:
+        user = db.query(User).filter(User.username == "export_production").first()
+        if not user:
+            user = User(
+                username="export_production",
+                password_hash=get_password_hash("password123"),
+                role="PRODUCTION",
+                is_active=True,
+            )
+            db.add(user)
+            db.commit()
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    finally:
+        db.close()
+
+    rows = _csv(client, headers)
+    assert rows
+    for hidden in ("order_no", "grand_total", "customer_name", "phone", "price_per_unit"):
+        assert hidden not in rows[0]
+    assert "product_name" in rows[0] and "neck_type" in rows[0]
+
+
+def test_export_rejects_inverted_range(client, admin_headers):
+    resp = client.get(
+        "/api/v1/orders/export",
+        params={"from": "2026-03-01", "to": "2026-02-01"},
+        headers=admin_headers,
+    )
+    assert resp.status_code == 400
+
+
+def test_writers_stream_in_chunks():
+    rows = [["order_no", "qty"]] + [[f"O-{i}", i] for i in range(CHUNK_ROWS * 3)]
+    assert len(list(csv_chunks(iter(rows)))) >= 3
+
+    chunks = list(xlsx_chunks(iter(rows)))
+    assert len(chunks) >= 3
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.testzip() is None
@@ -0,0 +1,177 @@
+"""
+Tests for the order audit timeline (GET /orders/{order_id}/logs):
+  - order_id filled from target_id on insert, user names joined
+  - newest-first pagination with the before cursor, live refresh with since
+  - album events listed on the owning order's timeline
+  - masked roles do not see masked fields or amounts; unknown orders 404
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from app.core.audit import record_audit
+from app.models.audit_log import AuditLog
+from tests.conftest import TestingSessionLocal
+
+
+def _create_order(client, headers):
+    resp = client.post(
+        "/api/v1/orders/", json={"customer_name": "Log Customer", "items": []}, headers=headers
+    )
+    assert resp.status_code == 201, resp.text
+    return resp.json()["id"]
+
+
+def _logs(client, headers, order_id, **params):
+    resp = client.get(f"/api/v1/orders/{order_id}/logs", params=params, headers=headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def test_status_change_appears_with_user_name(client, admin_headers):
+    oid = _create_order(client, admin_headers)
+    resp = client.patch(
+        f"/api/v1/orders/{oid}/status", json={"status": "WAITING_DEPOSIT"}, headers=admin_headers
+    )
+    assert resp.status_code == 200, resp.text
+
+    page = _logs(client, admin_headers, oid)
+    entry = next(e for e in page["items"] if e["action"] == "UPDATE_STATUS")
+    assert entry["user_name"] == "Test Admin"
+    assert page["next_before"] is None
+
+    db = TestingSessionLocal()
+    try:
+        log = db.get(AuditLog, entry["id"])
+        assert log.order_id == oid
+    finally:
+        db.close()
+
+
+def test_pagination_and_since_cursor(client, admin_headers):
+    oid = _create_order(client, admin_headers)
+    base = datetime(2026, 1, 1, 9, 0)
+    db = TestingSessionLocal()
+    try:
+        for i in range(5):
+            db.add(
+                AuditLog(
+                    action=f"STEP_{i}",
+                    target_type="order",
+                    target_id=str(oid),
+                    details=json.dumps({"step": i}),
+                    created_at=base + timedelta(minutes=i),
+                )
+            )
+        # another order's history must not leak in
+        db.add(AuditLog(action="OTHER", target_type="order", target_id=str(oid + 1000)))
+        db.commit()
+    finally:
+        db.close()
+
+    first = _logs(client, admin_headers, oid, limit=2)
+    assert [e["action"] for e in first["items"]] == ["STEP_4", "STEP_3"]
+    assert first["items"][0]["details"] == {"step": 4}
+    second = _logs(client, admin_headers, oid, limit=2, before=first["next_before"])
+    assert [e["action"] for e in second["items"]] == ["STEP_2", "STEP_1"]
+    third = _logs(client, admin_headers, oid, limit=2, before=second["next_before"])
+    assert [e["action"] for e in third["items"]] == ["STEP_0"]
+    assert third["next_before"] is None
+
+    newest = first["items"][0]["id"]
+    assert _logs(client, admin_headers, oid, since=newest)["items"] == []
+    db = TestingSessionLocal()
+    try:
+        db.add(
+            AuditLog(
+                action="STEP_5",
+                target_type="order",
+                target_id=str(oid),
+                details="plain text details",
+                created_at=base + timedelta(minutes=5),
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+    fresh = _logs(client, admin_headers, oid, since=newest)["items"]
+    assert [e["action"] for e in fresh] == ["STEP_5"]
+    assert fresh[0]["details"] == {"text": "plain text details"}
+
+
+def test_album_events_on_order_timeline(client, admin_headers):
+    oid = _create_order(client, admin_headers)
+    resp = client.post(
+        f"/api/v1/orders/{oid}/albums", json={"name": "แบบร่าง"}, headers=admin_headers
+    )
+    assert resp.status_code in (200, 201), resp.text
+
+    actions = [e["action"] for e in _logs(client, admin_headers, oid)["items"]]
+    assert "CREATE_ALBUM" in actions
+
+
+def test_logs_query_budget(client, admin_headers, query_budget):
+    oid = _create_order(client, admin_headers)
+    with query_budget(3):
+        _logs(client, admin_headers, oid)
+
+
+def _graphic_headers():
+    from app.core.security import create_access_token, get_password_hash
+    from app.models.user import User
+
+    db = TestingSessionLocal()
+    try:
+        user = db.query(User).filter(User.username == "logs_graphic").first()
+        if not user:
+            user = User(
+                username="logs_graphic",
+                password_hash=get_password_hash("pw"),
+                role="GRAPHIC",
+                is_active=True,
+            )
+            db.add(user)
+            db.commit()
+        return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+    finally:
+        db.close()
+
+
+def test_masked_role_logs_hide_masked_fields(client, admin_headers):
+    oid = _create_order(client, admin_headers)
+    db = TestingSessionLocal()
+    try:
+        record_audit(
+            db,
+            "UPDATE_ORDER",
+            "order",
+            oid,
+            details={
+                "changes": {
+                    "phone": {"from": "0811111111", "to": "0822222222"},
+                    "grand_total": {"from": "100", "to": "200"},
+                    "note": {"from": None, "to": "rush"},
+                }
+            },
+        )
+        record_audit(db, "PAYMENT", "order", oid, details={"amount": "500"})
+        db.commit()
+    finally:
+        db.close()
+
+    full = _logs(client, admin_headers, oid)["items"]
+    update = next(e for e in full if e["action"] == "UPDATE_ORDER")
+    assert set(update["details"]["changes"]) == {"phone", "grand_total", "note"}
+    assert any(e["amount"] for e in full)
+
+    masked = _logs(client, _graphic_headers(), oid)["items"]
+    update = next(e for e in masked if e["action"] == "UPDATE_ORDER")
+    assert update["details"]["changes"] == {"note": {"from": None, "to": "rush"}}
+    payment = next(e for e in masked if e["action"] == "PAYMENT")
+    assert payment["details"] == {} and payment["amount"] is None
+    assert all(e["amount"] is None for e in masked)
+
+
+def test_logs_of_unknown_order_404(client, admin_headers):
+    resp = client.get("/api/v1/orders/987654321/logs", headers=admin_headers)
+    assert resp.status_code == 404
@@ -0,0 +1,151 @@
+"""
+Tests for order-number allocation (app/core/order_numbers.py):
+  - formatted sequence numbers (PO-<year>-000001, ...)
+  - client-supplied numbers kept when free, suffixed when taken, never
+    onto a suffixed number that already exists
+  - a create that loses the race for a client number retries with a suffix
+  - suffix counters do not share keys with year counters; years are UTC
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+
+from app.core import order_numbers
+from app.core.order_numbers import next_order_no, next_value, allocate_order_no
+from app.models.order import Order
+from tests.conftest import TestingSessionLocal
+
+
+def test_next_order_no_is_formatted_and_monotonic():
+    db = TestingSessionLocal()
+    try:
+        now = datetime(2031, 5, 1)
+        first = next_order_no(db, prefix="TST", now=now)
+        second = next_order_no(db, prefix="TST", now=now)
+        db.rollback()
+    finally:
+        db.close()
+
+    assert re.fullmatch(r"TST-2031-\d{6}", first)
+    assert int(second.rsplit("-", 1)[1]) == int(first.rsplit("-", 1)[1]) + 1
+
+
+def test_sequence_restarts_per_year():
+    db = TestingSessionLocal()
+    try:
+        assert next_order_no(db, prefix="YR", now=datetime(2040, 1, 1)) == "YR-2040-000001"
+        assert next_order_no(db, prefix="YR", now=datetime(2041, 1, 1)) == "YR-2041-000001"
+        db.rollback()
+    finally:
+        db.close()
+
+
+def test_next_value_counts_per_key():
+    db = TestingSessionLocal()
+    try:
+        assert [next_value(db, "k-a") for _ in range(3)] == [1, 2, 3]
+        assert next_value(db, "k-b") == 1
+        db.rollback()
+    finally:
+        db.close()
+
+
+def test_allocate_keeps_free_client_number():
+    db = TestingSessionLocal()
+    try:
+        assert allocate_order_no(db, "  CUSTOM-FREE-1 ") == "CUSTOM-FREE-1"
+        assert allocate_order_no(db, None).startswith("PO-")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def test_create_order_suffixes_taken_client_number(client, admin_headers):
+    payload = {
+        "order_no": "DUP-ORDER-NO",
+        "customer_name": "Order Number Customer",
+        "items": [],
+    }
+    first = client.post("/api/v1/orders/", json=payload, headers=admin_headers)
+    second = client.post("/api/v1/orders/", json=payload, headers=admin_headers)
+    third = client.post("/api/v1/orders/", json=payload, headers=admin_headers)
+    assert first.status_code == 201, first.text
+    assert first.json()["order_no"] == "DUP-ORDER-NO"
+    assert second.json()["order_no"] == "DUP-ORDER-NO-1"
+    assert third.json()["order_no"] == "DUP-ORDER-NO-2"
+
+
+def test_create_order_without_number_uses_sequence(client, admin_headers):
+    resp = client.post(
+        "/api/v1/orders/",
+        json={"customer_name": "Sequence Customer", "items": []},
+        headers=admin_headers,
+    )
+    assert resp.status_code == 201, resp.text
+    assert re.fullmatch(r"PO-\d{4}-\d{6}", resp.json()["order_no"])
+
+
+def test_suffix_skips_numbers_taken_outside_the_counter(client, admin_headers):
+    def create(order_no):
+        resp = client.post(
+            "/api/v1/orders/",
+            json={"order_no": order_no, "customer_name": "Order Number Customer", "items": []},
+            headers=admin_headers,
+        )
+        assert resp.status_code == 201, resp.text
+        return resp.json()["order_no"]
+
+    assert create("PRESUFFIXED-1") == "PRESUFFIXED-1"
+    assert create("PRESUFFIXED-4") == "PRESUFFIXED-4"
+    assert create("PRESUFFIXED") == "PRESUFFIXED"
+    assert create("PRESUFFIXED") == "PRESUFFIXED-5"
+    assert create("PRESUFFIXED") == "PRESUFFIXED-6"
+
+
+def test_lost_race_for_a_client_number_gets_a_suffix(client, admin_headers, monkeypatch):
+    payload = {"order_no": "RACED-NO", "customer_name": "Order Number Customer", "items": []}
+    assert client.post("/api/v1/orders/", json=payload, headers=admin_headers).status_code == 201
+
+    # the number was still free when checked; a concurrent create committed it
+    checks = []
+    real_taken = order_numbers._order_no_taken
+
+    def stale_once(db, order_no):
+        checks.append(order_no)
+        return False if len(checks) == 1 else real_taken(db, order_no)
+
+    monkeypatch.setattr(order_numbers, "_order_no_taken", stale_once)
+    resp = client.post("/api/v1/orders/", json=payload, headers=admin_headers)
+    assert resp.status_code == 201, resp.text
+    assert resp.json()["order_no"] == "RACED-NO-1"
+
+
+def test_client_number_does_not_share_the_year_counter():
+    db = TestingSessionLocal()
+    try:
+        now = datetime(2032, 3, 1)
+        assert next_order_no(db, prefix="NS", now=now) == "NS-2032-000001"
+        db.add(Order(order_no="NS-2032", customer_name="Namespaced"))
+        db.flush()
+        assert allocate_order_no(db, "NS-2032") == "NS-2032-1"
+        assert next_order_no(db, prefix="NS", now=now) == "NS-2032-000002"
+        db.rollback()
+    finally:
+        db.close()
+
+
+def test_sequence_year_is_utc(monkeypatch):
+    class NewYearsEve(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            # 2030-01-01 01:00 in Bangkok, still 2029 in UTC
+            local = datetime(2030, 1, 1, 1, 0, tzinfo=timezone(timedelta(hours=7)))
+            return local.astimezone(tz) if tz else local.replace(tzinfo=None)
+
+    monkeypatch.setattr(order_numbers, "datetime", NewYearsEve)
+    db = TestingSessionLocal()
+    try:
+        assert next_order_no(db, prefix="UTC").startswith("UTC-2029-")
+        db.rollback()
+    finally:
+        db.close()
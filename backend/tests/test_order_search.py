@@ -0,0 +1,120 @@
+"""
+Tests for full-text order search (GET /orders/search):
+  - matching across order_no, customer, brand, codes, tracking and note
+  - the FTS index following order create / update / delete
+  - the schema's default brand is not stored or indexed
+  - masked roles only matching on the columns they can see
+"""
+
+from app.core.order_search import search_order_ids
+from app.models.order import Order
+from tests.conftest import TestingSessionLocal
+
+
+def _create(client, headers, **fields):
+    payload = {"customer_name": "Search Customer", "items": []}
+    payload.update(fields)
+    resp = client.post("/api/v1/orders/", json=payload, headers=headers)
+    assert resp.status_code == 201, resp.text
+    return resp.json()
+
+
+def _search(client, headers, q):
+    resp = client.get("/api/v1/orders/search", params={"q": q}, headers=headers)
+    assert resp.status_code == 200, resp.text
+    return [o["id"] for o in resp.json()]
+
+
+def test_search_matches_each_field(client, admin_headers):
+    order = _create(
+        client,
+        admin_headers,
+        customer_name="ทีมฟุตบอลเทศบาลนครสงขลา",
+        brand="Kingfisher",
+        graphic_code="GX-7781",
+        customer_code="CUS-5521",
+        note="ปักโลโก้หน้าอกซ้าย",
+    )
+    oid = order["id"]
+    for q in (order["order_no"], "เทศบาลนคร", "kingfish", "GX-7781", "cus-5521", "โลโก้หน้าอก"):
+        assert oid in _search(client, admin_headers, q), q
+
+    assert _search(client, admin_headers, "kingfisher nomatchterm") == []
+
+
+def test_search_follows_updates_and_deletes(client, admin_headers):
+    order = _create(client, admin_headers, note="lanyard sponsor Pelican")
+    oid = order["id"]
+    assert _search(client, admin_headers, "pelican") == [oid]
+
+    db = TestingSessionLocal()
+    try:
+        o = db.get(Order, oid)
+        o.note = "lanyard sponsor Heron"
+        o.tracking_number = "TH99887766"
+        db.commit()
+    finally:
+        db.close()
+    assert _search(client, admin_headers, "pelican") == []
+    assert _search(client, admin_headers, "heron") == [oid]
+    assert _search(client, admin_headers, "TH99887766") == [oid]
+
+    client.delete(f"/api/v1/orders/{oid}", headers=admin_headers)
+    assert _search(client, admin_headers, "heron") == []
+
+
+def test_brand_is_stored_only_when_sent(client, admin_headers):
+    order = _create(client, admin_headers, note="brandless hammerhead")
+    assert order["brand"] is None
+    assert order["id"] not in _search(client, admin_headers, "BG")
+
+    payload = {"customer_name": "Search Customer", "note": "brandless hammerhead", "items": []}
+    updated = client.put(f"/api/v1/orders/{order['id']}", json=payload, headers=admin_headers)
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["brand"] is None
+
+    payload["brand"] = "Hammerhead"
+    updated = client.put(f"/api/v1/orders/{order['id']}", json=payload, headers=admin_headers)
+    assert updated.json()["brand"] == "Hammerhead"
+    assert _search(client, admin_headers, "hammerhead") == [order["id"]]
+
+
+def test_short_terms_use_like_fallback(client, admin_headers):
+    order = _create(client, admin_headers, graphic_code="Q9")
+    db = TestingSessionLocal()
+    try:
+        assert order["id"] in search_order_ids(db, "q9")
+    finally:
+        db.close()
+
+
+def test_masked_role_cannot_search_hidden_fields(client, admin_headers):
+    from app.core.security import create_access_token, get_password_hash
+    from app.models.user import User
+
+    db = TestingSessionLocal()
+    try:
+        user = db.query(User).filter(User.username == "search_graphic").first()
+        if not user:
+            user = User(
+                username="search_graphic",
+                password_hash=get_password_hash("pw"),
+                role="GRAPHIC",
+                is_active=True,
+            )
+            db.add(user)
+            db.commit()
+        token = create_access_token({"sub": str(user.id)})
+    finally:
+        db.close()
+    graphic_headers = {"Authorization": f"Bearer {token}"}
+
+    order = _create(
+        client, admin_headers, customer_name="Secret Albatross Club", graphic_code="ALB-001"
+    )
+    assert _search(client, graphic_headers, "albatross") == []
+    resp = client.get(
+        "/api/v1/orders/search", params={"q": "ALB-001"}, headers=graphic_headers
+    )
+    assert [o["id"] for o in resp.json()] == [order["id"]]
+    assert resp.json()[0]["customer_name"] is None
@@ -0,0 +1,77 @@
+"""
+Tests for POST /pricing/matrix:
+  - every cell equals the /calc price of the same single item
+  - a 50 x 20 x 16 grid is computed quickly
+  - input validation
+"""
+
+import itertools
+import time
+
+from app.core.neck_resolver import NeckIndex, NeckInfo
+from app.core.price_matrix import price_matrix
+from app.core.pricing_constants import ADDON_PRICES
+
+NECKS = [
+    "คอกลม",
+    "คอวีชน มีลิ้น",
+    "คอปกคางหมู",
+    "คอปกเชิ้ต (บังคับไหล่สโลป+40 บาท/ตัว)",
+    "คอไม่มีในระบบ",
+]
+QUANTITIES = [1, 9, 10, 30, 31, 75, 101, 301, 100000]
+COMBOS = [[], ["pocket"], ["slopeShoulder", "longSleeve"], ["collarTongue", "numberName"]]
+
+
+def _matrix(client, **payload):
+    resp = client.post("/api/v1/pricing/matrix", json=payload)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def test_cells_match_calc(client):
+    for oversize in (False, True):
+        grid = _matrix(
+            client, necks=NECKS, quantities=QUANTITIES, add_on_combos=COMBOS, is_oversize=oversize
+        )
+        for n, row in enumerate(grid["necks"]):
+            for (qi, qty), (ci, combo) in itertools.product(
+                enumerate(QUANTITIES), enumerate(COMBOS)
+            ):
+                item = {
+                    "neck_type": NECKS[n],
+                    "quantity_matrix": {"M": qty},
+                    "selected_add_ons": combo,
+                    "is_oversize": oversize,
+                }
+                calc = client.post("/api/v1/pricing/calc", json={"items": [item]}).json()
+                assert row["line_total"][qi][ci] == calc["total_price"], (NECKS[n], qty, combo)
+                assert row["unit_prices"][qi] == calc["price_per_unit"]
+
+
+def test_large_grid_is_fast():
+    index = NeckIndex([NeckInfo(i, f"คอแบบ{i}", None, i % 3 == 0) for i in range(50)])
+    necks = [f"คอแบบ{i}" for i in range(50)]
+    quantities = list(range(10, 410, 20))
+    codes = sorted(ADDON_PRICES)[:4]
+    combos = [list(c) for r in range(5) for c in itertools.combinations(codes, r)]
+    assert (len(necks), len(quantities), len(combos)) == (50, 20, 16)
+
+    start = time.perf_counter()
+    grid = price_matrix(index, necks, quantities, combos)
+    elapsed = time.perf_counter() - start
+    assert len(grid["necks"][49]["line_total"][19]) == 16
+    # well under the 100 ms target locally; generous for slow CI machines
+    assert elapsed < 0.5
+
+
+def test_matrix_validation(client):
+    base = {"necks": ["คอกลม"], "quantities": [10]}
+    for bad in (
+        {"necks": []},
+        {"quantities": [0]},
+        {"add_on_combos": [["glitter"]]},
+        {"necks": ["คอกลม"] * 500, "quantities": list(range(1, 201))},
+    ):
+        resp = client.post("/api/v1/pricing/matrix", json=dict(base, **bad))
+        assert resp.status_code == 400, bad
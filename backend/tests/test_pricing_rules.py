@@ -0,0 +1,87 @@
+"""
+Tests for PricingRule-driven tier pricing (app/core/pricing_rules.py):
+  - interval lookup, STEP_PRICING fallback, overlapping rows skipped
+  - overlapping rules are rejected on write
+  - calc, matrix and order creation use a new rule at once, with no extra queries
+"""
+
+from decimal import Decimal
+
+from app.core.pricing_rules import RuleTable
+
+
+def test_rule_table_intervals():
+    table = RuleTable(
+        [
+            (1, "Cotton ", 10, 49, 150),
+            (2, "cotton", 50, 99, 130.5),
+            (3, "COTTON", 60, 80, 1),  # overlaps rule 2: ignored
+            (4, "ไมโคร", 1, 9999, 99),
+        ]
+    )
+    assert table.unit_price("cotton", 10) == Decimal("150")
+    assert table.unit_price(" Cotton", 75) == Decimal("130.5")
+    assert table.unit_price("cotton", 9) is None
+    assert table.unit_price("cotton", 100) is None
+    assert table.unit_price("ไมโคร", 5) == Decimal("99")
+    assert table.unit_price(None, 20) is None
+    assert [t[0] for t in table.tiers("cotton")] == [10, 50]
+
+
+def _rule(fabric, low, high, price):
+    return {"fabric_type": fabric, "min_qty": low, "max_qty": high, "unit_price": price}
+
+
+def test_rules_drive_pricing(client, admin_headers, query_budget):
+    fabric = "ผ้าทดสอบกฎ"
+    created = []
+    try:
+        for body in (_rule(fabric, 10, 49, 175), _rule(fabric, 50, 500, 155)):
+            resp = client.post("/api/v1/pricing-rules/", json=body, headers=admin_headers)
+            assert resp.status_code == 200, resp.text
+            created.append(resp.json()["id"])
+
+        clash = client.post(
+            "/api/v1/pricing-rules/", json=_rule(fabric, 40, 60, 1), headers=admin_headers
+        )
+        assert clash.status_code == 400
+        bad = client.post(
+            "/api/v1/pricing-rules/", json=_rule(fabric, 9, 1, 1), headers=admin_headers
+        )
+        assert bad.status_code == 400
+
+        item = {"fabric_type": fabric, "neck_type": "คอกลม", "quantity_matrix": {"M": 60}}
+        client.post("/api/v1/pricing/calc", json={"items": [item]})
+        # a cache miss prices from in-memory tables only
+        with query_budget(0):
+            calc = client.post(
+                "/api/v1/pricing/calc", json={"items": [dict(item, quantity_matrix={"M": 20})]}
+            ).json()
+        assert calc["price_per_unit"] == 175
+
+        plain = client.post(
+            "/api/v1/pricing/calc", json={"items": [dict(item, fabric_type=None)]}
+        ).json()
+        assert plain["price_per_unit"] == 190  # roundVNeck 51-100
+
+        grid = client.post(
+            "/api/v1/pricing/matrix",
+            json={"fabric_type": fabric, "necks": ["คอกลม"], "quantities": [5, 20, 60]},
+        ).json()
+        assert grid["necks"][0]["unit_prices"] == [240, 175, 155]
+
+        order = client.post(
+            "/api/v1/orders/",
+            json={
+                "customer_name": "Rule Pricing",
+                "items": [dict(item, product_name="เสื้อ")],
+            },
+            headers=admin_headers,
+        ).json()
+        assert Decimal(str(order["items"][0]["price_per_unit"])) == Decimal("155")
+    finally:
+        for rule_id in created:
+            client.delete(f"/api/v1/pricing-rules/{rule_id}", headers=admin_headers)
+
+    after = client.post("/api/v1/pricing/calc", json={"items": [item]}).json()
+    assert after["price_per_unit"] == 190
@@ -0,0 +1,170 @@
+"""
+Tests for query budgets:
+  - list/detail endpoints stay within a constant statement count as the
+    number of orders and items grows (N+1 guard)
+  - order create / status change and the smart-alert job stay constant as
+    items, notification recipients and qualifying orders grow
+  - a route exceeding its @query_budget fails in raise mode, and a write
+    that exceeds it is rolled back rather than committed
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api import orders as orders_api
+from app.core.config import settings
+from app.core.query_budget import QueryBudgetExceeded, endpoint_budget
+from app.core.scheduler import smart_alerts
+from app.core.security import get_password_hash
+from app.models.audit_log import AuditLog
+from app.models.notification import Notification
+from app.models.order import Order
+from app.models.user import User
+from tests.conftest import TestingSessionLocal
+
+
+def _order(client, headers, name, items=2):
+    resp = client.post(
+        "/api/v1/orders/",
+        json={
+            "customer_name": name,
+            "items": [
+                {
+                    "product_name": f"Shirt {i}",
+                    "neck_type": "คอกลม",
+                    "quantity_matrix": {"M": 10},
+                }
+                for i in range(items)
+            ],
+        },
+        headers=headers,
+    )
+    assert resp.status_code == 201, resp.text
+    return resp.json()
+
+
+def test_order_reads_do_not_scale_with_rows(client, admin_headers, query_budget):
+    created = [_order(client, admin_headers, f"Budget Customer {i}", items=3) for i in range(5)]
+
+    with query_budget(endpoint_budget(orders_api.read_orders)):
+        resp = client.get("/api/v1/orders/", headers=admin_headers)
+    assert resp.status_code == 200
+
+    with query_budget(endpoint_budget(orders_api.read_order)):
+        client.get(f"/api/v1/orders/{created[0]['id']}", headers=admin_headers)
+
+    with query_budget(endpoint_budget(orders_api.search_orders)):
+        client.get("/api/v1/orders/search", params={"q": "Budget"}, headers=admin_headers)
+
+
+def test_fixture_reports_statements(client, admin_headers, query_budget):
+    with pytest.raises(QueryBudgetExceeded) as exc:
+        with query_budget(0):
+            client.get("/api/v1/products/necks")
+    assert exc.value.count >= 1
+    assert any("neck_types" in s for s in exc.value.statements)
+
+
+def test_route_over_budget_raises(client, admin_headers, monkeypatch):
+    assert settings.QUERY_BUDGET_MODE == "raise"
+    monkeypatch.setattr(orders_api.read_orders, "__query_budget__", 1)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/api/v1/orders/", headers=admin_headers)
+
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "warn")
+    assert client.get("/api/v1/orders/", headers=admin_headers).status_code == 200
+
+
+def test_write_over_budget_is_not_committed(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(orders_api.create_order, "__query_budget__", 1)
+    with pytest.raises(QueryBudgetExceeded):
+        client.post(
+            "/api/v1/orders/",
+            json={"customer_name": "Over Budget Writer", "items": []},
+            headers=admin_headers,
+        )
+    db = TestingSessionLocal()
+    try:
+        assert db.query(Order).filter(Order.customer_name == "Over Budget Writer").count() == 0
+    finally:
+        db.close()
+
+
+def test_order_writes_do_not_scale_with_items(client, admin_headers, query_budget):
+    _order(client, admin_headers, "Budget Warmup", items=1)
+    budget = endpoint_budget(orders_api.create_order)
+    with query_budget(budget) as one:
+        _order(client, admin_headers, "Budget Writer", items=1)
+    with query_budget(budget) as many:
+        _order(client, admin_headers, "Budget Writer", items=6)
+    assert many.count == one.count
+
+
+def test_status_change_does_not_scale_with_recipients(client, admin_headers, query_budget):
+    db = TestingSessionLocal()
+    try:
+        for i in range(4):
+            db.add(
+                User(
+                    username=f"budget_designer_{i}",
+                    password_hash=get_password_hash("pw"),
+                    role="GRAPHIC",
+                    is_active=True,
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+    order = _order(client, admin_headers, "Budget Status", items=1)
+
+    with query_budget(endpoint_budget(orders_api.update_order_status)):
+        resp = client.patch(
+            f"/api/v1/orders/{order['id']}/status",
+            json={"status": "ARTWORK_APPROVED"},
+            headers=admin_headers,
+        )
+    assert resp.status_code == 200, resp.text
+    db = TestingSessionLocal()
+    try:
+        sent = db.query(Notification).filter(Notification.type == "ARTWORK_APPROVED").count()
+    finally:
+        db.close()
+    assert sent >= 4
+
+
+def test_smart_alerts_do_not_scale_with_orders(query_budget):
+    now = datetime.utcnow()
+    db = TestingSessionLocal()
+    try:
+        orders = [
+            Order(
+                order_no=f"ALERT-{i}",
+                customer_name="Budget Alerts",
+                status="WAITING_ARTWORK",
+                usage_date=now + timedelta(days=1),
+            )
+            for i in range(5)
+        ]
+        db.add_all(orders)
+        db.flush()
+        db.add_all(
+            AuditLog(
+                action="UPDATE_STATUS",
+                target_type="order",
+                target_id=str(o.id),
+                order_id=o.id,
+                created_at=now - timedelta(days=3),
+            )
+            for o in orders
+        )
+        db.commit()
+
+        with query_budget(5):
+            assert smart_alerts(db, now) >= 10  # usage + design alert per order
+        db.commit()
+        # already alerted within the window: nothing new
+        with query_budget(5):
+            assert smart_alerts(db, now) == 0
+    finally:
+        db.close()
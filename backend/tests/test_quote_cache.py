@@ -0,0 +1,89 @@
+"""
+Tests for the POST /pricing/calc quote cache:
+  - a repeated (or equivalent) payload is a cache hit and costs no queries
+  - editing a neck type invalidates cached quotes
+  - LRU eviction and TTL expiry
+  - the hit ratio is exposed at GET /metrics
+"""
+
+import time
+
+from app.core.quote_cache import QUOTE_CACHE_REQUESTS, QuoteCache
+from app.models.product import NeckType
+from tests.conftest import TestingSessionLocal
+
+
+def _calc(client, items):
+    resp = client.post("/api/v1/pricing/calc", json={"items": items})
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def _hits():
+    return QUOTE_CACHE_REQUESTS.value(result="hit")
+
+
+def test_equivalent_payloads_hit_the_cache(client, query_budget):
+    addons = ["pocket", "longSleeve"]
+    items = [{"neck_type": "คอวีชน ", "quantity_matrix": {"S": 6, "M": 6}, "selected_add_ons": addons}]
+    first = _calc(client, items)
+
+    # same neck once stripped, same total quantity, add-ons in another order
+    same = [{"neck_type": "คอวีชน", "quantity_matrix": {"L": 12}, "selected_add_ons": addons[::-1]}]
+    hits = _hits()
+    with query_budget(0):
+        assert _calc(client, same) == first
+    assert _hits() == hits + 1
+
+    # a different quantity is a different quote
+    _calc(client, [dict(same[0], quantity_matrix={"L": 40})])
+    assert _hits() == hits + 1
+
+
+def test_neck_edit_invalidates_cached_quotes(client, admin_headers):
+    db = TestingSessionLocal()
+    try:
+        neck = NeckType(name="คอแคชทดสอบ", force_slope=True, additional_cost=40)
+        db.add(neck)
+        db.commit()
+        neck_id = neck.id
+    finally:
+        db.close()
+
+    items = [{"neck_type": "คอแคชทดสอบ", "quantity_matrix": {"M": 10}}]
+    before = _calc(client, items)
+
+    resp = client.put(
+        f"/api/v1/products/necks/{neck_id}",
+        json={"name": "คอแคชทดสอบ", "additional_cost": 60, "force_slope": True},
+        headers=admin_headers,
+    )
+    assert resp.status_code == 200, resp.text
+
+    after = _calc(client, items)
+    assert after["total_price"] - before["total_price"] == 20 * 10
+
+
+def test_lru_eviction_and_ttl():
+    cache = QuoteCache(maxsize=2, ttl=60)
+    cache.put("a", {"q": 1})
+    cache.put("b", {"q": 2})
+    assert cache.get("a") == {"q": 1}  # "a" is now most recent
+    cache.put("c", {"q": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+
+    short = QuoteCache(maxsize=2, ttl=0.01)
+    short.put("a", {"q": 1})
+    time.sleep(0.02)
+    assert short.get("a") is None
+    assert len(short) == 0
+
+
+def test_hit_ratio_in_metrics(client):
+    items = [{"neck_type": "คอกลม", "quantity_matrix": {"M": 15}}]
+    _calc(client, items)
+    _calc(client, items)
+    body = client.get("/metrics").text
+    assert 'pricing_quote_cache_requests_total{result="hit"}' in body
+    assert "pricing_quote_cache_hit_ratio " in body
@@ -0,0 +1,158 @@
+"""
+Tests for the order rollups and GET /reports/summary:
+  - rollups follow order create / status transition / edit / delete incrementally
+  - the reconcile repairs writes that bypassed the ORM
+  - both paths bucket orders by UTC day, also just before midnight
+  - summary totals, breakdowns and the from/to validation
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql
+
+from app.core.order_rollups import _day, reconcile_rollups, utc_day
+from app.models.order import Order
+from tests.conftest import TestingSessionLocal
+
+
+def _today():
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _reconcile():
+    db = TestingSessionLocal()
+    try:
+        fixed = reconcile_rollups(db.connection())
+        db.commit()
+        return fixed
+    finally:
+        db.close()
+
+
+def _summary(client, headers, **params):
+    resp = client.get("/api/v1/reports/summary", params=params, headers=headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def _create(client, headers, **fields):
+    payload = {"customer_name": "Report Customer", "items": []}
+    payload.update(fields)
+    resp = client.post("/api/v1/orders/", json=payload, headers=headers)
+    assert resp.status_code == 201, resp.text
+    return resp.json()["id"]
+
+
+def _set(oid, **values):
+    db = TestingSessionLocal()
+    try:
+        order = db.get(Order, oid)
+        db.commit()  # expire everything, as after a request's own commit
+        for name, value in values.items():
+            setattr(order, name, value)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_rollups_follow_order_writes(client, admin_headers):
+    _reconcile()
+    today = _today()
+    before = _summary(client, admin_headers, **{"from": today, "to": today})["totals"]
+
+    oid = _create(client, admin_headers, product_type="polo")
+    _set(
+        oid,
+        grand_total=Decimal("1070.00"),
+        balance_amount=Decimal("535.00"),
+        total_cost=Decimal("600.00"),
+        estimated_profit=Decimal("400.00"),
+    )
+    resp = client.patch(
+        f"/api/v1/orders/{oid}/status", json={"status": "WAITING_DEPOSIT"}, headers=admin_headers
+    )
+    assert resp.status_code == 200, resp.text
+
+    report = _summary(client, admin_headers, **{"from": today, "to": today})
+    totals = report["totals"]
+    assert totals["order_count"] == before["order_count"] + 1
+    assert Decimal(totals["revenue"]) - Decimal(before["revenue"]) == Decimal("1070.00")
+    assert Decimal(totals["estimated_profit"]) - Decimal(before["estimated_profit"]) == Decimal("400.00")
+    assert Decimal(totals["outstanding_balance"]) - Decimal(before["outstanding_balance"]) == Decimal("535.00")
+    polo = next(p for p in report["by_product_type"] if p["product_type"] == "polo")
+    assert polo["order_count"] >= 1
+    assert any(u["user_name"] == "Test Admin" for u in report["by_sales_user"])
+    assert report["by_day"][-1]["day"] == today
+
+    # a cancelled order keeps its count but leaves revenue and outstanding
+    _set(oid, status="CANCELLED")
+    cancelled = _summary(client, admin_headers, **{"from": today, "to": today})["totals"]
+    assert cancelled["order_count"] == totals["order_count"]
+    assert cancelled["cancelled_count"] == totals["cancelled_count"] + 1
+    assert Decimal(cancelled["revenue"]) == Decimal(before["revenue"])
+
+    db = TestingSessionLocal()
+    try:
+        db.delete(db.get(Order, oid))
+        db.commit()
+    finally:
+        db.close()
+    after = _summary(client, admin_headers, **{"from": today, "to": today})["totals"]
+    assert after == before
+
+    # the incremental path left nothing for the reconcile to fix
+    assert _reconcile() == 0
+
+
+def test_reconcile_repairs_bulk_updates(client, admin_headers):
+    oid = _create(client, admin_headers)
+    _reconcile()
+    today = _today()
+
+    db = TestingSessionLocal()
+    try:
+        # Core UPDATE: invisible to the ORM flush listener
+        db.execute(update(Order).where(Order.id == oid).values(grand_total=Decimal("99.00")))
+        db.commit()
+    finally:
+        db.close()
+    stale = _summary(client, admin_headers, **{"from": today, "to": today})["totals"]
+
+    assert _reconcile() > 0
+    fixed = _summary(client, admin_headers, **{"from": today, "to": today})["totals"]
+    assert Decimal(fixed["revenue"]) - Decimal(stale["revenue"]) == Decimal("99.00")
+    assert _reconcile() == 0
+
+
+def test_orders_near_midnight_land_on_the_same_utc_day(client, admin_headers):
+    _reconcile()
+    oid = _create(client, admin_headers)
+    _set(oid, created_at=datetime(2026, 3, 1, 23, 59, 30))
+    # the listener moved the order to March 1st; the GROUP BY agrees
+    assert _reconcile() == 0
+    totals = _summary(client, admin_headers, **{"from": "2026-03-01", "to": "2026-03-01"})["totals"]
+    assert totals["order_count"] >= 1
+    assert _summary(client, admin_headers, **{"from": "2026-03-02", "to": "2026-03-02"})["totals"]["order_count"] == 0
+
+    # 06:30 on March 2nd in Bangkok is still March 1st in UTC
+    bangkok = timezone(timedelta(hours=7))
+    assert _day(datetime(2026, 3, 2, 6, 30, tzinfo=bangkok)) == date(2026, 3, 1)
+    pg = SimpleNamespace(dialect=postgresql.dialect())
+    sql = str(utc_day(pg, Order.__table__.c.created_at).compile(dialect=postgresql.dialect()))
+    assert sql.startswith("date(timezone(") and sql.endswith(", orders.created_at))")
+
+
+def test_summary_validation_and_budget(client, admin_headers, query_budget):
+    resp = client.get(
+        "/api/v1/reports/summary",
+        params={"from": "2026-02-01", "to": "2026-01-01"},
+        headers=admin_headers,
+    )
+    assert resp.status_code == 400
+
+    with query_budget(4):
+        report = _summary(client, admin_headers)
+    assert report["date_to"] == _today()
@@ -0,0 +1,143 @@
+"""
+Tests for re-pricing after a neck edit (app/core/reprice_jobs.py):
+  - PUT /products/necks/{id} starts an impact job for the open orders using it
+  - the job reports the diffs without writing; apply writes exactly those
+  - unchanged edits start nothing; unknown / unfinished jobs are rejected
+  - turning force_slope off drops the slope it forced, not one the client chose
+"""
+
+import json
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from tests.conftest import TestingSessionLocal, engine_test
+from app.models.order import Order
+
+NECK = "คอปกงานทดสอบรีไพรซ์"
+
+
+def _neck_id(client):
+    necks = client.get("/api/v1/products/necks").json()
+    return next(n["id"] for n in necks if n["name"] == NECK)
+
+
+def _order(client, headers, neck, qty=20):
+    item = {"product_name": "เสื้อ", "neck_type": neck, "quantity_matrix": {"M": qty}}
+    resp = client.post(
+        "/api/v1/orders/", json={"customer_name": "Reprice Neck", "items": [item]}, headers=headers
+    )
+    assert resp.status_code == 201, resp.text
+    return resp.json()
+
+
+def _grand_total(order_id):
+    db = TestingSessionLocal()
+    try:
+        return db.get(Order, order_id).grand_total
+    finally:
+        db.close()
+
+
+def _edit(client, headers, neck_id, cost):
+    body = {"name": NECK, "additional_cost": cost, "force_slope": True}
+    resp = client.put(f"/api/v1/products/necks/{neck_id}", json=body, headers=headers)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def test_neck_items_are_indexed():
+    with engine_test.connect() as conn:
+        plan = conn.execute(
+            text("EXPLAIN QUERY PLAN SELECT DISTINCT neck_type FROM order_items")
+        ).fetchall()
+    assert any("ix_order_items_neck_type" in str(row) for row in plan)
+
+
+def test_neck_edit_reprices_in_background(client, admin_headers):
+    client.post(
+        "/api/v1/products/necks",
+        json={"name": NECK, "additional_cost": 40, "force_slope": True},
+        headers=admin_headers,
+    )
+    neck_id = _neck_id(client)
+    a = _order(client, admin_headers, NECK)
+    b = _order(client, admin_headers, f"{NECK} (บังคับไหล่สโลป+40 บาท/ตัว)", qty=30)
+    other = _order(client, admin_headers, "คอกลม")
+    old = {o["id"]: _grand_total(o["id"]) for o in (a, b, other)}
+
+    neck = _edit(client, admin_headers, neck_id, 40)
+    assert "reprice_job" not in neck
+
+    neck = _edit(client, admin_headers, neck_id, 70)
+    job_id = neck["reprice_job"]["id"]
+    job = client.get(f"/api/v1/products/reprice-jobs/{job_id}", headers=admin_headers).json()
+    assert job["status"] == "done" and not job["apply"]
+    assert job["total"] == job["processed"] == 2
+    report = job["report"]
+    assert report["dry_run"] and report["changed"] == 2
+    assert {d["order_id"] for d in report["diffs"]} == {a["id"], b["id"]}
+    # slope +30 per piece on 20 + 30 pieces, plus 7% VAT
+    assert Decimal(report["grand_total_delta"]) == Decimal("1605.00")
+    assert {o: _grand_total(o) for o in old} == old
+
+    resp = client.post(f"/api/v1/products/reprice-jobs/{job_id}/apply", headers=admin_headers)
+    assert resp.status_code == 202
+    applied = client.get(
+        f"/api/v1/products/reprice-jobs/{resp.json()['id']}", headers=admin_headers
+    ).json()
+    assert applied["status"] == "done" and applied["source_job_id"] == job_id
+    assert applied["report"]["applied"] == 2
+    fresh = _order(client, admin_headers, NECK)
+    assert _grand_total(a["id"]) == _grand_total(fresh["id"])
+    assert _grand_total(other["id"]) == old[other["id"]]
+
+    again = client.post(
+        f"/api/v1/products/reprice-jobs/{applied['id']}/apply", headers=admin_headers
+    )
+    assert again.status_code == 409
+    missing = client.get("/api/v1/products/reprice-jobs/nope", headers=admin_headers)
+    assert missing.status_code == 404
+
+
+def test_turning_force_slope_off_drops_the_forced_charge(client, admin_headers):
+    name = "คอปกทดสอบเลิกบังคับสโลป"
+    client.post(
+        "/api/v1/products/necks",
+        json={"name": name, "additional_cost": 40, "force_slope": True},
+        headers=admin_headers,
+    )
+    necks = client.get("/api/v1/products/necks").json()
+    neck_id = next(n["id"] for n in necks if n["name"] == name)
+    forced = _order(client, admin_headers, name)
+    item = {
+        "product_name": "เสื้อ",
+        "neck_type": name,
+        "quantity_matrix": {"M": 20},
+        "selected_add_ons": ["slopeShoulder"],
+    }
+    chosen = client.post(
+        "/api/v1/orders/", json={"customer_name": "Chosen Slope", "items": [item]}, headers=admin_headers
+    ).json()
+
+    resp = client.put(
+        f"/api/v1/products/necks/{neck_id}",
+        json={"name": name, "additional_cost": 40, "force_slope": False},
+        headers=admin_headers,
+    )
+    job_id = resp.json()["reprice_job"]["id"]
+    report = client.get(f"/api/v1/products/reprice-jobs/{job_id}", headers=admin_headers).json()["report"]
+    # only the order whose slope the neck forced changes: -40 per piece, plus 7% VAT
+    assert [d["order_id"] for d in report["diffs"]] == [forced["id"]]
+    assert Decimal(report["grand_total_delta"]) == Decimal("-856.00")
+
+    applied = client.post(f"/api/v1/products/reprice-jobs/{job_id}/apply", headers=admin_headers)
+    assert applied.status_code == 202
+    db = TestingSessionLocal()
+    try:
+        stored = {o: db.get(Order, o).items[0] for o in (forced["id"], chosen["id"])}
+        assert json.loads(stored[forced["id"]].selected_add_ons) == []
+        assert json.loads(stored[forced["id"]].auto_add_ons) == []
+        assert json.loads(stored[chosen["id"]].selected_add_ons) == ["slopeShoulder"]
+    finally:
+        db.close()
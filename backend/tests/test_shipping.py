@@ -0,0 +1,109 @@
+"""
+Tests for the shipping engine (app/core/shipping.py):
+  - quantity tiers answer exactly like the old if-chain
+  - ShippingRate bands: per-provider bisect, cheapest provider, fallback
+  - /pricing/calc, order creation and order updates pick up a new band
+    immediately
+  - overlapping bands are rejected
+"""
+
+from decimal import Decimal
+
+from app.core.shipping import ShippingTable, qty_shipping_cost, quote_shipping
+
+
+def _old_chain(q):
+    if q < 10:
+        return 0
+    tiers = ((15, 60), (20, 80), (30, 100), (40, 120), (50, 180), (70, 200), (100, 230))
+    for limit, price in tiers:
+        if q <= limit:
+            return price
+    return 230 + (q - 100) * 50
+
+
+def test_qty_tiers_match_old_chain():
+    for q in range(-3, 400):
+        assert qty_shipping_cost(q) == _old_chain(q), q
+
+
+def test_weight_bands():
+    table = ShippingTable(
+        [
+            ("Kerry", 0, 5, 60),
+            ("Kerry", 5.01, 10, 90),
+            ("Flash", 0, 3, 45),
+            ("Flash", 3.01, 20, 120),
+        ]
+    )
+    assert quote_shipping(table, 0, weight_kg=2).provider == "Flash"
+    assert quote_shipping(table, 0, weight_kg=4).price == Decimal("60")
+    assert quote_shipping(table, 0, weight_kg=7, provider="Kerry").price == Decimal("90")
+    assert quote_shipping(table, 0, weight_kg=15).provider == "Flash"
+    # nothing covers 25 kg: quantity tiers
+    fallback = quote_shipping(table, 120, weight_kg=25)
+    assert (fallback.provider, fallback.price) == (None, Decimal(qty_shipping_cost(120)))
+    assert quote_shipping(ShippingTable([]), 35).price == Decimal(120)
+
+
+def _rate(low, high, price):
+    return {
+        "provider_name": "TestPost",
+        "min_weight_kg": low,
+        "max_weight_kg": high,
+        "base_price": price,
+    }
+
+
+def _calc_shipping(client, item):
+    return client.post("/api/v1/pricing/calc", json={"items": [item]}).json()["shipping_cost"]
+
+
+def test_rates_apply_to_calc_and_orders(client, admin_headers):
+    item = {"product_name": "เสื้อ", "neck_type": "คอกลม", "quantity_matrix": {"M": 12}}
+    assert _calc_shipping(client, item) == 60
+
+    # 12 pieces ~ 2.4 kg
+    resp = client.post("/api/v1/shipping-rates/", json=_rate(0, 50, 55), headers=admin_headers)
+    assert resp.status_code == 200, resp.text
+    rate_id = resp.json()["id"]
+    try:
+        assert _calc_shipping(client, item) == 55
+
+        order = client.post(
+            "/api/v1/orders/",
+            json={"customer_name": "Shipping Engine", "items": [item]},
+            headers=admin_headers,
+        ).json()
+        assert Decimal(str(order["shipping_cost"])) == Decimal("55")
+
+        explicit = client.post(
+            "/api/v1/orders/",
+            json={"customer_name": "Shipping Engine", "shipping_cost": 0, "items": [item]},
+            headers=admin_headers,
+        ).json()
+        assert Decimal(str(explicit["shipping_cost"])) == 0
+
+        # updates price omitted shipping the same way as creates
+        updated = client.put(
+            f"/api/v1/orders/{explicit['id']}",
+            json={"customer_name": "Shipping Engine", "items": [item]},
+            headers=admin_headers,
+        )
+        assert updated.status_code == 200, updated.text
+        assert Decimal(str(updated.json()["shipping_cost"])) == Decimal("55")
+        kept = client.put(
+            f"/api/v1/orders/{explicit['id']}",
+            json={"customer_name": "Shipping Engine", "shipping_cost": 0, "items": [item]},
+            headers=admin_headers,
+        ).json()
+        assert Decimal(str(kept["shipping_cost"])) == 0
+
+        overlap = client.post(
+            "/api/v1/shipping-rates/", json=_rate(10, 60, 80), headers=admin_headers
+        )
+        assert overlap.status_code == 400
+    finally:
+        client.delete(f"/api/v1/shipping-rates/{rate_id}", headers=admin_headers)
+
+    assert _calc_shipping(client, item) == 60
@@ -0,0 +1,173 @@
+"""
+Tests for the SQLite engine profile (app/db/session.py): the pragmas from
+Settings are applied to every new file-backed connection.
+
+conftest points get_read_db at the writable test session, so the GET
+endpoints moved to get_read_db are also run here against a real read-only
+(mode=ro) pool: one that wrote through it would fail.
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.session import configure_sqlite_engine, sqlite_pragmas
+
+
+def test_pragmas_applied_on_connect(tmp_path):
+    engine = configure_sqlite_engine(
+        create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    )
+    try:
+        with engine.connect() as conn:
+            pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+            assert pragma("journal_mode").upper() == settings.SQLITE_JOURNAL_MODE.upper()
+            assert pragma("busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
+            assert pragma("synchronous") == 1  # NORMAL
+            assert pragma("cache_size") == -settings.SQLITE_CACHE_SIZE_KB
+            assert pragma("temp_store") == 2  # MEMORY
+    finally:
+        engine.dispose()
+
+
+def test_in_memory_profile_skips_file_only_pragmas():
+    stmts = " ".join(sqlite_pragmas(in_memory=True))
+    assert "journal_mode" not in stmts and "mmap_size" not in stmts
+    assert "busy_timeout" in stmts
+
+
+def test_read_pool_is_read_only_and_sees_commits(tmp_path):
+    from app.db.session import _make_read_engine
+
+    primary = configure_sqlite_engine(
+        create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    )
+    reader = _make_read_engine(primary)
+    try:
+        assert reader is not primary
+        with primary.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+            conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+        with reader.connect() as conn:
+            assert conn.exec_driver_sql("SELECT x FROM t").scalars().all() == [1]
+        try:
+            with reader.begin() as conn:
+                conn.exec_driver_sql("INSERT INTO t VALUES (2)")
+            raise AssertionError("read pool accepted a write")
+        except OperationalError:
+            pass
+    finally:
+        reader.dispose()
+        primary.dispose()
+
+
+def test_in_memory_primary_has_no_read_pool():
+    from app.db.session import _make_read_engine
+
+    primary = create_engine("sqlite:///:memory:")
+    assert _make_read_engine(primary) is primary
+
+
+@pytest.fixture
+def read_only_pool(tmp_path, monkeypatch):
+    """Serve get_db from a WAL file and get_read_db from its mode=ro pool."""
+    from app.core.customer_search import customer_index
+    from app.core.master_data import bump_master_version
+    from app.core.security import create_access_token, get_password_hash
+    from app.db.base import Base
+    from app.db.session import _make_read_engine, get_db, get_read_db
+    from app.main import app
+    from app.models.user import User
+
+    primary = configure_sqlite_engine(
+        create_engine(
+            f"sqlite:///{tmp_path / 'ro.db'}", connect_args={"check_same_thread": False}
+        )
+    )
+    Base.metadata.create_all(bind=primary)
+    reader = _make_read_engine(primary)
+    Write = sessionmaker(autocommit=False, autoflush=False, bind=primary)
+    Read = sessionmaker(autocommit=False, autoflush=False, bind=reader)
+
+    def session_from(factory):
+        def dependency():
+            db = factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        return dependency
+
+    db = Write()
+    try:
+        admin = User(
+            username="ro_admin",
+            password_hash=get_password_hash("pw"),
+            role="ADMIN",
+            is_active=True,
+        )
+        db.add(admin)
+        db.commit()
+        token = create_access_token({"sub": str(admin.id)})
+    finally:
+        db.close()
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, session_from(Write))
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, session_from(Read))
+    try:
+        yield Read, {"Authorization": f"Bearer {token}"}
+    finally:
+        # in-process caches were filled from this database
+        customer_index.invalidate()
+        bump_master_version()
+        reader.dispose()
+        primary.dispose()
+
+
+def test_read_endpoints_work_on_read_only_pool(client, read_only_pool):
+    Read, headers = read_only_pool
+    db = Read()
+    try:
+        with pytest.raises(OperationalError):
+            db.execute(text("INSERT INTO suppliers (name) VALUES ('ro write')"))
+            db.commit()
+    finally:
+        db.close()
+
+    created = client.post(
+        "/api/v1/orders/",
+        json={
+            "customer_name": "Read Pool Customer",
+            "phone": "0811111111",
+            "items": [{"product_name": "Shirt", "neck_type": "คอกลม", "quantity_matrix": {"M": 10}}],
+        },
+        headers=headers,
+    )
+    assert created.status_code == 201, created.text
+    order = created.json()
+    customer_id = order["customer_id"]
+
+    for path in (
+        "/api/v1/orders/",
+        "/api/v1/orders/search?q=Read",
+        "/api/v1/orders/export",
+        f"/api/v1/orders/{order['id']}",
+        f"/api/v1/orders/{order['id']}/albums",
+        "/api/v1/customers/",
+        "/api/v1/customers/search?q=Read",
+        f"/api/v1/customers/{customer_id}/summary",
+        "/api/v1/reports/summary",
+        "/api/v1/products/fabrics",
+        "/api/v1/products/necks",
+        "/api/v1/products/sleeves",
+        "/api/v1/suppliers/",
+        "/api/v1/shipping-rates/",
+        "/api/v1/pricing-rules/",
+        "/api/v1/notifications",
+    ):
+        resp = client.get(path, headers=headers)
+        assert resp.status_code == 200, f"{path}: {resp.text}"
+
@@ -491,8 +491,9 @@ const HistoryLogModal = ({ orderId, onClose }) => {
     useEffect(() => {
         const fetchLogs = async () => {
             try {
+                // one page, newest first: { items, next_before }
                 const data = await fetchWithAuth(`/orders/${orderId}/logs`);
-                setLogs(data || []);
+                setLogs(data?.items || []);
             } catch (e) { console.error(e); }
             finally { setLoading(false); }
         };
@@ -518,13 +519,13 @@ const HistoryLogModal = ({ orderId, onClose }) => {
                                         </div>
                                         <div className="flex-1 bg-gray-50 p-3 rounded-lg border border-gray-100">
                                             <div className="flex justify-between mb-1">
-                                                <span className="font-bold text-gray-800">{log.user}</span>
+                                                <span className="font-bold text-gray-800">{log.user_name || '-'}</span>
                                                 <span className="text-xs text-gray-400">{new Date(log.created_at).toLocaleString('th-TH')}</span>
                                             </div>
                                             <div className="text-gray-600 font-medium">{log.action}</div>
                                             {log.details && (
                                                 <pre className="text-xs text-gray-500 mt-1 whitespace-pre-wrap font-sans bg-white p-2 rounded border border-gray-200">
-                                                    {log.details}
+                                                    {typeof log.details === 'string' ? log.details : JSON.stringify(log.details, null, 2)}
                                                 </pre>
                                             )}
                                         </div>